@@ -0,0 +1,86 @@
+"""
+HNSW 与量化搜索参数的召回率-延迟基准测试。
+
+写入模拟语料后，以精确检索结果为基准扫描 hnsw_ef、量化重打分与过采样倍数，
+输出 recall@k 与 p50/p99 延迟的帕累托表，用于选择满足召回率目标的最低成本配置。
+默认使用随机权重的小型 BERT 模型和 Qdrant 本地内存模式（本地模式总是精确检索，
+只用于验证流程）；调参时请指定 --url 连接 Qdrant 服务。
+
+示例：
+    python benchmarks/bench_recall.py
+    python benchmarks/bench_recall.py --url http://localhost:6333 --docs 100000 --quantization int8 --target-recall 0.95
+"""
+import argparse
+import json
+import uuid
+
+from common import build_tiny_embedding, make_corpus, environment
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as rest
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.evaluation import RecallEvaluator, search_param_grid, cheapest_config, format_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HNSW 与量化搜索参数的召回率-延迟基准测试")
+    parser.add_argument("--url", help="Qdrant 服务地址，不指定时使用本地内存模式")
+    parser.add_argument("--collection", help="评估已有集合，不写入模拟语料")
+    parser.add_argument("--docs", type=int, default=5000, help="模拟语料数量")
+    parser.add_argument("--dim", type=int, default=64, help="小模型的向量维度")
+    parser.add_argument("--queries", type=int, default=100, help="抽取的查询数量")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    parser.add_argument("--quantization", choices=["int8"], help="为模拟语料集合开启标量量化")
+    parser.add_argument("--oversampling", type=float, nargs="+", default=[], help="量化过采样倍数")
+    parser.add_argument("--ground-truth", choices=["exact", "numpy"], default="exact")
+    parser.add_argument("--repeats", type=int, default=3, help="每个查询的重复次数")
+    parser.add_argument("--target-recall", type=float, help="输出满足该召回率的最低延迟配置")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    client = QdrantClient(url=args.url) if args.url else QdrantClient(":memory:")
+    ops = QdrantOperations(client)
+    model = build_tiny_embedding(dim=args.dim)
+    collection_name = args.collection or f"bench_recall_{uuid.uuid4().hex[:8]}"
+    indexer = TextIndexer(model, ops, collection_name, dedup=False)
+    if not args.collection:
+        indexer.create_index()
+        indexer.add_texts(make_corpus(args.docs, seed=args.seed))
+        if args.quantization:
+            client.update_collection(
+                collection_name,
+                quantization_config=rest.ScalarQuantization(
+                    scalar=rest.ScalarQuantizationConfig(type=rest.ScalarType.INT8, always_ram=True)
+                )
+            )
+            ops.wait_until_green(collection_name)
+
+    rescore = [None, True, False] if args.quantization or args.oversampling else [None]
+    oversampling = [None] + args.oversampling
+    grid = search_param_grid(hnsw_ef=args.ef, rescore=rescore, oversampling=oversampling)
+    evaluator = RecallEvaluator(indexer, k=args.k, ground_truth=args.ground_truth, repeats=args.repeats)
+    try:
+        results = evaluator.run(grid, num_queries=args.queries, seed=args.seed)
+    finally:
+        if not args.collection:
+            ops.delete_collection(collection_name)
+
+    print(format_table(results, args.k))
+    if args.target_recall is not None:
+        best = cheapest_config(results, args.target_recall)
+        print(f"\n满足 recall@{args.k} >= {args.target_recall} 的最低延迟配置：{best['config'] if best else '无'}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "k": args.k,
+                "environment": environment(),
+                "results": [{key: value for key, value in row.items() if key != "params"} for row in results]
+            }, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
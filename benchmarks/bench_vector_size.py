@@ -0,0 +1,170 @@
+"""
+向量维度截断与存储类型的召回率-体积基准测试。
+
+以完整 float32 向量的精确检索结果为基准，计算不同输出维度和存储类型下的 recall@k
+以及每个向量占用的字节数，用于选择 TextEmbedding 的 output_dim 和 datatype。
+
+示例：
+    python benchmarks/bench_vector_size.py
+    python benchmarks/bench_vector_size.py --model BAAI/bge-large-zh-v1.5 --corpus titles.txt
+"""
+from typing import List, Dict
+import argparse
+import json
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.qdrant_utils.embeddings import SUPPORTED_DATATYPES, postprocess_vectors, to_query_vector
+
+BYTES_PER_VALUE = {"float32": 4, "float16": 2, "uint8": 1}
+
+
+def synthetic_vectors(num_docs: int, num_queries: int, dim: int, seed: int) -> tuple:
+    """
+    生成方差逐维衰减的模拟向量，近似真实模型前几维信息量更大的分布。
+
+    参数：
+        num_docs: 文档数量
+        num_queries: 查询数量
+        dim: 向量维度
+        seed: 随机种子
+
+    返回：
+        tuple: (文档向量矩阵, 查询向量矩阵)
+    """
+    rng = np.random.default_rng(seed)
+    scales = 1.0 / np.sqrt(np.arange(1, dim + 1))
+    docs = rng.standard_normal((num_docs, dim)) * scales
+    picked = rng.choice(num_docs, size=num_queries, replace=False)
+    queries = docs[picked] + rng.standard_normal((num_queries, dim)) * scales * 0.5
+    return docs.astype(np.float32), queries.astype(np.float32)
+
+
+def model_vectors(model_name: str, corpus: str, num_queries: int, seed: int) -> tuple:
+    """
+    使用真实模型生成完整维度的 float32 向量。
+
+    参数：
+        model_name: 模型名称
+        corpus: 语料文件路径，每行一个文本
+        num_queries: 从语料中抽取的查询数量
+        seed: 随机种子
+
+    返回：
+        tuple: (文档向量矩阵, 查询向量矩阵)
+    """
+    from src.qdrant_utils.embeddings import TransformerEmbedding
+
+    with open(corpus, encoding="utf-8") as f:
+        texts = [line.strip() for line in f if line.strip()]
+    model = TransformerEmbedding(model_name)
+    docs = np.stack(model.generate_vector_batched(texts, batch_size=64))
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(len(texts), size=min(num_queries, len(texts)), replace=False)
+    return docs, docs[picked]
+
+
+def top_k(docs: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """
+    余弦相似度精确检索。
+
+    参数：
+        docs: 文档向量矩阵
+        queries: 查询向量矩阵
+        k: 返回数量
+
+    返回：
+        np.ndarray: 每个查询的前 k 个文档下标
+    """
+    docs = docs.astype(np.float32)
+    queries = queries.astype(np.float32)
+    docs = docs / np.maximum(np.linalg.norm(docs, axis=1, keepdims=True), 1e-12)
+    queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    scores = queries @ docs.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    """
+    计算 recall@k。
+
+    参数：
+        truth: 基准结果下标
+        found: 待评估结果下标
+
+    返回：
+        float: 平均召回率
+    """
+    hits = [len(set(t) & set(f)) / len(t) for t, f in zip(truth, found)]
+    return float(np.mean(hits))
+
+
+def run(docs: np.ndarray, queries: np.ndarray, dims: List[int], k: int) -> List[Dict]:
+    """
+    对每组输出维度和存储类型计算召回率与向量体积。
+
+    文档向量按写入时的方式转换为存储类型；查询向量截断后以浮点数经 to_query_vector 转换，
+    与索引管理器搜索时发送的查询向量一致。
+
+    参数：
+        docs: 完整维度的文档向量矩阵
+        queries: 完整维度的查询向量矩阵
+        dims: 待评估的输出维度列表
+        k: recall@k 的 k
+
+    返回：
+        List[Dict]: 每组配置的结果
+    """
+    truth = top_k(docs, queries, k)
+    results = []
+    for dim in dims:
+        for datatype in SUPPORTED_DATATYPES:
+            stored_docs = postprocess_vectors(docs, dim, datatype)
+            float_queries = postprocess_vectors(queries, dim)
+            sent_queries = np.array([to_query_vector(query, datatype) for query in float_queries])
+            results.append({
+                "dim": dim,
+                "datatype": datatype,
+                "bytes_per_vector": dim * BYTES_PER_VALUE[datatype],
+                f"recall@{k}": round(recall_at_k(truth, top_k(stored_docs, sent_queries, k)), 4)
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量维度与存储类型的召回率-体积基准测试")
+    parser.add_argument("--model", help="HuggingFace 模型名称，不指定时使用模拟向量")
+    parser.add_argument("--corpus", help="语料文件，每行一个文本（与 --model 一起使用）")
+    parser.add_argument("--num-docs", type=int, default=20000, help="模拟文档数量")
+    parser.add_argument("--num-queries", type=int, default=200, help="查询数量")
+    parser.add_argument("--full-dim", type=int, default=1024, help="模拟向量的完整维度")
+    parser.add_argument("--dims", type=int, nargs="+", default=[1024, 768, 512, 256, 128])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    if args.model:
+        if not args.corpus:
+            parser.error("--model 需要同时指定 --corpus")
+        docs, queries = model_vectors(args.model, args.corpus, args.num_queries, args.seed)
+    else:
+        docs, queries = synthetic_vectors(args.num_docs, args.num_queries, args.full_dim, args.seed)
+
+    dims = [d for d in args.dims if d <= docs.shape[1]]
+    results = run(docs, queries, dims, args.k)
+
+    print(f"{'dim':>6} {'datatype':>9} {'bytes':>7} {'recall@' + str(args.k):>10}")
+    for row in results:
+        print(f"{row['dim']:>6} {row['datatype']:>9} {row['bytes_per_vector']:>7} {row[f'recall@{args.k}']:>10.4f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"k": args.k, "num_docs": len(docs), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
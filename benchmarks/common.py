@@ -0,0 +1,135 @@
+"""
+基准测试的公共工具：离线小模型、模拟语料、计时与统计。
+"""
+from typing import List, Dict, Any
+import os
+import platform
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.qdrant_utils.embeddings import TransformerEmbedding
+
+# 模拟语料使用的字符集，取自常见网文标题用字
+CHARSET = (
+    "重生之都市修仙我在界开网店真聊天群斗破苍穹完美世凡人传遮天是大明星最强狂兵超级战神"
+    "万古帝尊剑来雪中悍刀行诡秘主宰全职高手庆余年将夜盗墓笔记鬼吹灯武动乾坤元尊圣墟牧神记"
+)
+SPECIAL_TOKENS = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+
+
+def build_tiny_embedding(
+    dim: int = 64,
+    num_layers: int = 2,
+    seed: int = 0,
+    cache_dir: str = None
+) -> TransformerEmbedding:
+    """
+    构建随机权重的小型 BERT 向量模型，不需要网络。
+
+    模型与分词器先保存到本地目录，再通过 TransformerEmbedding 加载，
+    与真实模型走完全相同的代码路径。
+
+    参数：
+        dim: 隐藏层维度（即向量维度）
+        num_layers: Transformer 层数
+        seed: 随机种子
+        cache_dir: 模型保存目录，默认使用临时目录
+
+    返回：
+        TransformerEmbedding: 向量模型
+    """
+    import torch
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    path = os.path.join(cache_dir or tempfile.gettempdir(), f"qdrant_utils_tiny_bert_{dim}_{num_layers}_{seed}")
+    if not os.path.exists(os.path.join(path, "config.json")):
+        os.makedirs(path, exist_ok=True)
+        vocab_file = os.path.join(path, "vocab.txt")
+        with open(vocab_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(SPECIAL_TOKENS + sorted(set(CHARSET))) + "\n")
+        tokenizer = BertTokenizerFast(vocab_file)
+        torch.manual_seed(seed)
+        config = BertConfig(
+            vocab_size=len(tokenizer),
+            hidden_size=dim,
+            num_hidden_layers=num_layers,
+            num_attention_heads=max(1, dim // 32),
+            intermediate_size=dim * 2,
+            max_position_embeddings=512
+        )
+        BertModel(config).save_pretrained(path)
+        tokenizer.save_pretrained(path)
+    return TransformerEmbedding(path)
+
+
+def make_corpus(num_texts: int, min_len: int = 4, max_len: int = 24, seed: int = 0) -> List[str]:
+    """
+    生成模拟标题语料。
+
+    参数：
+        num_texts: 文本数量
+        min_len: 最短字符数
+        max_len: 最长字符数
+        seed: 随机种子
+
+    返回：
+        List[str]: 文本列表
+    """
+    rng = np.random.default_rng(seed)
+    chars = np.array(list(CHARSET))
+    lengths = rng.integers(min_len, max_len + 1, size=num_texts)
+    return ["".join(rng.choice(chars, size=length)) for length in lengths]
+
+
+def latency_stats(latencies: List[float]) -> Dict[str, float]:
+    """
+    汇总延迟样本。
+
+    参数：
+        latencies: 延迟样本（秒）
+
+    返回：
+        Dict: p50、p99 和平均延迟（毫秒）
+    """
+    samples = np.asarray(latencies) * 1000.0
+    return {
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p99_ms": round(float(np.percentile(samples, 99)), 3),
+        "mean_ms": round(float(samples.mean()), 3)
+    }
+
+
+class Stopwatch:
+    """记录一段代码耗时的上下文管理器"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.start
+        return False
+
+
+def environment() -> Dict[str, Any]:
+    """
+    记录运行环境，便于对比不同机器上的结果。
+
+    返回：
+        Dict: 运行环境信息
+    """
+    import torch
+    from importlib.metadata import version
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "qdrant_client": version("qdrant-client"),
+        "cpu_count": os.cpu_count()
+    }
@@ -0,0 +1,60 @@
+"""
+对比两次基准测试结果，找出吞吐量下降或尾延迟上升的配置。
+
+示例：
+    python benchmarks/compare.py baseline.json results.json --threshold 0.1
+"""
+from typing import Dict, Tuple
+import argparse
+import json
+import sys
+
+KEY_FIELDS = ("benchmark", "path", "dim", "batch_size", "concurrency")
+
+
+def load(path: str) -> Dict[Tuple, Dict]:
+    """
+    读取结果文件并按配置建立索引。
+
+    参数：
+        path: run_benchmarks.py 输出的 JSON 文件
+
+    返回：
+        Dict: 配置元组到结果的映射
+    """
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    return {tuple(row.get(k) for k in KEY_FIELDS): row for row in report["results"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比两次基准测试结果")
+    parser.add_argument("baseline", help="基准结果文件")
+    parser.add_argument("current", help="当前结果文件")
+    parser.add_argument("--threshold", type=float, default=0.1, help="判定为退化的相对变化比例")
+    args = parser.parse_args()
+
+    baseline = load(args.baseline)
+    current = load(args.current)
+    regressions = 0
+    for key in sorted(set(baseline) & set(current), key=str):
+        old, new = baseline[key], current[key]
+        metric = "docs_per_sec" if "docs_per_sec" in old else "qps"
+        throughput_change = new[metric] / old[metric] - 1.0 if old[metric] else 0.0
+        p99_change = new["p99_ms"] / old["p99_ms"] - 1.0 if old["p99_ms"] else 0.0
+        regressed = throughput_change < -args.threshold or p99_change > args.threshold
+        regressions += regressed
+        label = " ".join(f"{k}={v}" for k, v in zip(KEY_FIELDS, key))
+        print(
+            f"{'退化' if regressed else '正常'}  {label}  "
+            f"{metric} {throughput_change:+.1%}  p99 {p99_change:+.1%}"
+        )
+
+    missing = set(baseline) ^ set(current)
+    if missing:
+        print(f"有 {len(missing)} 个配置只出现在其中一个文件中")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
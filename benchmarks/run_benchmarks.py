@@ -0,0 +1,258 @@
+"""
+写入与查询吞吐量基准测试。
+
+默认使用随机权重的小型 BERT 模型和 Qdrant 本地内存模式，不需要网络；
+指定 --url 时连接本地 Qdrant 服务。按向量维度、批次大小和并发数组合运行，
+结果以 JSON 输出，可用 compare.py 与历史结果对比。
+
+示例：
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --url http://localhost:6333 --dims 256 1024 --docs 20000
+"""
+from typing import List, Dict, Any
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from common import build_tiny_embedding, make_corpus, latency_stats, Stopwatch, environment
+
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+
+
+def make_client(url: str) -> QdrantClient:
+    """
+    创建同步客户端。
+
+    参数：
+        url: Qdrant 服务地址，为空时使用本地内存模式
+
+    返回：
+        QdrantClient: 同步客户端
+    """
+    return QdrantClient(url=url) if url else QdrantClient(":memory:")
+
+
+def make_async_client(url: str) -> AsyncQdrantClient:
+    """
+    创建异步客户端。异步客户端的连接池绑定在创建它的事件循环上，
+    每次 asyncio.run 都需要在循环内部重新创建。
+
+    参数：
+        url: Qdrant 服务地址，为空时使用本地内存模式
+
+    返回：
+        AsyncQdrantClient: 异步客户端
+    """
+    return AsyncQdrantClient(url=url) if url else AsyncQdrantClient(":memory:")
+
+
+def check(condition: bool, message: str) -> None:
+    """
+    校验被计时的操作确实成功。索引管理器出错时返回 False 或空结果而不抛出异常，
+    不校验就会把错误路径的耗时记为结果。
+
+    参数：
+        condition: 校验条件
+        message: 失败时的错误信息
+    """
+    if not condition:
+        raise RuntimeError(message)
+
+
+def bench_sync(model, client, corpus: List[str], queries: List[str], batch_size: int) -> List[Dict[str, Any]]:
+    """
+    同步路径：add_texts 写入、search 单条查询、search_batch 批量查询。
+
+    参数：
+        model: 向量模型
+        client: 同步客户端
+        corpus: 写入的文本
+        queries: 查询文本
+        batch_size: 每次写入与批量查询的文本数量
+
+    返回：
+        List[Dict]: 结果列表
+    """
+    collection_name = f"bench_{uuid.uuid4().hex[:8]}"
+    ops = QdrantOperations(client)
+    indexer = TextIndexer(model, ops, collection_name, dedup=False)
+    indexer.create_index(force=True)
+    results = []
+    try:
+        latencies = []
+        with Stopwatch() as total:
+            for start in range(0, len(corpus), batch_size):
+                batch = corpus[start:start + batch_size]
+                with Stopwatch() as watch:
+                    success = indexer.add_texts(batch, ids=list(range(start, start + len(batch))))
+                check(success, f"同步写入第 {start} 条起的批次失败")
+                latencies.append(watch.elapsed)
+        results.append({
+            "benchmark": "ingest", "path": "sync", "concurrency": 1,
+            "docs_per_sec": round(len(corpus) / total.elapsed, 2), **latency_stats(latencies)
+        })
+
+        latencies = []
+        with Stopwatch() as total:
+            for query in queries:
+                with Stopwatch() as watch:
+                    hits = indexer.search(query, limit=10, score_threshold=-1.0)
+                check(len(hits) > 0, f"同步搜索没有返回结果：{query}")
+                latencies.append(watch.elapsed)
+        results.append({
+            "benchmark": "search", "path": "sync", "concurrency": 1,
+            "qps": round(len(queries) / total.elapsed, 2), **latency_stats(latencies)
+        })
+
+        latencies = []
+        with Stopwatch() as total:
+            for start in range(0, len(queries), batch_size):
+                with Stopwatch() as watch:
+                    batch_hits = indexer.search_batch(queries[start:start + batch_size], limit=10, score_threshold=-1.0)
+                check(len(batch_hits) > 0 and all(batch_hits), "同步批量搜索没有返回结果")
+                latencies.append(watch.elapsed)
+        results.append({
+            "benchmark": "search_batch", "path": "sync", "concurrency": 1,
+            "qps": round(len(queries) / total.elapsed, 2), **latency_stats(latencies)
+        })
+    finally:
+        ops.delete_collection(collection_name)
+    return results
+
+
+async def bench_async(
+    model,
+    url: str,
+    corpus: List[str],
+    queries: List[str],
+    batch_size: int,
+    concurrency: int
+) -> List[Dict[str, Any]]:
+    """
+    异步路径：并发 add_texts_batch 写入、并发 search 查询、search_batch 批量查询。
+
+    参数：
+        model: 向量模型
+        url: Qdrant 服务地址，为空时使用本地内存模式；客户端在本次事件循环内创建并关闭
+        corpus: 写入的文本
+        queries: 查询文本
+        batch_size: 每次写入与批量查询的文本数量
+        concurrency: 并发任务数
+
+    返回：
+        List[Dict]: 结果列表
+    """
+    collection_name = f"bench_{uuid.uuid4().hex[:8]}"
+    client = make_async_client(url)
+    ops = AsyncQdrantOperations(client)
+    indexer = AsyncTextIndexer(model, ops, collection_name, dedup=False)
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def timed(coro, latencies):
+        async with semaphore:
+            start = time.perf_counter()
+            result = await coro
+            latencies.append(time.perf_counter() - start)
+            return result
+
+    try:
+        await indexer.create_index(force=True)
+        latencies = []
+        with Stopwatch() as total:
+            outcomes = await asyncio.gather(*[
+                timed(indexer.add_texts_batch(
+                    corpus[start:start + batch_size],
+                    batch_size=batch_size,
+                    ids=list(range(start, min(start + batch_size, len(corpus))))
+                ), latencies)
+                for start in range(0, len(corpus), batch_size)
+            ])
+        check(all(outcomes), "异步写入存在失败的批次")
+        results.append({
+            "benchmark": "ingest", "path": "async", "concurrency": concurrency,
+            "docs_per_sec": round(len(corpus) / total.elapsed, 2), **latency_stats(latencies)
+        })
+
+        latencies = []
+        with Stopwatch() as total:
+            outcomes = await asyncio.gather(*[
+                timed(indexer.search(query, limit=10, score_threshold=-1.0), latencies) for query in queries
+            ])
+        check(all(outcomes), "异步搜索存在没有返回结果的查询")
+        results.append({
+            "benchmark": "search", "path": "async", "concurrency": concurrency,
+            "qps": round(len(queries) / total.elapsed, 2), **latency_stats(latencies)
+        })
+
+        latencies = []
+        with Stopwatch() as total:
+            outcomes = await asyncio.gather(*[
+                timed(indexer.search_batch(
+                    queries[start:start + batch_size], limit=10, score_threshold=-1.0, batch_size=batch_size
+                ), latencies)
+                for start in range(0, len(queries), batch_size)
+            ])
+        check(all(outcomes) and all(all(hits) for hits in outcomes), "异步批量搜索存在没有返回结果的查询")
+        results.append({
+            "benchmark": "search_batch", "path": "async", "concurrency": concurrency,
+            "qps": round(len(queries) / total.elapsed, 2), **latency_stats(latencies)
+        })
+    finally:
+        await ops.delete_collection(collection_name)
+        await client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="写入与查询吞吐量基准测试")
+    parser.add_argument("--url", help="Qdrant 服务地址，不指定时使用本地内存模式")
+    parser.add_argument("--docs", type=int, default=2000, help="写入文本数量")
+    parser.add_argument("--queries", type=int, default=200, help="查询数量")
+    parser.add_argument("--dims", type=int, nargs="+", default=[64, 256], help="向量维度")
+    parser.add_argument("--layers", type=int, default=2, help="小模型的 Transformer 层数")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 64], help="批次大小")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8], help="异步并发数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.docs, seed=args.seed)
+    queries = make_corpus(args.queries, seed=args.seed + 1)
+    sync_client = make_client(args.url)
+
+    results = []
+    for dim in args.dims:
+        model = build_tiny_embedding(dim=dim, num_layers=args.layers, seed=args.seed)
+        for batch_size in args.batch_sizes:
+            rows = bench_sync(model, sync_client, corpus, queries, batch_size)
+            for concurrency in args.concurrency:
+                rows += asyncio.run(bench_async(model, args.url, corpus, queries, batch_size, concurrency))
+            for row in rows:
+                row.update({"dim": dim, "batch_size": batch_size})
+                throughput = row.get("docs_per_sec", row.get("qps"))
+                print(
+                    f"{row['benchmark']:>12} {row['path']:>5} dim={dim:<5} batch={batch_size:<4} "
+                    f"conc={row['concurrency']:<3} {throughput:>10.1f}/s p50={row['p50_ms']:.2f}ms p99={row['p99_ms']:.2f}ms"
+                )
+            results.extend(rows)
+
+    report = {
+        "environment": environment(),
+        "config": vars(args),
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
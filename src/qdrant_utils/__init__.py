@@ -3,18 +3,74 @@ Qdrant 工具模块。
 """
 from .client import QdrantClientConfig
 from .operations import QdrantOperations
-from .embeddings import TextEmbedding, BGEEmbedding, Text2VecEmbedding
+from .embeddings import TextEmbedding, TransformerEmbedding, BGEEmbedding, Text2VecEmbedding
 from .indexer import TextIndexer
 from .async_operations import AsyncQdrantOperations
 from .async_indexer import AsyncTextIndexer
+from .dedup import DedupResult, deduplicate_texts
+from .chunking import TextChunker
+from .metrics import Metrics, InMemoryMetrics, PrometheusMetrics, OpenTelemetryMetrics
+from .retry import RetryPolicy, FailedBatchJournal
+from .jobs import IngestCheckpoint, IngestJob, AsyncIngestJob
+from .adaptive import AdaptiveBatchSizer
+from .sparse import SparseEncoder, BM25SparseEncoder
+from .rerank import Reranker, CrossEncoderReranker
+from .routing import TenantRouter, AsyncTenantRouter, FanOutSearcher, AsyncFanOutSearcher
+from .export import CollectionExporter, AsyncCollectionExporter
+from .migration import EmbeddingMigration, AsyncEmbeddingMigration
+from .cache import SearchResultCache
+from .evaluation import RecallEvaluator
+from .docstore import DocumentStore, SQLiteDocumentStore
+from .hedging import HedgePolicy
+from .scheduler import PriorityScheduler, SchedulerOverloaded
+from .sharding import CollectionProfile
+from .ingest import ColumnMapping, ParallelFileReader, ThroughputReporter, ingest_files
 
 __all__ = [
     'QdrantClientConfig',
     'QdrantOperations',
     'TextEmbedding',
+    'TransformerEmbedding',
     'BGEEmbedding',
     'Text2VecEmbedding',
     'TextIndexer',
     'AsyncQdrantOperations',
     'AsyncTextIndexer',
+    'DedupResult',
+    'deduplicate_texts',
+    'TextChunker',
+    'Metrics',
+    'InMemoryMetrics',
+    'PrometheusMetrics',
+    'OpenTelemetryMetrics',
+    'RetryPolicy',
+    'FailedBatchJournal',
+    'IngestCheckpoint',
+    'IngestJob',
+    'AsyncIngestJob',
+    'AdaptiveBatchSizer',
+    'SparseEncoder',
+    'BM25SparseEncoder',
+    'Reranker',
+    'CrossEncoderReranker',
+    'TenantRouter',
+    'AsyncTenantRouter',
+    'FanOutSearcher',
+    'AsyncFanOutSearcher',
+    'CollectionExporter',
+    'AsyncCollectionExporter',
+    'EmbeddingMigration',
+    'AsyncEmbeddingMigration',
+    'SearchResultCache',
+    'RecallEvaluator',
+    'DocumentStore',
+    'SQLiteDocumentStore',
+    'HedgePolicy',
+    'PriorityScheduler',
+    'SchedulerOverloaded',
+    'CollectionProfile',
+    'ColumnMapping',
+    'ParallelFileReader',
+    'ThroughputReporter',
+    'ingest_files',
 ] 
\ No newline at end of file
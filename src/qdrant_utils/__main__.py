@@ -0,0 +1,8 @@
+"""
+python -m qdrant_utils 的入口。
+"""
+import sys
+from .cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+自适应批次大小模块，根据实测延迟、内存占用和服务端错误调整批次大小。
+"""
+from typing import Optional
+import os
+import threading
+
+
+def current_rss_mb() -> Optional[float]:
+    """
+    获取当前进程的常驻内存（MB）。
+
+    优先读取 /proc/self/statm；其他平台退化为 resource 模块给出的峰值常驻内存，
+    都不可用时返回 None。
+
+    返回：
+        Optional[float]: 常驻内存，单位 MB
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 以字节为单位，Linux 以 KB 为单位
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except (ImportError, OSError):
+        return None
+
+
+class AdaptiveBatchSizer:
+    """
+    以目标延迟为导向的 AIMD 批次大小控制器。
+
+    每个批次完成后调用 record 上报耗时：平滑后的批次延迟低于目标的 headroom 比例时
+    加性增大批次；高于目标、上报失败或常驻内存超过上限时乘性减小批次。
+    批次大小始终保持在 [min_size, max_size] 之间，线程安全。
+    """
+
+    def __init__(
+        self,
+        initial: int = 32,
+        min_size: int = 1,
+        max_size: int = 1024,
+        target_latency: float = 1.0,
+        increase_step: Optional[int] = None,
+        decrease_factor: float = 0.5,
+        headroom: float = 0.8,
+        max_rss_mb: Optional[float] = None,
+        smoothing: float = 0.3
+    ):
+        """
+        初始化控制器。
+
+        参数：
+            initial: 初始批次大小
+            min_size: 批次大小下限
+            max_size: 批次大小上限
+            target_latency: 单个批次的目标耗时（秒）
+            increase_step: 每次增大的数量，默认为 initial 的四分之一（至少为 1）
+            decrease_factor: 每次减小时的乘数
+            headroom: 平滑延迟低于 target_latency * headroom 时才增大
+            max_rss_mb: 常驻内存上限（MB），超过时减小批次
+            smoothing: 延迟指数平滑系数，越大越关注最近的批次
+        """
+        if not 1 <= min_size <= max_size:
+            raise ValueError("批次大小范围无效")
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor 必须在 0 和 1 之间")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_latency = target_latency
+        self.increase_step = increase_step or max(1, initial // 4)
+        self.decrease_factor = decrease_factor
+        self.headroom = headroom
+        self.max_rss_mb = max_rss_mb
+        self.smoothing = smoothing
+        self._size = min(max(initial, min_size), max_size)
+        self._latency: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        """当前批次大小"""
+        return self._size
+
+    def record(self, batch_size: int, latency: float, success: bool = True) -> int:
+        """
+        上报一个批次的结果并调整批次大小。
+
+        参数：
+            batch_size: 本批次实际大小
+            latency: 本批次耗时（秒）
+            success: 本批次是否成功
+
+        返回：
+            int: 调整后的批次大小
+        """
+        with self._lock:
+            if not success:
+                return self._decrease()
+            if self.max_rss_mb is not None:
+                rss = current_rss_mb()
+                if rss is not None and rss > self.max_rss_mb:
+                    return self._decrease()
+
+            # 按当前批次大小换算延迟，避免尾部的小批次拉低估计
+            if batch_size > 0 and batch_size < self._size:
+                latency = latency * self._size / batch_size
+            if self._latency is None:
+                self._latency = latency
+            else:
+                self._latency = self.smoothing * latency + (1 - self.smoothing) * self._latency
+
+            if self._latency > self.target_latency:
+                return self._decrease()
+            if self._latency < self.target_latency * self.headroom:
+                previous = self._size
+                self._size = min(self.max_size, self._size + self.increase_step)
+                if previous:
+                    self._latency *= self._size / previous
+            return self._size
+
+    def _decrease(self) -> int:
+        previous = self._size
+        self._size = max(self.min_size, int(self._size * self.decrease_factor))
+        if self._latency is not None:
+            self._latency *= self._size / previous
+        return self._size
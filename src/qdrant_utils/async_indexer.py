@@ -1,10 +1,26 @@
 """
 异步索引管理器模块。
 """
-from typing import List, Dict, Any, Optional
+from typing import Awaitable, Callable, List, Dict, Any, Optional, Union
 import asyncio
-from .embeddings import TextEmbedding
+import contextlib
+import copy
+import os
+import tempfile
+import time
+from qdrant_client.http.models import Filter, HasIdCondition
+from .embeddings import TextEmbedding, to_query_vector, generate_vectors_adaptive
 from .async_operations import AsyncQdrantOperations
+from .dedup import deduplicate_texts
+from .chunking import TextChunker, chunk_point_id
+from .metrics import Metrics, NULL_METRICS
+from .adaptive import AdaptiveBatchSizer
+from .sparse import SparseEncoder, SPARSE_VECTOR_NAME
+from .rerank import Reranker
+from .docstore import DocumentStore
+from .sharding import CollectionProfile, ShardKey
+from .indexer import versioned_collection_name
+from .scheduler import PriorityScheduler, SchedulerOverloaded, QUERY, INGEST
 
 class AsyncTextIndexer:
     """异步文本索引管理器类"""
@@ -13,7 +29,21 @@ class AsyncTextIndexer:
         self,
         embedding_model: TextEmbedding,
         operations: AsyncQdrantOperations,
-        collection_name: str
+        collection_name: str,
+        dedup: bool = True,
+        chunk_size: int = 510,
+        chunk_overlap: int = 64,
+        metrics: Optional[Metrics] = None,
+        embed_batch: Optional[AdaptiveBatchSizer] = None,
+        upsert_batch: Optional[AdaptiveBatchSizer] = None,
+        sparse_encoder: Optional[SparseEncoder] = None,
+        reranker: Optional[Reranker] = None,
+        rerank_candidates: int = 50,
+        doc_store: Optional[DocumentStore] = None,
+        scheduler: Optional[PriorityScheduler] = None,
+        io_scheduler: Optional[PriorityScheduler] = None,
+        ingest_micro_batch: int = 32,
+        profile: Optional[CollectionProfile] = None
     ):
         """
         初始化异步索引管理器。
@@ -22,10 +52,284 @@ class AsyncTextIndexer:
             embedding_model: 文本向量生成模型
             operations: 异步 Qdrant 操作类实例
             collection_name: 集合名称
+            dedup: 是否在向量化前合并重复文本
+            chunk_size: 长文档切分时每个片段的最大 token 数
+            chunk_overlap: 相邻片段重叠的 token 数
+            metrics: 可选的指标记录器，默认不记录
+            embed_batch: 可选的向量化微批次大小控制器，设置后按实测耗时调整微批次
+            upsert_batch: 可选的上传批次大小控制器，设置后替代 add_texts_batch 的固定批次大小
+            sparse_encoder: 可选的稀疏向量编码器，设置后同时写入稀疏向量并支持 search_hybrid
+            reranker: 可选的重排序模型，设置后 search 与 search_batch 先多召回候选再重新排序
+            rerank_candidates: 每个查询交给重排序模型的候选数量
+            doc_store: 可选的外部文档存储，设置后全文只写入文档存储，载荷中只保留附加字段，
+                搜索结果在返回前批量补全 title，读写在线程池中执行
+            scheduler: 可选的向量化调度器，设置后查询与写入的向量化都在线程池中执行，按优先级占用槽位，
+                写入按微批次申请槽位，查询最多等待一个写入微批次
+            io_scheduler: 可选的 Qdrant 请求调度器，设置后搜索与上传请求按优先级占用连接槽位
+            ingest_micro_batch: 未设置 embed_batch 时，写入向量化的微批次大小
+            profile: 可选的集群拓扑配置，创建集合时使用；设置了 shard_key_field 时写入按载荷中的分片键分组
         """
         self.embedding_model = embedding_model
         self.operations = operations
         self.collection_name = collection_name
+        self.dedup = dedup
+        # 最近一次向量化的去重比例
+        self.last_dedup_ratio = 0.0
+        self.chunker = TextChunker(
+            getattr(embedding_model, "tokenizer", None),
+            chunk_size=chunk_size,
+            overlap=chunk_overlap
+        )
+        self.metrics = metrics or NULL_METRICS
+        self.embed_batch = embed_batch
+        self.upsert_batch = upsert_batch
+        self.sparse_encoder = sparse_encoder
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
+        self.doc_store = doc_store
+        self.scheduler = scheduler
+        self.io_scheduler = io_scheduler
+        self.ingest_micro_batch = ingest_micro_batch
+        self.profile = profile
+    
+    def _slot(self, scheduler: Optional[PriorityScheduler], priority: str, deadline: Optional[float] = None):
+        """
+        返回占用调度器槽位的异步上下文管理器，未设置调度器时不做限制。
+        
+        Args:
+            scheduler: 调度器
+            priority: 优先级类别
+            deadline: 可选的截止时间（time.monotonic），等待槽位超过截止时间时抛出 asyncio.TimeoutError
+        
+        Returns:
+            异步上下文管理器
+        """
+        if scheduler is None:
+            return contextlib.nullcontext()
+        return scheduler.slot(priority, timeout=self._remaining(deadline))
+    
+    async def _embed_query(self, embed: Callable, texts: List[str], deadline: Optional[float] = None) -> List[Any]:
+        """
+        为查询生成向量。设置了 scheduler 时以查询优先级占用槽位并在线程池中执行，否则直接执行。
+        
+        Args:
+            embed: 向量化函数
+            texts: 查询文本列表
+            deadline: 可选的截止时间
+        
+        Returns:
+            List: 向量列表
+        """
+        if self.scheduler is None:
+            return embed(texts)
+        loop = asyncio.get_running_loop()
+        async with self._slot(self.scheduler, QUERY, deadline):
+            return await loop.run_in_executor(None, embed, texts)
+    
+    async def _generate_vectors_ingest(self, texts: List[str]) -> List[Any]:
+        """
+        为写入生成向量。按微批次向量化，当前微批次前向计算时下一个微批次已提交分词。
+        设置了 scheduler 时每个微批次在线程池中执行并单独申请写入槽位，微批次之间把槽位让给等待中的查询。
+        
+        Args:
+            texts: 文本列表
+        
+        Returns:
+            List: 与文本一一对应的向量列表
+        """
+        if self.scheduler is None:
+            return self._generate_vectors(texts, batch_size=self.ingest_micro_batch)
+        result = deduplicate_texts(texts) if self.dedup else None
+        unique_texts = result.unique_texts if result else texts
+        model = self.embedding_model
+        loop = asyncio.get_running_loop()
+        vectors = []
+        with self.metrics.timer("embed"):
+            position = 0
+            batch = unique_texts[:self._ingest_batch_size()]
+            pending = model.submit_tokenize(batch) if batch else None
+            while pending is not None:
+                with self.metrics.timer("tokenize_wait"):
+                    tokens = await asyncio.wrap_future(pending)
+                position += len(batch)
+                current, batch = batch, unique_texts[position:position + self._ingest_batch_size()]
+                pending = model.submit_tokenize(batch) if batch else None
+                async with self.scheduler.slot(INGEST):
+                    start = time.perf_counter()
+                    vectors.extend(await loop.run_in_executor(None, model.embed_tokens, tokens))
+                if self.embed_batch:
+                    self.embed_batch.record(len(current), time.perf_counter() - start)
+                    self.metrics.observe("batch_size", len(current), stage="embed_adaptive")
+        if result is None:
+            return vectors
+        self.last_dedup_ratio = result.ratio
+        self.metrics.incr("cache_hits", result.total - result.unique, cache="dedup")
+        return result.scatter(vectors)
+    
+    def _ingest_batch_size(self) -> int:
+        """写入向量化的微批次大小"""
+        return self.embed_batch.size if self.embed_batch else self.ingest_micro_batch
+    
+    async def _upsert(self, points: List[Dict]) -> bool:
+        """
+        上传一批点数据，设置了 io_scheduler 时以写入优先级占用连接槽位。
+        
+        Args:
+            points: 点数据列表
+        
+        Returns:
+            bool: 是否上传成功
+        """
+        async with self._slot(self.io_scheduler, INGEST):
+            return await self.operations.upsert_points_batch(
+                collection_name=self.collection_name,
+                points=points
+            )
+    
+    def _embed(self, texts: List[str], batch_size: Optional[int] = None) -> List[Any]:
+        """
+        生成文本向量，不做去重。
+        
+        Args:
+            texts: 文本列表
+            batch_size: 向量化微批次大小，为 None 时一次性向量化；设置了 embed_batch 时忽略
+        
+        Returns:
+            List: 向量列表
+        """
+        if not texts:
+            return []
+        if self.embed_batch is None:
+            if batch_size:
+                return self.embedding_model.generate_vector_batched(texts, batch_size)
+            return self.embedding_model.generate_vector(texts)
+        
+        # 按控制器给出的大小逐个微批次向量化，下一个微批次的分词与当前微批次的前向计算重叠
+        return generate_vectors_adaptive(self.embedding_model, texts, self.embed_batch, self.metrics)
+    
+    def _generate_vectors(self, texts: List[str], batch_size: Optional[int] = None) -> List[Any]:
+        """
+        生成文本向量，开启去重时每个唯一文本只向量化一次。
+        
+        Args:
+            texts: 文本列表
+            batch_size: 向量化微批次大小，为 None 时一次性向量化
+        
+        Returns:
+            List: 与文本一一对应的向量列表
+        """
+        with self.metrics.timer("embed"):
+            if not self.dedup:
+                return self._embed(texts, batch_size)
+            result = deduplicate_texts(texts)
+            vectors = self._embed(result.unique_texts, batch_size)
+        self.last_dedup_ratio = result.ratio
+        self.metrics.incr("cache_hits", result.total - result.unique, cache="dedup")
+        return result.scatter(vectors)
+    
+    def _build_points(
+        self,
+        vectors: List[Any],
+        texts: List[str],
+        ids: Optional[List[Union[int, str]]] = None,
+        payloads: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict]:
+        """
+        构建点数据。
+        
+        Args:
+            vectors: 向量列表
+            texts: 文本列表
+            ids: 可选的点ID列表，默认使用文本下标
+            payloads: 可选的附加载荷列表，会与 {"title": text} 合并，设置了 doc_store 时不写入 title
+        
+        Returns:
+            List[Dict]: 点数据列表
+        """
+        if ids is None:
+            ids = list(range(len(texts)))
+        with self.metrics.timer("to_list"):
+            points = [
+                {
+                    "id": id_,
+                    "vector": vector.tolist(),
+                    "payload": {
+                        **({} if self.doc_store is not None else {"title": text}),
+                        **(payloads[i] if payloads else {})
+                    }
+                }
+                for i, (id_, vector, text) in enumerate(zip(ids, vectors, texts))
+            ]
+        
+        # 同时写入稀疏向量
+        if self.sparse_encoder is not None:
+            with self.metrics.timer("sparse_encode"):
+                sparse_vectors = self.sparse_encoder.encode_documents(texts)
+            for point, sparse_vector in zip(points, sparse_vectors):
+                point["vector"] = {"": point["vector"], SPARSE_VECTOR_NAME: sparse_vector}
+        if self.profile is not None:
+            self.profile.assign_shard_keys(points)
+        return points
+    
+    def _fetch_limit(self, limit: int) -> int:
+        """
+        计算向量检索的召回数量，设置了重排序模型时多召回候选。
+        
+        Args:
+            limit: 最终返回的结果数量
+        
+        Returns:
+            int: 召回数量
+        """
+        return max(limit, self.rerank_candidates) if self.reranker else limit
+    
+    async def _rerank(self, queries: List[str], results: List[List[Dict]], limit: int) -> List[List[Dict]]:
+        """
+        在线程池中使用重排序模型对候选结果重新排序，未设置重排序模型时原样返回。
+        
+        Args:
+            queries: 查询文本列表
+            results: 与 queries 一一对应的候选结果列表
+            limit: 每个查询保留的结果数量
+        
+        Returns:
+            List[List[Dict]]: 重新排序后的结果列表
+        """
+        if self.reranker is None:
+            return results
+        loop = asyncio.get_running_loop()
+        with self.metrics.timer("rerank"):
+            return await loop.run_in_executor(None, self.reranker.rerank_batch, queries, results, limit)
+    
+    async def _store_texts(self, points: List[Dict], texts: List[str]) -> None:
+        """
+        设置了 doc_store 时在线程池中将文本写入文档存储。
+        
+        Args:
+            points: _build_points 返回的点数据列表
+            texts: 与 points 一一对应的文本列表
+        """
+        if self.doc_store is None:
+            return
+        loop = asyncio.get_running_loop()
+        with self.metrics.timer("doc_store"):
+            await loop.run_in_executor(None, self.doc_store.put_many, [point["id"] for point in points], texts)
+    
+    async def _hydrate(self, results: List[List[Dict]]) -> List[List[Dict]]:
+        """
+        设置了 doc_store 时在线程池中为搜索结果补全文本，多个查询的结果合并后只读取一次。
+        
+        Args:
+            results: 搜索结果列表的列表
+        
+        Returns:
+            List[List[Dict]]: 补全文本后的结果列表
+        """
+        if self.doc_store is None:
+            return results
+        loop = asyncio.get_running_loop()
+        with self.metrics.timer("hydrate"):
+            return await loop.run_in_executor(None, self.doc_store.hydrate, results)
     
     async def create_index(self, force: bool = False) -> bool:
         """
@@ -43,55 +347,174 @@ class AsyncTextIndexer:
         vector_size = self.embedding_model.vector_size
         return await self.operations.create_collection(
             collection_name=self.collection_name,
-            vector_size=vector_size
+            vector_size=vector_size,
+            datatype=self.embedding_model.datatype,
+            sparse_vector_name=SPARSE_VECTOR_NAME if self.sparse_encoder else None,
+            profile=self.profile
         )
     
+    async def reindex(
+        self,
+        build: Callable[["AsyncTextIndexer"], Awaitable[bool]],
+        drop_old: bool = True,
+        bulk: bool = True,
+        wait_timeout: float = 600.0
+    ) -> bool:
+        """
+        蓝绿重建索引，重建期间搜索不中断。
+        
+        collection_name 作为别名使用：数据写入新的版本化集合（{collection_name}_v{毫秒时间戳}），
+        写入完成且索引构建完毕后原子地将别名切换到新集合，再删除旧集合。build 失败时删除新集合，
+        别名仍指向旧集合。若 collection_name 当前是普通集合而不是别名，切换时需要先删除该集合
+        再创建同名别名，两步之间有短暂的不可用窗口。
+        
+        Args:
+            build: 异步写入函数，参数为指向新集合的索引管理器，返回是否写入成功
+            drop_old: 切换后是否删除旧集合
+            bulk: 写入期间是否暂停构建向量索引，写入完成后恢复
+            wait_timeout: 等待新集合完成索引构建的最长秒数
+        
+        Returns:
+            bool: 是否成功切换
+        """
+        alias = self.collection_name
+        new_collection = versioned_collection_name(alias, await self.operations.get_alias_target(alias))
+        builder = copy.copy(self)
+        builder.collection_name = new_collection
+        try:
+            if not await builder.create_index():
+                return False
+            threshold = None
+            if bulk:
+                # 未设置时使用服务端默认值
+                info = await self.operations.client.get_collection(new_collection)
+                threshold = info.config.optimizer_config.indexing_threshold or 20000
+                await self.operations.update_indexing_threshold(new_collection, 0)
+            
+            with self.metrics.timer("reindex_build"):
+                built = await build(builder)
+            if built and threshold is not None:
+                built = await self.operations.update_indexing_threshold(new_collection, threshold)
+            if not built or not await self.operations.wait_until_green(new_collection, timeout=wait_timeout):
+                print(f"重建索引失败，保留当前集合: {await self.operations.get_alias_target(alias) or alias}")
+                await self.operations.delete_collection(new_collection)
+                return False
+            
+            # 切换别名
+            old_collection = await self.operations.get_alias_target(alias)
+            if old_collection is None and await self.operations.client.collection_exists(alias):
+                await self.operations.delete_collection(alias)
+            if not await self.operations.switch_alias(alias, new_collection):
+                return False
+            if drop_old and old_collection:
+                await self.operations.delete_collection(old_collection)
+            return True
+        except Exception as e:
+            print(f"重建索引失败: {e}")
+            self.metrics.incr("errors", stage="reindex")
+            return False
+    
+    async def clone_to(
+        self,
+        new_collection: str,
+        target_operations: Optional[AsyncQdrantOperations] = None,
+        workdir: Optional[str] = None
+    ) -> Optional["AsyncTextIndexer"]:
+        """
+        通过快照将当前集合复制为新集合，不需要重新向量化和上传。
+        
+        在服务端创建快照后下载到本地临时目录，再上传到目标服务并恢复为新集合，
+        最后删除服务端的快照。collection_name 是别名时复制其指向的集合。
+        
+        Args:
+            new_collection: 新集合名称，已存在时数据被快照覆盖
+            target_operations: 目标服务的异步操作类实例，默认复制到同一服务
+            workdir: 快照文件的临时目录，默认使用系统临时目录
+        
+        Returns:
+            Optional[AsyncTextIndexer]: 指向新集合的索引管理器，失败时返回None
+        """
+        target_operations = target_operations or self.operations
+        source = await self.operations.get_alias_target(self.collection_name) or self.collection_name
+        snapshot_name = await self.operations.create_snapshot(source)
+        if snapshot_name is None:
+            return None
+        try:
+            with tempfile.TemporaryDirectory(dir=workdir) as tmpdir:
+                path = os.path.join(tmpdir, snapshot_name)
+                if not await self.operations.download_snapshot(source, snapshot_name, path):
+                    return None
+                if not await target_operations.upload_snapshot(new_collection, path):
+                    return None
+        finally:
+            await self.operations.delete_snapshot(source, snapshot_name)
+        
+        clone = copy.copy(self)
+        clone.operations = target_operations
+        clone.collection_name = new_collection
+        return clone
+    
     async def add_texts_batch(
         self,
         texts: List[str],
-        batch_size: int = 32
+        batch_size: int = 32,
+        ids: Optional[List[Union[int, str]]] = None,
+        payloads: Optional[List[Dict[str, Any]]] = None
     ) -> bool:
         """
         批量添加文本到索引
         :param texts: 文本列表
-        :param batch_size: 批处理大小
-        :return: 是否成功添加
+        :param batch_size: 批处理大小，设置了 upsert_batch 时忽略
+        :param ids: 可选的点ID列表，默认使用文本下标
+        :param payloads: 可选的附加载荷列表，会与 {"title": text} 合并
+        :return: 是否全部添加成功
+        
+        某个批次上传失败时继续上传其余批次，失败批次由操作类的 journal 记录，
+        可通过 operations.replay_journal() 重新上传。
         """
         try:
             # 生成向量
-            vectors = self.embedding_model.generate_vector(texts)
+            vectors = await self._generate_vectors_ingest(texts)
             
             # 构建点数据
-            points = [
-                {
-                    "id": i,
-                    "vector": vector.tolist(),
-                    "payload": {"title": text}
-                }
-                for i, (vector, text) in enumerate(zip(vectors, texts))
-            ]
+            points = self._build_points(vectors, texts, ids=ids, payloads=payloads)
+            await self._store_texts(points, texts)
             
             # 分批处理
-            for i in range(0, len(points), batch_size):
-                batch = points[i:i + batch_size]
-                success = await self.operations.upsert_points_batch(
-                    collection_name=self.collection_name,
-                    points=batch
-                )
-                if not success:
-                    return False
+            success = True
+            position = 0
+            while position < len(points):
+                size = self.upsert_batch.size if self.upsert_batch else batch_size
+                batch = points[position:position + size]
+                start = time.perf_counter()
+                batch_success = await self._upsert(batch)
+                if self.upsert_batch:
+                    self.upsert_batch.record(len(batch), time.perf_counter() - start, success=batch_success)
+                success = success and batch_success
+                position += len(batch)
             
-            return True
+            return success
         except Exception as e:
             print(f"添加文本失败：{str(e)}")
+            self.metrics.incr("errors", stage="add_texts_batch")
             return False
     
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        """返回距截止时间的剩余秒数（不小于0），未设置截止时间时返回None"""
+        if deadline is None:
+            return None
+        return max(0.0, deadline - time.monotonic())
+    
     async def search_batch(
         self,
         queries: List[str],
         limit: int = 10,
         score_threshold: float = 0.0,
-        batch_size: int = 10
+        batch_size: int = 10,
+        query_filter: Optional[Filter] = None,
+        timeout: Optional[float] = None,
+        shard_keys: Optional[Union[ShardKey, List[ShardKey]]] = None
     ) -> List[List[Dict]]:
         """
         批量搜索相似文本
@@ -99,19 +522,33 @@ class AsyncTextIndexer:
         :param limit: 每个查询返回的结果数量限制
         :param score_threshold: 相似度阈值
         :param batch_size: 批处理大小
+        :param query_filter: 可选的载荷过滤条件，对所有查询生效
+        :param timeout: 可选的截止时间（秒），从调用开始计算，向量化与各批搜索共用；超时的查询返回空列表
+        :param shard_keys: 可选的分片键，只搜索这些分片
         :return: 搜索结果列表的列表
         """
+        deadline = None if timeout is None else time.monotonic() + timeout
         try:
+            # 合并重复查询，每个唯一查询只向量化和搜索一次
+            dedup_result = deduplicate_texts(queries) if self.dedup else None
+            unique_queries = dedup_result.unique_texts if dedup_result else queries
+            if dedup_result:
+                self.last_dedup_ratio = dedup_result.ratio
+                self.metrics.incr("cache_hits", dedup_result.total - dedup_result.unique, cache="dedup")
+            
             # 生成查询文本的向量
-            query_vectors = self.embedding_model.generate_vector(queries)
+            with self.metrics.timer("embed"):
+                query_vectors = await self._embed_query(self._embed, unique_queries, deadline)
             
             # 构建搜索请求
             requests = [
                 {
                     "collection_name": self.collection_name,
-                    "vector": vector.tolist(),
-                    "limit": limit,
-                    "score_threshold": score_threshold
+                    "vector": to_query_vector(vector, self.embedding_model.datatype),
+                    "limit": self._fetch_limit(limit),
+                    "score_threshold": score_threshold,
+                    "filter": query_filter,
+                    "shard_keys": shard_keys
                 }
                 for vector in query_vectors
             ]
@@ -120,42 +557,454 @@ class AsyncTextIndexer:
             results = []
             for i in range(0, len(requests), batch_size):
                 batch_requests = requests[i:i + batch_size]
-                batch_results = await self.operations.search_batch(requests=batch_requests)
-                results.extend(batch_results)
+                remaining = self._remaining(deadline)
+                if remaining is not None and remaining <= 0:
+                    # 已超过截止时间，剩余查询直接返回空结果
+                    self.metrics.incr("deadline_exceeded", len(batch_requests), stage="search_batch")
+                    results.extend([] for _ in batch_requests)
+                    continue
+                try:
+                    async with self._slot(self.io_scheduler, QUERY, deadline):
+                        batch_results = await self.operations.search_batch(
+                            requests=batch_requests, timeout=self._remaining(deadline)
+                        )
+                except asyncio.TimeoutError:
+                    # 等待连接槽位时超过截止时间
+                    self.metrics.incr("deadline_exceeded", len(batch_requests), stage="search_batch")
+                    batch_results = None
+                results.extend(batch_results or [[] for _ in batch_requests])
             
+            results = await self._rerank(unique_queries, await self._hydrate(results), limit)
+            if dedup_result:
+                # 将结果分发回每个原始查询位置
+                results = [list(r) for r in dedup_result.scatter(results)]
             return results
+        except SchedulerOverloaded as e:
+            print(f"搜索被拒绝: {str(e)}")
+            return [[] for _ in queries]
+        except asyncio.TimeoutError:
+            print(f"搜索超过截止时间: {timeout}秒")
+            self.metrics.incr("deadline_exceeded", len(queries), stage="search_batch")
+            return [[] for _ in queries]
         except Exception as e:
             print(f"搜索失败: {str(e)}")
+            self.metrics.incr("errors", stage="search_batch")
             return []
     
     async def search(
         self,
         query: str,
         limit: int = 10,
-        score_threshold: float = 0.0
+        score_threshold: float = 0.0,
+        query_filter: Optional[Filter] = None,
+        timeout: Optional[float] = None,
+        shard_keys: Optional[Union[ShardKey, List[ShardKey]]] = None
     ) -> List[Dict]:
         """
         搜索相似文本
         :param query: 查询文本
         :param limit: 返回结果数量限制
         :param score_threshold: 相似度阈值
+        :param query_filter: 可选的载荷过滤条件
+        :param timeout: 可选的截止时间（秒），从调用开始计算，包含向量化耗时；超时返回空列表
+        :param shard_keys: 可选的分片键，只搜索这些分片
         :return: 搜索结果列表
         """
+        deadline = None if timeout is None else time.monotonic() + timeout
         try:
             # 生成查询文本的向量
-            query_vector = self.embedding_model.generate_vector([query])[0]
+            with self.metrics.timer("embed"):
+                query_vector = (await self._embed_query(self.embedding_model.generate_vector, [query], deadline))[0]
             
             # 构建搜索请求
             request = {
                 "collection_name": self.collection_name,
-                "vector": query_vector.tolist(),
-                "limit": limit,
-                "score_threshold": score_threshold
+                "vector": to_query_vector(query_vector, self.embedding_model.datatype),
+                "limit": self._fetch_limit(limit),
+                "score_threshold": score_threshold,
+                "filter": query_filter,
+                "shard_keys": shard_keys
             }
             
             # 执行搜索
-            results = await self.operations.search_batch([request])
-            return results[0] if results else []
+            async with self._slot(self.io_scheduler, QUERY, deadline):
+                results = await self.operations.search_batch([request], timeout=self._remaining(deadline))
+            if not results:
+                return []
+            return (await self._rerank([query], await self._hydrate(results), limit))[0]
+        except SchedulerOverloaded as e:
+            print(f"搜索被拒绝: {str(e)}")
+            return []
+        except asyncio.TimeoutError:
+            print(f"搜索超过截止时间: {timeout}秒")
+            self.metrics.incr("deadline_exceeded", stage="search")
+            return []
         except Exception as e:
             print(f"搜索失败: {str(e)}")
-            return [] 
\ No newline at end of file
+            self.metrics.incr("errors", stage="search")
+            return [] 
+    
+    async def search_by_id(
+        self,
+        point_id: Union[int, str],
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        query_filter: Optional[Filter] = None
+    ) -> List[Dict]:
+        """
+        搜索与已索引文本相似的文本，直接使用 Qdrant 中存储的向量，不需要向量化
+        :param point_id: 已索引文本的点ID
+        :param limit: 返回结果数量限制
+        :param score_threshold: 相似度阈值
+        :param query_filter: 可选的载荷过滤条件
+        :return: 搜索结果列表，不包含该点本身
+        """
+        return await self.recommend(
+            [point_id], limit=limit, score_threshold=score_threshold, query_filter=query_filter
+        )
+    
+    async def search_by_ids(
+        self,
+        point_ids: List[Union[int, str]],
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        query_filter: Optional[Filter] = None
+    ) -> List[List[Dict]]:
+        """
+        批量搜索与多个已索引文本相似的文本，所有查询在一次请求中完成
+        :param point_ids: 已索引文本的点ID列表
+        :param limit: 每个点返回的结果数量限制
+        :param score_threshold: 相似度阈值
+        :param query_filter: 可选的载荷过滤条件，对所有查询生效
+        :return: 与 point_ids 一一对应的搜索结果列表
+        """
+        try:
+            async with self._slot(self.io_scheduler, QUERY):
+                responses = await self.operations.recommend_batch(self.collection_name, [
+                    {
+                        "positive": [point_id],
+                        "limit": limit,
+                        "score_threshold": score_threshold,
+                        "filter": query_filter
+                    }
+                    for point_id in point_ids
+                ])
+            return await self._hydrate([
+                [
+                    {
+                        "id": point.id,
+                        "score": point.score,
+                        "payload": point.payload
+                    }
+                    for point in points
+                ]
+                for points in responses
+            ])
+        except Exception as e:
+            print(f"批量相似搜索失败: {str(e)}")
+            self.metrics.incr("errors", stage="search_by_ids")
+            return []
+    
+    async def recommend(
+        self,
+        positive_ids: List[Union[int, str]],
+        negative_ids: Optional[List[Union[int, str]]] = None,
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        query_filter: Optional[Filter] = None,
+        strategy: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        根据正负样本推荐相似文本，服务端读取样本点的向量，一次请求完成且不需要向量化
+        :param positive_ids: 正样本点ID列表
+        :param negative_ids: 可选的负样本点ID列表
+        :param limit: 返回结果数量限制
+        :param score_threshold: 相似度阈值
+        :param query_filter: 可选的载荷过滤条件
+        :param strategy: 推荐策略，average_vector（默认）、best_score 或 sum_scores
+        :return: 搜索结果列表，不包含样本点
+        """
+        try:
+            async with self._slot(self.io_scheduler, QUERY):
+                results = await self.operations.recommend(
+                    self.collection_name,
+                    positive_ids,
+                    negative=negative_ids,
+                    limit=limit,
+                    score_threshold=score_threshold,
+                    query_filter=query_filter,
+                    strategy=strategy
+                )
+            return (await self._hydrate([[
+                {
+                    "id": point.id,
+                    "score": point.score,
+                    "payload": point.payload
+                }
+                for point in results
+            ]]))[0]
+        except Exception as e:
+            print(f"推荐搜索失败: {str(e)}")
+            self.metrics.incr("errors", stage="recommend")
+            return []
+    
+    async def search_hybrid(
+        self,
+        query: str,
+        limit: int = 10,
+        prefetch_limit: Optional[int] = None,
+        score_threshold: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        稠密向量与关键词（稀疏向量）混合搜索，需要在初始化时设置 sparse_encoder
+        :param query: 查询文本
+        :param limit: 返回结果数量限制
+        :param prefetch_limit: 每一路召回的候选数量，默认为 limit 的 4 倍
+        :param score_threshold: RRF 融合得分阈值
+        :return: 搜索结果列表，格式与 search 相同
+        """
+        if self.sparse_encoder is None:
+            print("混合搜索失败: 未设置 sparse_encoder")
+            return []
+        try:
+            with self.metrics.timer("embed"):
+                query_vector = self.embedding_model.generate_vector([query])[0]
+            with self.metrics.timer("sparse_encode"):
+                sparse_vector = self.sparse_encoder.encode_queries([query])[0]
+            
+            results = await self.operations.query_hybrid(
+                collection_name=self.collection_name,
+                dense_vector=to_query_vector(query_vector, self.embedding_model.datatype),
+                sparse_vector=sparse_vector,
+                limit=limit,
+                prefetch_limit=prefetch_limit,
+                score_threshold=score_threshold
+            )
+            return (await self._hydrate([[
+                {
+                    "id": point.id,
+                    "score": point.score,
+                    "payload": point.payload
+                }
+                for point in results
+            ]]))[0]
+        except Exception as e:
+            print(f"混合搜索失败: {str(e)}")
+            self.metrics.incr("errors", stage="search_hybrid")
+            return []
+    
+    async def update_payload(
+        self,
+        payload: Dict[str, Any],
+        ids: Optional[List[Union[int, str]]] = None,
+        query_filter: Optional[Filter] = None,
+        overwrite: bool = False
+    ) -> bool:
+        """
+        更新选中文本的载荷（如标签、状态），只发送载荷，不重新上传向量
+        :param payload: 要设置的载荷字段
+        :param ids: 点ID列表
+        :param query_filter: 载荷过滤条件，与 ids 同时指定时取交集
+        :param overwrite: 是否整体替换载荷；未设置 doc_store 时文本保存在 title 字段中，整体替换会将其删除
+        :return: 是否成功更新
+        """
+        update = self.operations.overwrite_payload if overwrite else self.operations.set_payload
+        async with self._slot(self.io_scheduler, INGEST):
+            return await update(self.collection_name, payload, points=ids, points_filter=query_filter)
+    
+    async def update_payloads(self, updates: Dict[Union[int, str], Dict[str, Any]], overwrite: bool = False) -> bool:
+        """
+        为多个文本分别更新不同的载荷，批量合并为少量请求
+        :param updates: 点ID到载荷字段的映射
+        :param overwrite: 是否整体替换载荷
+        :return: 是否全部成功更新
+        """
+        async with self._slot(self.io_scheduler, INGEST):
+            return await self.operations.set_payloads(self.collection_name, updates, overwrite=overwrite)
+    
+    async def delete_payload_keys(
+        self,
+        keys: List[str],
+        ids: Optional[List[Union[int, str]]] = None,
+        query_filter: Optional[Filter] = None
+    ) -> bool:
+        """
+        删除选中文本的载荷字段
+        :param keys: 要删除的字段名列表
+        :param ids: 点ID列表
+        :param query_filter: 载荷过滤条件，与 ids 同时指定时取交集
+        :return: 是否成功删除
+        """
+        async with self._slot(self.io_scheduler, INGEST):
+            return await self.operations.delete_payload_keys(
+                self.collection_name, keys, points=ids, points_filter=query_filter
+            )
+    
+    async def delete(
+        self,
+        ids: Optional[List[Union[int, str]]] = None,
+        query_filter: Optional[Filter] = None
+    ) -> bool:
+        """
+        从索引中删除文本，设置了 doc_store 时同时在线程池中删除文档存储中的全文
+        
+        设置了 doc_store 且按过滤条件删除时，先遍历出全部匹配的点ID，再按ID删除；
+        遍历中途出错时不删除任何点并返回False，避免集合与文档存储只删除了一部分。
+        :param ids: 点ID列表
+        :param query_filter: 载荷过滤条件，与 ids 同时指定时取交集
+        :return: 是否成功删除
+        """
+        try:
+            if self.doc_store is not None and query_filter is not None:
+                scroll_filter = query_filter if ids is None else Filter(
+                    must=[HasIdCondition(has_id=list(ids)), query_filter]
+                )
+                ids = [
+                    record.id
+                    async for record in self.operations.scroll_all(
+                        self.collection_name, with_payload=False, scroll_filter=scroll_filter
+                    )
+                ]
+                query_filter = None
+                if not ids:
+                    return True
+            async with self._slot(self.io_scheduler, INGEST):
+                deleted = await self.operations.delete_points(
+                    self.collection_name, points=ids, points_filter=query_filter
+                )
+            if not deleted:
+                return False
+            if self.doc_store is not None:
+                loop = asyncio.get_running_loop()
+                with self.metrics.timer("doc_store"):
+                    await loop.run_in_executor(None, self.doc_store.delete_many, ids)
+            return True
+        except Exception as e:
+            print(f"删除文本失败：{str(e)}")
+            self.metrics.incr("errors", stage="delete")
+            return False
+    
+    async def add_documents_batch(
+        self,
+        documents: List[str],
+        doc_ids: Optional[List[Union[int, str]]] = None,
+        batch_size: int = 32
+    ) -> bool:
+        """
+        切分长文档并批量添加到索引
+        
+        每个片段作为独立的点写入，载荷中记录父文档ID（parent_id）和片段序号（chunk_index）。
+        文档按顺序切分，每凑满 batch_size 个片段就向量化一次，内存占用与文档总量无关；
+        下一批次的向量化在线程池中执行，与上一批次的上传并行。某个批次写入失败时继续写入其余批次，
+        最后汇总输出失败批次涉及的文档ID；出现异常时取消尚未完成的上传。
+        :param documents: 文档列表
+        :param doc_ids: 可选的文档ID列表，默认使用文档下标
+        :param batch_size: 每个批次的片段数量
+        :return: 是否全部添加成功
+        """
+        upload = None
+        try:
+            if doc_ids is None:
+                doc_ids = list(range(len(documents)))
+            
+            def chunk_batches():
+                chunks, ids, payloads = [], [], []
+                for doc_id, document in zip(doc_ids, documents):
+                    for index, chunk in enumerate(self.chunker.split(document)):
+                        chunks.append(chunk)
+                        ids.append(chunk_point_id(doc_id, index))
+                        payloads.append({"parent_id": doc_id, "chunk_index": index})
+                        if len(chunks) >= batch_size:
+                            yield chunks, ids, payloads
+                            chunks, ids, payloads = [], [], []
+                if chunks:
+                    yield chunks, ids, payloads
+            
+            loop = asyncio.get_running_loop()
+            total, failed, failed_docs = 0, 0, []
+            
+            async def confirm(pending):
+                nonlocal failed
+                task, batch_payloads = pending
+                if not await task:
+                    failed += 1
+                    failed_docs.extend(payload["parent_id"] for payload in batch_payloads)
+                    self.metrics.incr("errors", stage="add_documents_batch")
+            
+            for chunks, ids, payloads in chunk_batches():
+                total += 1
+                if self.scheduler is None:
+                    vectors = await loop.run_in_executor(None, self._generate_vectors, chunks, self.ingest_micro_batch)
+                else:
+                    vectors = await self._generate_vectors_ingest(chunks)
+                
+                # 等待上一批次上传完成后再提交本批次，失败的批次由 journal 记录
+                if upload is not None:
+                    await confirm(upload)
+                points = self._build_points(vectors, chunks, ids=ids, payloads=payloads)
+                await self._store_texts(points, chunks)
+                upload = (asyncio.ensure_future(self._upsert(points)), payloads)
+            
+            if upload is not None:
+                await confirm(upload)
+            if failed:
+                print(f"添加文档部分失败：{failed}/{total} 个批次写入失败，涉及的文档ID：{list(dict.fromkeys(failed_docs))}")
+                return False
+            return True
+        except Exception as e:
+            print(f"添加文档失败：{str(e)}")
+            self.metrics.incr("errors", stage="add_documents_batch")
+            return False
+        finally:
+            if upload is not None and not upload[0].done():
+                upload[0].cancel()
+    
+    async def search_documents(
+        self,
+        query: str,
+        limit: int = 10,
+        group_size: int = 1,
+        score_threshold: float = 0.0
+    ) -> List[Dict]:
+        """
+        搜索相似文档，同一文档的多个片段合并为一条结果
+        :param query: 查询文本
+        :param limit: 返回的文档数量限制
+        :param group_size: 每个文档返回的片段数量
+        :param score_threshold: 相似度阈值
+        :return: 文档结果列表，每项包含 parent_id、score（最佳片段得分）和 hits
+        """
+        try:
+            with self.metrics.timer("embed"):
+                query_vector = (await self._embed_query(self.embedding_model.generate_vector, [query]))[0]
+            async with self._slot(self.io_scheduler, QUERY):
+                groups = await self.operations.query_points_groups(
+                    collection_name=self.collection_name,
+                    vector=to_query_vector(query_vector, self.embedding_model.datatype),
+                    group_by="parent_id",
+                    limit=limit,
+                    group_size=group_size,
+                    score_threshold=score_threshold
+                )
+            documents = [
+                {
+                    "parent_id": group.id,
+                    "score": group.hits[0].score,
+                    "hits": [
+                        {
+                            "id": point.id,
+                            "score": point.score,
+                            "payload": point.payload
+                        }
+                        for point in group.hits
+                    ]
+                }
+                for group in groups
+                if group.hits
+            ]
+            await self._hydrate([document["hits"] for document in documents])
+            return documents
+        except Exception as e:
+            print(f"文档搜索失败: {str(e)}")
+            self.metrics.incr("errors", stage="search_documents")
+            return []
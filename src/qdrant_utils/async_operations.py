@@ -1,22 +1,65 @@
 """
 异步 Qdrant 操作模块。
 """
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Any, Optional, Sequence, Tuple, Union
+import asyncio
+import os
 import numpy as np
 from qdrant_client.async_qdrant_client import AsyncQdrantClient
-from qdrant_client.http.models import Distance, VectorParams, PointStruct, SearchRequest
+from qdrant_client.http.models import (
+    Distance, VectorParams, Datatype, PointStruct, PointGroup, SearchRequest,
+    SparseVectorParams, SparseVector, Modifier, Prefetch, FusionQuery, Fusion,
+    Filter, KeywordIndexParams, KeywordIndexType,
+    CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation,
+    OptimizersConfigDiff, CollectionStatus, SnapshotDescription, SnapshotPriority, Record, PointVectors,
+    SearchParams, QueryRequest, RecommendQuery, RecommendInput, RecommendStrategy,
+    HasIdCondition, SetPayload, SetPayloadOperation, OverwritePayloadOperation
+)
+from qdrant_client.http.exceptions import UnexpectedResponse
+from .metrics import Metrics, NULL_METRICS
+from .retry import RetryPolicy, FailedBatchJournal, is_payload_too_large
+from .sparse import SPARSE_VECTOR_NAME, to_vector_struct
+from .cache import SearchResultCache
+from .sharding import CollectionProfile, ShardKey, group_by_shard_key, shard_key_selector
+from .hedging import HedgePolicy, hedged_call
 
 class AsyncQdrantOperations:
     """异步 Qdrant 操作类"""
     
-    def __init__(self, client: AsyncQdrantClient):
+    def __init__(
+        self,
+        client: AsyncQdrantClient,
+        metrics: Optional[Metrics] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        journal: Optional[FailedBatchJournal] = None,
+        result_cache: Optional[SearchResultCache] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+        hedge_clients: Optional[List[AsyncQdrantClient]] = None
+    ):
         """
         初始化异步操作类。
         
         Args:
             client: 异步 Qdrant 客户端实例
+            metrics: 可选的指标记录器，默认不记录
+            retry_policy: 批量上传的重试策略，默认使用 RetryPolicy()
+            journal: 可选的失败批次日志，重试耗尽的批次会写入其中
+            result_cache: 可选的 query_points 结果缓存，通过本实例写入的集合会自动失效
+            hedge_policy: 可选的对冲策略，query_points 超过近期延迟分位数未返回时发送重复请求
+            hedge_clients: 重复请求使用的其他客户端（如连接到其他副本），未指定时在 client 上重发
         """
         self.client = client
+        self.metrics = metrics or NULL_METRICS
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.journal = journal
+        self.result_cache = result_cache
+        self.hedge_policy = hedge_policy
+        self.hedge_clients = list(hedge_clients or [])
+    
+    def _invalidate(self, collection_name: str) -> None:
+        """使集合的搜索结果缓存失效"""
+        if self.result_cache is not None:
+            self.result_cache.invalidate(collection_name)
     
     async def delete_collection(self, collection_name: str) -> bool:
         """
@@ -29,16 +72,22 @@ class AsyncQdrantOperations:
             bool: 是否成功删除
         """
         try:
-            await self.client.delete_collection(collection_name)
+            with self.metrics.timer("delete_collection"):
+                await self.client.delete_collection(collection_name)
+            self._invalidate(collection_name)
             return True
         except Exception as e:
             print(f"删除集合失败: {e}")
+            self.metrics.incr("errors", stage="delete_collection")
             return False
     
     async def create_collection(
         self,
         collection_name: str,
-        vector_size: int
+        vector_size: int,
+        datatype: Optional[str] = None,
+        sparse_vector_name: Optional[str] = None,
+        profile: Optional[CollectionProfile] = None
     ) -> bool:
         """
         创建集合。
@@ -46,21 +95,331 @@ class AsyncQdrantOperations:
         Args:
             collection_name: 集合名称
             vector_size: 向量维度
+            datatype: 向量存储类型（float32、float16、uint8），默认由服务端决定
+            sparse_vector_name: 稀疏向量名称，设置后额外创建以 IDF 加权的命名稀疏向量
+            profile: 可选的集群拓扑配置（分片、副本、写一致性、自定义分片键）
         
         Returns:
             bool: 是否成功创建
         """
         try:
-            await self.client.create_collection(
-                collection_name=collection_name,
-                vectors_config=VectorParams(
-                    size=vector_size,
-                    distance=Distance.COSINE
+            with self.metrics.timer("create_collection"):
+                await self.client.create_collection(
+                    collection_name=collection_name,
+                    vectors_config=VectorParams(
+                        size=vector_size,
+                        distance=Distance.COSINE,
+                        datatype=Datatype(datatype) if datatype else None
+                    ),
+                    sparse_vectors_config={
+                        sparse_vector_name: SparseVectorParams(modifier=Modifier.IDF)
+                    } if sparse_vector_name else None,
+                    **(profile.collection_kwargs() if profile else {})
                 )
-            )
+                for shard_key in (profile.shard_keys if profile else []):
+                    await self.client.create_shard_key(collection_name, shard_key)
+            self._invalidate(collection_name)
             return True
         except Exception as e:
             print(f"创建集合失败: {e}")
+            self.metrics.incr("errors", stage="create_collection")
+            return False
+    
+    async def create_payload_index(
+        self,
+        collection_name: str,
+        field_name: str,
+        is_tenant: bool = False
+    ) -> bool:
+        """
+        为关键字载荷字段创建索引。
+        
+        Args:
+            collection_name: 集合名称
+            field_name: 载荷字段名称
+            is_tenant: 是否为租户字段，服务端会按该字段组织存储以加速单租户检索
+        
+        Returns:
+            bool: 是否成功创建
+        """
+        try:
+            with self.metrics.timer("create_payload_index"):
+                await self.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=KeywordIndexParams(type=KeywordIndexType.KEYWORD, is_tenant=is_tenant)
+                )
+            return True
+        except Exception as e:
+            print(f"创建载荷索引失败: {e}")
+            self.metrics.incr("errors", stage="create_payload_index")
+            return False
+    
+    async def get_alias_target(self, alias_name: str) -> Optional[str]:
+        """
+        获取别名指向的集合。
+        
+        Args:
+            alias_name: 别名
+        
+        Returns:
+            Optional[str]: 集合名称，别名不存在或查询失败时返回None
+        """
+        try:
+            for alias in (await self.client.get_aliases()).aliases:
+                if alias.alias_name == alias_name:
+                    return alias.collection_name
+            return None
+        except Exception as e:
+            print(f"查询别名失败: {e}")
+            self.metrics.incr("errors", stage="aliases")
+            return None
+    
+    async def switch_alias(self, alias_name: str, collection_name: str) -> bool:
+        """
+        将别名原子地切换到指定集合，别名不存在时直接创建。
+        
+        Args:
+            alias_name: 别名
+            collection_name: 新的目标集合
+        
+        Returns:
+            bool: 是否切换成功
+        """
+        try:
+            with self.metrics.timer("aliases"):
+                await self.client.update_collection_aliases(
+                    change_aliases_operations=[
+                        DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias_name)),
+                        CreateAliasOperation(create_alias=CreateAlias(
+                            collection_name=collection_name,
+                            alias_name=alias_name
+                        ))
+                    ]
+                )
+            self._invalidate(alias_name)
+            self._invalidate(collection_name)
+            return True
+        except Exception as e:
+            print(f"切换别名失败: {e}")
+            self.metrics.incr("errors", stage="aliases")
+            return False
+    
+    async def update_indexing_threshold(self, collection_name: str, threshold: int) -> bool:
+        """
+        修改集合的向量索引阈值，设为 0 时暂停构建向量索引以加快批量写入。
+        
+        Args:
+            collection_name: 集合名称
+            threshold: 索引阈值（KB）
+        
+        Returns:
+            bool: 是否修改成功
+        """
+        try:
+            await self.client.update_collection(
+                collection_name=collection_name,
+                optimizers_config=OptimizersConfigDiff(indexing_threshold=threshold)
+            )
+            return True
+        except Exception as e:
+            print(f"修改索引阈值失败: {e}")
+            self.metrics.incr("errors", stage="update_collection")
+            return False
+    
+    async def wait_until_green(self, collection_name: str, timeout: float = 600.0, poll_interval: float = 1.0) -> bool:
+        """
+        等待集合完成优化（状态为 green）。
+        
+        Args:
+            collection_name: 集合名称
+            timeout: 最长等待秒数
+            poll_interval: 轮询间隔秒数
+        
+        Returns:
+            bool: 在超时前变为 green 返回True
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            try:
+                if (await self.client.get_collection(collection_name)).status == CollectionStatus.GREEN:
+                    return True
+            except Exception as e:
+                print(f"查询集合状态失败: {e}")
+                self.metrics.incr("errors", stage="collection_status")
+                return False
+            if loop.time() >= deadline:
+                print(f"等待集合 {collection_name} 完成优化超时")
+                return False
+            await asyncio.sleep(poll_interval)
+    
+    async def create_snapshot(self, collection_name: str) -> Optional[str]:
+        """
+        在服务端创建集合快照。
+        
+        Args:
+            collection_name: 集合名称
+        
+        Returns:
+            Optional[str]: 快照名称，失败时返回None
+        """
+        try:
+            with self.metrics.timer("snapshot_create"):
+                snapshot = await self.client.create_snapshot(collection_name=collection_name, wait=True)
+            return snapshot.name
+        except Exception as e:
+            print(f"创建快照失败: {e}")
+            self.metrics.incr("errors", stage="snapshot_create")
+            return None
+    
+    async def list_snapshots(self, collection_name: str) -> List[SnapshotDescription]:
+        """
+        列出集合在服务端的快照。
+        
+        Args:
+            collection_name: 集合名称
+        
+        Returns:
+            List[SnapshotDescription]: 快照列表
+        """
+        try:
+            return await self.client.list_snapshots(collection_name=collection_name)
+        except Exception as e:
+            print(f"列出快照失败: {e}")
+            self.metrics.incr("errors", stage="snapshot_list")
+            return []
+    
+    async def delete_snapshot(self, collection_name: str, snapshot_name: str) -> bool:
+        """
+        删除服务端的集合快照。
+        
+        Args:
+            collection_name: 集合名称
+            snapshot_name: 快照名称
+        
+        Returns:
+            bool: 是否删除成功
+        """
+        try:
+            await self.client.delete_snapshot(collection_name=collection_name, snapshot_name=snapshot_name, wait=True)
+            return True
+        except Exception as e:
+            print(f"删除快照失败: {e}")
+            self.metrics.incr("errors", stage="snapshot_delete")
+            return False
+    
+    async def download_snapshot(
+        self,
+        collection_name: str,
+        snapshot_name: str,
+        path: str,
+        chunk_size: int = 1 << 20
+    ) -> bool:
+        """
+        将快照流式下载到本地文件。
+        
+        先写入 path + ".part"，下载完成后再重命名，中途失败不会留下不完整的快照文件。
+        
+        Args:
+            collection_name: 集合名称
+            snapshot_name: 快照名称
+            path: 本地文件路径
+            chunk_size: 每次写入的字节数
+        
+        Returns:
+            bool: 是否下载成功
+        """
+        tmp_path = path + ".part"
+        try:
+            # 生成的接口会把响应解析为 JSON，这里直接使用底层 HTTP 客户端流式读取
+            api = self.client.http.client
+            request = api._async_client.build_request(
+                "GET",
+                f"{api.host}/collections/{collection_name}/snapshots/{snapshot_name}"
+            )
+            with self.metrics.timer("snapshot_download"):
+                response = await api.middleware(request, lambda r: api._async_client.send(r, stream=True))
+                try:
+                    if response.status_code != 200:
+                        await response.aread()
+                        raise UnexpectedResponse.for_response(response)
+                    with open(tmp_path, "wb") as f:
+                        async for chunk in response.aiter_bytes(chunk_size):
+                            f.write(chunk)
+                finally:
+                    await response.aclose()
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            print(f"下载快照失败: {e}")
+            self.metrics.incr("errors", stage="snapshot_download")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+    
+    async def upload_snapshot(
+        self,
+        collection_name: str,
+        path: str,
+        priority: SnapshotPriority = SnapshotPriority.SNAPSHOT
+    ) -> bool:
+        """
+        上传本地快照文件并恢复集合，集合不存在时自动创建，已存在时数据被快照覆盖。
+        
+        Args:
+            collection_name: 集合名称
+            path: 本地快照文件路径
+            priority: 快照与集合现有数据冲突时的优先级
+        
+        Returns:
+            bool: 是否恢复成功
+        """
+        try:
+            with self.metrics.timer("snapshot_upload"), open(path, "rb") as f:
+                await self.client.http.snapshots_api.recover_from_uploaded_snapshot(
+                    collection_name=collection_name,
+                    wait=True,
+                    priority=priority,
+                    snapshot=f
+                )
+            self._invalidate(collection_name)
+            return True
+        except Exception as e:
+            print(f"上传快照失败: {e}")
+            self.metrics.incr("errors", stage="snapshot_upload")
+            return False
+    
+    async def recover_snapshot(
+        self,
+        collection_name: str,
+        location: str,
+        priority: SnapshotPriority = SnapshotPriority.SNAPSHOT
+    ) -> bool:
+        """
+        从服务端可访问的快照位置恢复集合。
+        
+        Args:
+            collection_name: 集合名称
+            location: 快照 URL，或服务端本地路径（file:///...）
+            priority: 快照与集合现有数据冲突时的优先级
+        
+        Returns:
+            bool: 是否恢复成功
+        """
+        try:
+            with self.metrics.timer("snapshot_recover"):
+                await self.client.recover_snapshot(
+                    collection_name=collection_name,
+                    location=location,
+                    priority=priority,
+                    wait=True
+                )
+            self._invalidate(collection_name)
+            return True
+        except Exception as e:
+            print(f"恢复快照失败: {e}")
+            self.metrics.incr("errors", stage="snapshot_recover")
             return False
     
     async def upsert_points_batch(
@@ -73,29 +432,105 @@ class AsyncQdrantOperations:
         :param collection_name: 集合名称
         :param points: 点数据列表，每个点包含以下字段：
             - id: 点ID
-            - vector: 向量数据
+            - vector: 向量数据，或 {"": 稠密向量, 稀疏向量名称: {"indices": [...], "values": [...]}}
             - payload: 附加数据
+            - shard_key: 可选的分片键，用于自定义分片的集合
         :return: 是否成功上传
+        
+        临时错误按 retry_policy 退避重试；请求体过大时将批次对半拆分后分别上传；
+        重试耗尽仍失败的部分写入 journal（如已配置），其余部分照常上传。
+        点带有分片键时按分片键分组，每组作为一个请求写入对应分片，各组并发发送。
         """
         try:
-            await self.client.upsert(
-                collection_name=collection_name,
-                wait=True,
-                points=[
+            with self.metrics.timer("build_points"):
+                structs = [
                     PointStruct(
                         id=point["id"],
-                        vector=point["vector"],
+                        vector=to_vector_struct(point["vector"]),
                         payload=point["payload"]
                     )
                     for point in points
                 ]
-            )
-            return True
         except Exception as e:
             print(f"上传失败: {str(e)}")
+            self.metrics.incr("errors", stage="upsert")
             return False
+        groups = group_by_shard_key(points)
+        if len(groups) == 1:
+            success = await self._upsert_with_retry(collection_name, points, structs, next(iter(groups)))
+        else:
+            struct_of = {id(point): struct for point, struct in zip(points, structs)}
+            results = await asyncio.gather(*[
+                self._upsert_with_retry(
+                    collection_name, group, [struct_of[id(point)] for point in group], shard_key
+                )
+                for shard_key, group in groups.items()
+            ])
+            success = all(results)
+        # 部分拆分批次可能已写入，无论成败都使缓存失效
+        self._invalidate(collection_name)
+        return success
+    
+    async def _upsert_with_retry(
+        self,
+        collection_name: str,
+        points: List[Dict],
+        structs: List[PointStruct],
+        shard_key: Optional[ShardKey] = None
+    ) -> bool:
+        """
+        按重试策略上传一个批次
+        :param collection_name: 集合名称
+        :param points: 原始点数据，用于写入失败批次日志
+        :param structs: 与 points 一一对应的 PointStruct 列表
+        :param shard_key: 可选的目标分片键
+        :return: 是否全部上传成功
+        """
+        attempt = 0
+        while True:
+            try:
+                self.metrics.observe("batch_size", len(structs), stage="upsert")
+                with self.metrics.timer("upsert"):
+                    await self.client.upsert(
+                        collection_name=collection_name,
+                        wait=True,
+                        points=structs,
+                        **({"shard_key_selector": shard_key} if shard_key is not None else {})
+                    )
+                return True
+            except Exception as e:
+                if self.retry_policy.split_on_too_large and len(structs) > 1 and is_payload_too_large(e):
+                    self.metrics.incr("batch_splits", stage="upsert")
+                    middle = len(structs) // 2
+                    first = await self._upsert_with_retry(collection_name, points[:middle], structs[:middle], shard_key)
+                    second = await self._upsert_with_retry(collection_name, points[middle:], structs[middle:], shard_key)
+                    return first and second
+                if self.retry_policy.should_retry(e, attempt):
+                    self.metrics.incr("retries", stage="upsert")
+                    await asyncio.sleep(self.retry_policy.delay(attempt))
+                    attempt += 1
+                    continue
+                print(f"上传失败: {str(e)}")
+                self.metrics.incr("errors", stage="upsert")
+                if self.journal is not None:
+                    self.journal.record(collection_name, points, str(e))
+                return False
     
-    async def search_batch(self, requests: List[Dict]) -> List[List[Dict]]:
+    async def replay_journal(self) -> bool:
+        """
+        重新上传失败批次日志中的批次，再次失败的批次会重新写入日志
+        :return: 是否全部上传成功
+        """
+        if self.journal is None:
+            return True
+        success = True
+        for entry in self.journal.drain():
+            if not await self.upsert_points_batch(entry["collection_name"], entry["points"]):
+                success = False
+        self.journal.commit_replay()
+        return success
+    
+    async def search_batch(self, requests: List[Dict], timeout: Optional[float] = None) -> List[List[Dict]]:
         """
         批量搜索向量
         :param requests: 搜索请求列表，每个请求包含以下字段：
@@ -103,28 +538,38 @@ class AsyncQdrantOperations:
             - vector: 查询向量
             - limit: 返回结果数量限制
             - score_threshold: 相似度阈值
+            - filter: 可选的载荷过滤条件
+            - shard_keys: 可选的目标分片键
+        :param timeout: 可选的整批截止时间（秒），超时的请求返回空列表，已完成的结果照常返回
         :return: 搜索结果列表的列表
         """
         try:
-            results = []
-            for request in requests:
-                result = await self.query_points(
+            responses = await asyncio.gather(*[
+                self.query_points(
                     collection_name=request["collection_name"],
                     vector=request["vector"],
                     limit=request["limit"],
-                    score_threshold=request["score_threshold"]
+                    score_threshold=request["score_threshold"],
+                    query_filter=request.get("filter"),
+                    timeout=timeout,
+                    shard_keys=request.get("shard_keys")
                 )
-                results.append([
+                for request in requests
+            ])
+            return [
+                [
                     {
                         "id": point.id,
                         "score": point.score,
                         "payload": point.payload
                     }
                     for point in result
-                ])
-            return results
+                ]
+                for result in responses
+            ]
         except Exception as e:
             print(f"搜索失败: {str(e)}")
+            self.metrics.incr("errors", stage="search")
             return []
 
     async def query_points(
@@ -132,7 +577,11 @@ class AsyncQdrantOperations:
         collection_name: str,
         vector: List[float],
         limit: int = 10,
-        score_threshold: float = 0.0
+        score_threshold: float = 0.0,
+        query_filter: Optional[Filter] = None,
+        search_params: Optional[SearchParams] = None,
+        timeout: Optional[float] = None,
+        shard_keys: Optional[Union[ShardKey, List[ShardKey]]] = None
     ) -> List[PointStruct]:
         """
         搜索相似向量
@@ -140,16 +589,513 @@ class AsyncQdrantOperations:
         :param vector: 查询向量
         :param limit: 返回结果数量限制
         :param score_threshold: 相似度阈值
+        :param query_filter: 可选的载荷过滤条件
+        :param search_params: 可选的搜索参数（hnsw_ef、精确搜索、量化重打分等）
+        :param timeout: 可选的截止时间（秒），超时后取消请求并返回空列表
+        :param shard_keys: 可选的分片键，只搜索这些分片，默认搜索全部分片
         :return: 搜索结果列表
+        
+        配置了 result_cache 时先查缓存，相同的并发请求只向服务端发起一次；配置了 hedge_policy 时
+        首个请求超过近期延迟分位数未返回会发送重复请求，先返回者胜出，其余请求被取消。
         """
-        try:
-            results = await self.client.query_points(
+        def request(client: AsyncQdrantClient):
+            return client.query_points(
                 collection_name=collection_name,
-                vector=vector,
+                query=vector,
+                query_filter=query_filter,
                 limit=limit,
-                score_threshold=score_threshold
+                score_threshold=score_threshold,
+                search_params=search_params,
+                shard_key_selector=shard_key_selector(shard_keys)
+            )
+        
+        async def fetch():
+            with self.metrics.timer("search"):
+                if self.hedge_policy is None:
+                    response = await request(self.client)
+                else:
+                    response = await hedged_call(
+                        request, [self.client, *self.hedge_clients], self.hedge_policy, self.metrics
+                    )
+            return response.points
+        
+        async def search():
+            if self.result_cache is None:
+                return await fetch()
+            key = self.result_cache.make_key(
+                collection_name, vector, limit, score_threshold, query_filter, search_params, shard_keys
             )
-            return results
+            return await self.result_cache.get_or_fetch_async(key, fetch)
+        
+        try:
+            if timeout is None:
+                return await search()
+            return await asyncio.wait_for(search(), timeout)
+        except asyncio.TimeoutError:
+            print(f"搜索超过截止时间: {timeout}秒")
+            self.metrics.incr("deadline_exceeded", stage="search")
+            return []
         except Exception as e:
             print(f"搜索失败: {str(e)}")
-            return [] 
\ No newline at end of file
+            self.metrics.incr("errors", stage="search")
+            return [] 
+
+    async def count_points(self, collection_name: str, count_filter: Optional[Filter] = None) -> Optional[int]:
+        """
+        精确统计集合中的点数量
+        :param collection_name: 集合名称
+        :param count_filter: 可选的载荷过滤条件
+        :return: 点数量，失败时返回None
+        """
+        try:
+            result = await self.client.count(collection_name=collection_name, count_filter=count_filter, exact=True)
+            return result.count
+        except Exception as e:
+            print(f"统计点数量失败: {str(e)}")
+            self.metrics.incr("errors", stage="count")
+            return None
+
+    async def scroll_pages(
+        self,
+        collection_name: str,
+        page_size: int = 256,
+        with_payload: Union[bool, Sequence[str]] = True,
+        with_vectors: Union[bool, Sequence[str]] = False,
+        scroll_filter: Optional[Filter] = None,
+        offset: Optional[Union[int, str]] = None,
+        prefetch: bool = True
+    ) -> AsyncIterator[Tuple[List[Record], Optional[Union[int, str]]]]:
+        """
+        逐页遍历集合
+        :param collection_name: 集合名称
+        :param page_size: 每页的点数量
+        :param with_payload: 是否返回载荷，或需要返回的载荷字段列表
+        :param with_vectors: 是否返回向量，或需要返回的向量名称列表
+        :param scroll_filter: 可选的载荷过滤条件
+        :param offset: 起始点ID，用于从上次中断的位置继续遍历
+        :param prefetch: 是否在消费当前页时提前请求下一页
+        :return: (点记录列表, 下一页的起始点ID) 的异步迭代器，最后一页的下一页起始点ID为 None
+        
+        出错时打印错误并抛出异常，中断的遍历不会被当作完整的遍历。
+        """
+        async def fetch(page_offset):
+            with self.metrics.timer("scroll"):
+                return await self.client.scroll(
+                    collection_name=collection_name,
+                    scroll_filter=scroll_filter,
+                    limit=page_size,
+                    offset=page_offset,
+                    with_payload=with_payload,
+                    with_vectors=with_vectors
+                )
+        
+        task = asyncio.ensure_future(fetch(offset))
+        try:
+            while True:
+                try:
+                    records, offset = await task
+                except Exception as e:
+                    print(f"遍历集合失败: {str(e)}")
+                    self.metrics.incr("errors", stage="scroll")
+                    raise
+                task = asyncio.ensure_future(fetch(offset)) if prefetch and offset is not None else None
+                yield records, offset
+                if offset is None:
+                    return
+                if task is None:
+                    task = asyncio.ensure_future(fetch(offset))
+        finally:
+            if task is not None and not task.done():
+                task.cancel()
+
+    async def scroll_all(
+        self,
+        collection_name: str,
+        page_size: int = 256,
+        with_payload: Union[bool, Sequence[str]] = True,
+        with_vectors: Union[bool, Sequence[str]] = False,
+        scroll_filter: Optional[Filter] = None,
+        prefetch: bool = True
+    ) -> AsyncIterator[Record]:
+        """
+        逐页遍历集合中的全部点
+        :param collection_name: 集合名称
+        :param page_size: 每页的点数量
+        :param with_payload: 是否返回载荷，或需要返回的载荷字段列表
+        :param with_vectors: 是否返回向量，或需要返回的向量名称列表
+        :param scroll_filter: 可选的载荷过滤条件
+        :param prefetch: 是否在消费当前页时提前请求下一页
+        :return: 点记录的异步迭代器
+        
+        出错时打印错误并抛出异常，正常结束时已读取全部点。
+        """
+        async for records, _ in self.scroll_pages(
+            collection_name,
+            page_size=page_size,
+            with_payload=with_payload,
+            with_vectors=with_vectors,
+            scroll_filter=scroll_filter,
+            prefetch=prefetch
+        ):
+            for record in records:
+                yield record
+
+    async def update_vectors(self, collection_name: str, points: List[Dict]) -> bool:
+        """
+        更新点的向量，载荷与未指定的其他命名向量保持不变
+        :param collection_name: 集合名称
+        :param points: 点数据列表，每个点包含 id 和 vector（{向量名称: 向量}）
+        :return: 是否成功更新
+        """
+        try:
+            with self.metrics.timer("update_vectors"):
+                await self.client.update_vectors(
+                    collection_name=collection_name,
+                    points=[
+                        PointVectors(id=point["id"], vector=to_vector_struct(point["vector"]))
+                        for point in points
+                    ],
+                    wait=True
+                )
+            self._invalidate(collection_name)
+            return True
+        except Exception as e:
+            print(f"更新向量失败: {str(e)}")
+            self.metrics.incr("errors", stage="update_vectors")
+            return False
+
+    @staticmethod
+    def _points_selector(
+        points: Optional[Sequence[Union[int, str]]],
+        points_filter: Optional[Filter]
+    ) -> Union[List[Union[int, str]], Filter]:
+        """
+        根据点ID列表和过滤条件构建点选择器，两者同时指定时取交集
+        :param points: 点ID列表
+        :param points_filter: 载荷过滤条件
+        :return: 点ID列表或过滤条件
+        """
+        if points is None and points_filter is None:
+            raise ValueError("必须指定点ID或过滤条件")
+        if points_filter is None:
+            return list(points)
+        if points is None:
+            return points_filter
+        return Filter(must=[HasIdCondition(has_id=list(points)), points_filter])
+
+    async def _update_points(self, stage: str, collection_name: str, update: Callable[[], Awaitable[Any]]) -> bool:
+        """
+        执行一次点更新请求，成功后使集合的搜索结果缓存失效
+        :param stage: 指标与错误信息使用的阶段名称
+        :param collection_name: 集合名称
+        :param update: 返回请求协程的函数
+        :return: 是否成功
+        """
+        try:
+            with self.metrics.timer(stage):
+                await update()
+            self._invalidate(collection_name)
+            return True
+        except Exception as e:
+            print(f"更新点失败（{stage}）: {str(e)}")
+            self.metrics.incr("errors", stage=stage)
+            return False
+
+    async def set_payload(
+        self,
+        collection_name: str,
+        payload: Dict[str, Any],
+        points: Optional[Sequence[Union[int, str]]] = None,
+        points_filter: Optional[Filter] = None
+    ) -> bool:
+        """
+        为选中的点设置载荷字段，未指定的字段和向量保持不变
+        :param collection_name: 集合名称
+        :param payload: 要设置的载荷字段
+        :param points: 点ID列表
+        :param points_filter: 载荷过滤条件，与 points 同时指定时取交集
+        :return: 是否成功更新
+        """
+        return await self._update_points("set_payload", collection_name, lambda: self.client.set_payload(
+            collection_name=collection_name,
+            payload=payload,
+            points=self._points_selector(points, points_filter),
+            wait=True
+        ))
+
+    async def overwrite_payload(
+        self,
+        collection_name: str,
+        payload: Dict[str, Any],
+        points: Optional[Sequence[Union[int, str]]] = None,
+        points_filter: Optional[Filter] = None
+    ) -> bool:
+        """
+        用新载荷整体替换选中点的载荷，向量保持不变
+        :param collection_name: 集合名称
+        :param payload: 新载荷
+        :param points: 点ID列表
+        :param points_filter: 载荷过滤条件，与 points 同时指定时取交集
+        :return: 是否成功更新
+        """
+        return await self._update_points("overwrite_payload", collection_name, lambda: self.client.overwrite_payload(
+            collection_name=collection_name,
+            payload=payload,
+            points=self._points_selector(points, points_filter),
+            wait=True
+        ))
+
+    async def delete_payload_keys(
+        self,
+        collection_name: str,
+        keys: Sequence[str],
+        points: Optional[Sequence[Union[int, str]]] = None,
+        points_filter: Optional[Filter] = None
+    ) -> bool:
+        """
+        删除选中点的载荷字段
+        :param collection_name: 集合名称
+        :param keys: 要删除的字段名列表
+        :param points: 点ID列表
+        :param points_filter: 载荷过滤条件，与 points 同时指定时取交集
+        :return: 是否成功删除
+        """
+        return await self._update_points("delete_payload", collection_name, lambda: self.client.delete_payload(
+            collection_name=collection_name,
+            keys=list(keys),
+            points=self._points_selector(points, points_filter),
+            wait=True
+        ))
+
+    async def delete_points(
+        self,
+        collection_name: str,
+        points: Optional[Sequence[Union[int, str]]] = None,
+        points_filter: Optional[Filter] = None
+    ) -> bool:
+        """
+        删除选中的点
+        :param collection_name: 集合名称
+        :param points: 点ID列表
+        :param points_filter: 载荷过滤条件，与 points 同时指定时取交集
+        :return: 是否成功删除
+        """
+        return await self._update_points("delete_points", collection_name, lambda: self.client.delete(
+            collection_name=collection_name,
+            points_selector=self._points_selector(points, points_filter),
+            wait=True
+        ))
+
+    async def set_payloads(
+        self,
+        collection_name: str,
+        updates: Dict[Union[int, str], Dict[str, Any]],
+        overwrite: bool = False,
+        batch_size: int = 256
+    ) -> bool:
+        """
+        为多个点分别设置不同的载荷，每批更新合并为一次请求
+        :param collection_name: 集合名称
+        :param updates: 点ID到载荷字段的映射
+        :param overwrite: 是否整体替换载荷，默认只设置给定字段
+        :param batch_size: 每次请求包含的点数量
+        :return: 是否全部成功更新，某批失败时继续更新其余批次
+        """
+        items = list(updates.items())
+        success = True
+        for start in range(0, len(items), batch_size):
+            operations = [
+                OverwritePayloadOperation(overwrite_payload=SetPayload(payload=payload, points=[point_id]))
+                if overwrite else
+                SetPayloadOperation(set_payload=SetPayload(payload=payload, points=[point_id]))
+                for point_id, payload in items[start:start + batch_size]
+            ]
+            success = await self._update_points("set_payload", collection_name, lambda: self.client.batch_update_points(
+                collection_name=collection_name,
+                update_operations=operations,
+                wait=True
+            )) and success
+        return success
+
+    async def query_hybrid(
+        self,
+        collection_name: str,
+        dense_vector: List[float],
+        sparse_vector: Dict[str, List],
+        limit: int = 10,
+        prefetch_limit: Optional[int] = None,
+        sparse_vector_name: str = SPARSE_VECTOR_NAME,
+        score_threshold: Optional[float] = None
+    ) -> List[PointStruct]:
+        """
+        稠密与稀疏向量混合搜索，两路候选在服务端以 RRF 融合，只需一次请求
+        :param collection_name: 集合名称
+        :param dense_vector: 稠密查询向量
+        :param sparse_vector: 稀疏查询向量，格式为 {"indices": [...], "values": [...]}
+        :param limit: 返回结果数量限制
+        :param prefetch_limit: 每一路召回的候选数量，默认为 limit 的 4 倍
+        :param sparse_vector_name: 稀疏向量名称
+        :param score_threshold: 融合得分阈值
+        :return: 搜索结果列表
+        """
+        try:
+            prefetch_limit = prefetch_limit or limit * 4
+            with self.metrics.timer("search_hybrid"):
+                response = await self.client.query_points(
+                    collection_name=collection_name,
+                    prefetch=[
+                        Prefetch(query=dense_vector, limit=prefetch_limit),
+                        Prefetch(
+                            query=SparseVector(**sparse_vector),
+                            using=sparse_vector_name,
+                            limit=prefetch_limit
+                        )
+                    ],
+                    query=FusionQuery(fusion=Fusion.RRF),
+                    limit=limit,
+                    score_threshold=score_threshold
+                )
+            return response.points
+        except Exception as e:
+            print(f"混合搜索失败: {str(e)}")
+            self.metrics.incr("errors", stage="search_hybrid")
+            return []
+
+    @staticmethod
+    def _recommend_query(request: Dict) -> RecommendQuery:
+        """根据请求字典构建推荐查询"""
+        return RecommendQuery(recommend=RecommendInput(
+            positive=list(request.get("positive") or []),
+            negative=list(request.get("negative") or []) or None,
+            strategy=request.get("strategy")
+        ))
+
+    async def recommend(
+        self,
+        collection_name: str,
+        positive: Sequence[Union[int, str, List[float]]],
+        negative: Optional[Sequence[Union[int, str, List[float]]]] = None,
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        query_filter: Optional[Filter] = None,
+        strategy: Optional[Union[str, RecommendStrategy]] = None
+    ) -> List[PointStruct]:
+        """
+        基于已存储向量的推荐搜索，服务端读取正负样本点的向量，不需要生成查询向量
+        :param collection_name: 集合名称
+        :param positive: 正样本点ID（也可以是向量）列表
+        :param negative: 可选的负样本点ID（也可以是向量）列表
+        :param limit: 返回结果数量限制
+        :param score_threshold: 相似度阈值
+        :param query_filter: 可选的载荷过滤条件
+        :param strategy: 推荐策略，average_vector（默认）、best_score 或 sum_scores
+        :return: 搜索结果列表，不包含作为样本的点
+        """
+        try:
+            with self.metrics.timer("recommend"):
+                response = await self.client.query_points(
+                    collection_name=collection_name,
+                    query=self._recommend_query(
+                        {"positive": positive, "negative": negative, "strategy": strategy}
+                    ),
+                    query_filter=query_filter,
+                    limit=limit,
+                    score_threshold=score_threshold
+                )
+            return response.points
+        except Exception as e:
+            print(f"推荐搜索失败: {str(e)}")
+            self.metrics.incr("errors", stage="recommend")
+            return []
+
+    async def search_by_id(
+        self,
+        collection_name: str,
+        point_id: Union[int, str],
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        query_filter: Optional[Filter] = None
+    ) -> List[PointStruct]:
+        """
+        以已存储点的向量作为查询向量搜索相似向量
+        :param collection_name: 集合名称
+        :param point_id: 点ID
+        :param limit: 返回结果数量限制
+        :param score_threshold: 相似度阈值
+        :param query_filter: 可选的载荷过滤条件
+        :return: 搜索结果列表，不包含该点本身
+        """
+        return await self.recommend(
+            collection_name, [point_id], limit=limit, score_threshold=score_threshold, query_filter=query_filter
+        )
+
+    async def recommend_batch(self, collection_name: str, requests: List[Dict]) -> List[List[PointStruct]]:
+        """
+        批量推荐搜索，所有请求在一次往返中完成
+        :param collection_name: 集合名称
+        :param requests: 推荐请求列表，每个请求包含以下字段：
+            - positive: 正样本点ID列表
+            - negative: 可选的负样本点ID列表
+            - limit: 返回结果数量限制
+            - score_threshold: 可选的相似度阈值
+            - filter: 可选的载荷过滤条件
+            - strategy: 可选的推荐策略
+        :return: 搜索结果列表的列表
+        """
+        if not requests:
+            return []
+        try:
+            with self.metrics.timer("recommend"):
+                responses = await self.client.query_batch_points(
+                    collection_name=collection_name,
+                    requests=[
+                        QueryRequest(
+                            query=self._recommend_query(request),
+                            filter=request.get("filter"),
+                            limit=request.get("limit", 10),
+                            score_threshold=request.get("score_threshold"),
+                            with_payload=True
+                        )
+                        for request in requests
+                    ]
+                )
+            return [response.points for response in responses]
+        except Exception as e:
+            print(f"批量推荐搜索失败: {str(e)}")
+            self.metrics.incr("errors", stage="recommend")
+            return []
+
+    async def query_points_groups(
+        self,
+        collection_name: str,
+        vector: List[float],
+        group_by: str,
+        limit: int = 10,
+        group_size: int = 1,
+        score_threshold: float = 0.0
+    ) -> List[PointGroup]:
+        """
+        按载荷字段分组搜索相似向量
+        :param collection_name: 集合名称
+        :param vector: 查询向量
+        :param group_by: 用于分组的载荷字段
+        :param limit: 返回的分组数量限制
+        :param group_size: 每个分组返回的结果数量
+        :param score_threshold: 相似度阈值
+        :return: 分组结果列表
+        """
+        try:
+            with self.metrics.timer("search_groups"):
+                response = await self.client.query_points_groups(
+                    collection_name=collection_name,
+                    query=vector,
+                    group_by=group_by,
+                    limit=limit,
+                    group_size=group_size,
+                    score_threshold=score_threshold
+                )
+            return response.groups
+        except Exception as e:
+            print(f"分组搜索失败: {str(e)}")
+            self.metrics.incr("errors", stage="search_groups")
+            return []
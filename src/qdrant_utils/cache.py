@@ -0,0 +1,225 @@
+"""
+搜索结果缓存模块：按集合、量化后的查询向量与搜索参数缓存结果，写入后按集合失效。
+"""
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+import asyncio
+import hashlib
+import threading
+import time
+import numpy as np
+from .metrics import Metrics, NULL_METRICS
+
+
+def _model_key(value: Any) -> Optional[str]:
+    """将过滤条件、搜索参数等模型对象转换为可哈希的字符串"""
+    if value is None:
+        return None
+    if hasattr(value, "model_dump_json"):
+        return value.model_dump_json(exclude_none=True)
+    return repr(value)
+
+
+class SearchResultCache:
+    """
+    搜索结果缓存。
+
+    缓存键由集合名称、量化后的查询向量哈希、limit、score_threshold、过滤条件、搜索参数和分片键组成，
+    按 LRU 淘汰并支持过期时间。每个集合维护一个版本号，通过本库写入、删除集合或切换别名时
+    版本号加一，旧版本的缓存项不再命中；版本号变化前发起、变化后才返回的请求结果不会写入缓存。
+    相同的未命中请求并发到达时只向服务端发起一次请求，其余请求等待同一结果。
+
+    版本号按传入的集合名称（或别名）维护，绕过本库直接写入、或通过真实集合名写入而通过别名
+    查询时，缓存只能依靠过期时间失效。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl: Optional[float] = 300.0,
+        precision: int = 4,
+        metrics: Optional[Metrics] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        初始化缓存。
+
+        参数：
+            max_entries: 最多缓存的结果数量
+            ttl: 缓存项的有效期（秒），None 表示不过期
+            precision: 计算哈希前查询向量保留的小数位数，差异小于该精度的向量视为同一查询
+            metrics: 可选的指标记录器，记录命中、未命中与合并的请求数
+            clock: 时间函数，测试时可替换
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.scale = 10.0 ** precision
+        self.metrics = metrics or NULL_METRICS
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, List[Any]]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._inflight: Dict[Hashable, Future] = {}
+        self._async_inflight: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def make_key(
+        self,
+        collection_name: str,
+        vector: Sequence[float],
+        limit: int,
+        score_threshold: Optional[float],
+        query_filter: Any = None,
+        search_params: Any = None,
+        shard_keys: Any = None
+    ) -> Hashable:
+        """
+        生成缓存键。
+
+        参数：
+            collection_name: 集合名称
+            vector: 查询向量
+            limit: 返回结果数量限制
+            score_threshold: 相似度阈值
+            query_filter: 可选的载荷过滤条件
+            search_params: 可选的搜索参数
+            shard_keys: 可选的目标分片键
+
+        返回：
+            Hashable: 缓存键
+        """
+        quantized = np.round(np.asarray(vector, dtype=np.float64) * self.scale).astype(np.int64)
+        digest = hashlib.blake2b(quantized.tobytes(), digest_size=16).hexdigest()
+        return (
+            collection_name, digest, limit, score_threshold,
+            _model_key(query_filter), _model_key(search_params), repr(shard_keys)
+        )
+
+    def generation(self, collection_name: str) -> int:
+        """返回集合当前的版本号"""
+        with self._lock:
+            return self._generations.get(collection_name, 0)
+
+    def invalidate(self, collection_name: str) -> None:
+        """
+        使集合的全部缓存失效。
+
+        参数：
+            collection_name: 集合名称或别名
+        """
+        with self._lock:
+            self._generations[collection_name] = self._generations.get(collection_name, 0) + 1
+
+    def clear(self) -> None:
+        """清空全部缓存项"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key: Hashable) -> Tuple[Optional[List[Any]], Hashable, int]:
+        """在锁内查找缓存项，返回 (结果, 带版本号的请求键, 当前版本号)"""
+        generation = self._generations.get(key[0], 0)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, entry_generation, results = entry
+            if entry_generation == generation and (expires_at is None or expires_at > self.clock()):
+                self._entries.move_to_end(key)
+                return results, None, generation
+            del self._entries[key]
+        return None, (key, generation), generation
+
+    def _store(self, key: Hashable, generation: int, results: List[Any]) -> None:
+        with self._lock:
+            if self._generations.get(key[0], 0) != generation:
+                # 请求期间集合被写入，结果可能已过时
+                return
+            expires_at = None if self.ttl is None else self.clock() + self.ttl
+            self._entries[key] = (expires_at, generation, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], List[Any]]) -> List[Any]:
+        """
+        返回缓存的结果，未命中时调用 fetch 并缓存其结果。
+
+        fetch 抛出的异常会传给所有等待同一请求的调用方，且不写入缓存。
+
+        参数：
+            key: make_key 生成的缓存键
+            fetch: 向服务端发起请求的函数
+
+        返回：
+            List: 结果列表的副本
+        """
+        with self._lock:
+            results, request_key, generation = self._lookup(key)
+            if results is not None:
+                self.metrics.incr("cache_hits", stage="search")
+                return list(results)
+            future = self._inflight.get(request_key)
+            owner = future is None
+            if owner:
+                future = self._inflight[request_key] = Future()
+        if not owner:
+            self.metrics.incr("cache_coalesced", stage="search")
+            return list(future.result())
+
+        self.metrics.incr("cache_misses", stage="search")
+        try:
+            results = fetch()
+            self._store(key, generation, results)
+            future.set_result(results)
+            return list(results)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(request_key, None)
+
+    async def get_or_fetch_async(self, key: Hashable, fetch: Callable[[], Awaitable[List[Any]]]) -> List[Any]:
+        """
+        get_or_fetch 的异步版本，fetch 为返回协程的函数。
+
+        合并请求基于当前事件循环的 Future，同一缓存实例只应在一个事件循环中使用异步接口。
+        """
+        with self._lock:
+            results, request_key, generation = self._lookup(key)
+            if results is not None:
+                self.metrics.incr("cache_hits", stage="search")
+                return list(results)
+            future = self._async_inflight.get(request_key)
+            owner = future is None
+            if owner:
+                future = self._async_inflight[request_key] = asyncio.get_running_loop().create_future()
+        if not owner:
+            self.metrics.incr("cache_coalesced", stage="search")
+            try:
+                # 等待方被取消时不影响发起请求的一方
+                return list(await asyncio.shield(future))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+            # 发起请求的一方被取消（如超过其截止时间），由当前等待方重新发起
+            return await self.get_or_fetch_async(key, fetch)
+
+        self.metrics.incr("cache_misses", stage="search")
+        try:
+            results = await fetch()
+            self._store(key, generation, results)
+            future.set_result(results)
+            return list(results)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # 没有等待方时避免事件循环报告未读取的异常
+                future.exception()
+            raise
+        finally:
+            with self._lock:
+                self._async_inflight.pop(request_key, None)
@@ -0,0 +1,90 @@
+"""
+长文档切分模块，按 token 滑动窗口将文档切分为带重叠的片段。
+"""
+from typing import List, Any, Optional, Union
+import uuid
+
+# 片段点 ID 的命名空间，保证同一文档同一片段的 ID 稳定
+CHUNK_NAMESPACE = uuid.UUID("5b0c7d2e-3f4a-4e8b-9c1d-2a6f8e0b4c71")
+
+
+def chunk_point_id(parent_id: Union[int, str], chunk_index: int) -> str:
+    """
+    生成片段对应的点 ID。
+
+    参数：
+        parent_id: 父文档 ID
+        chunk_index: 片段在文档中的序号
+
+    返回：
+        str: 由父文档 ID 和片段序号确定的 UUID 字符串
+    """
+    return str(uuid.uuid5(CHUNK_NAMESPACE, f"{parent_id}:{chunk_index}"))
+
+
+class TextChunker:
+    """基于 token 的滑动窗口切分器"""
+
+    def __init__(
+        self,
+        tokenizer: Optional[Any] = None,
+        chunk_size: int = 510,
+        overlap: int = 64
+    ):
+        """
+        初始化切分器。
+
+        参数：
+            tokenizer: HuggingFace 快速分词器，为 None 或不支持偏移量时按字符切分
+            chunk_size: 每个片段的最大 token 数（不含特殊 token）
+            overlap: 相邻片段重叠的 token 数
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size 必须大于 0")
+        if not 0 <= overlap < chunk_size:
+            raise ValueError("overlap 必须大于等于 0 且小于 chunk_size")
+        self.tokenizer = tokenizer
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+    def _offsets(self, text: str) -> List[tuple]:
+        """
+        获取每个 token 在原文中的字符区间。
+
+        参数：
+            text: 文本
+
+        返回：
+            List[tuple]: (起始位置, 结束位置) 列表
+        """
+        if self.tokenizer is not None and getattr(self.tokenizer, "is_fast", False):
+            encoded = self.tokenizer(
+                text,
+                add_special_tokens=False,
+                return_offsets_mapping=True
+            )
+            return [tuple(offset) for offset in encoded["offset_mapping"]]
+        return [(i, i + 1) for i in range(len(text))]
+
+    def split(self, text: str) -> List[str]:
+        """
+        将文本切分为带重叠的片段。
+
+        参数：
+            text: 文本
+
+        返回：
+            List[str]: 片段列表，短文本返回只含原文的列表
+        """
+        offsets = self._offsets(text)
+        if len(offsets) <= self.chunk_size:
+            return [text]
+
+        chunks = []
+        stride = self.chunk_size - self.overlap
+        for start in range(0, len(offsets), stride):
+            window = offsets[start:start + self.chunk_size]
+            chunks.append(text[window[0][0]:window[-1][1]])
+            if start + self.chunk_size >= len(offsets):
+                break
+        return chunks
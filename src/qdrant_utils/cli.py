@@ -0,0 +1,141 @@
+"""
+命令行入口：python -m qdrant_utils <命令>。
+
+示例：
+    python -m qdrant_utils ingest titles-*.jsonl --collection titles --text-field title --id-field id
+    python -m qdrant_utils ingest books.parquet --collection books --text-field title --payload-fields author tags --url http://localhost:6333
+"""
+from typing import List, Optional
+import argparse
+from qdrant_client import QdrantClient
+from .adaptive import AdaptiveBatchSizer
+from .client import QdrantClientConfig
+from .embeddings import TransformerEmbedding
+from .indexer import TextIndexer
+from .ingest import ColumnMapping, ingest_files, READERS
+from .jobs import IngestCheckpoint
+from .metrics import InMemoryMetrics
+from .operations import QdrantOperations
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    构建命令行参数解析器。
+
+    返回：
+        ArgumentParser: 参数解析器
+    """
+    parser = argparse.ArgumentParser(prog="python -m qdrant_utils", description="Qdrant 工具命令行")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="将 JSONL、CSV、Parquet 文件写入集合")
+    ingest.add_argument("paths", nargs="+", help="数据文件，多个文件并行读取，按给定顺序写入")
+    ingest.add_argument("--collection", required=True, help="目标集合，不存在时自动创建")
+    ingest.add_argument("--format", choices=sorted(READERS), help="文件格式，默认按扩展名判断")
+    ingest.add_argument("--text-field", default="text", help="文本列")
+    ingest.add_argument("--id-field", help="点ID列，不指定时按记录位置分配")
+    ingest.add_argument("--payload-fields", nargs="*", help="写入载荷的列，不指定时写入除文本列和ID列外的全部列")
+    ingest.add_argument("--model", default="BAAI/bge-large-zh-v1.5", help="向量模型名称或本地路径")
+    ingest.add_argument("--output-dim", type=int, help="向量截断维度")
+    ingest.add_argument("--datatype", default="float32", choices=["float32", "float16", "uint8"])
+    ingest.add_argument("--tokenize-workers", type=int, default=1, help="分词线程数量")
+    ingest.add_argument("--token-cache-size", type=int, default=0, help="token ID 缓存的最大文本数，重复文本较多时开启")
+    ingest.add_argument("--url", help="Qdrant 服务地址，不指定时使用 QDRANT_HOST/QDRANT_PORT")
+    ingest.add_argument("--api-key", help="Qdrant API 密钥，默认读取 QDRANT_API_KEY")
+    ingest.add_argument("--checkpoint", help="检查点文件，默认为 <collection>.ingest.json")
+    ingest.add_argument("--restart", action="store_true", help="删除检查点，从头开始写入")
+    ingest.add_argument("--readers", type=int, default=4, help="同时读取的文件数量")
+    ingest.add_argument("--chunk-size", type=int, default=1024, help="每块的记录数，每块写入后保存一次检查点")
+    ingest.add_argument("--embed-batch", type=int, help="固定的向量化批次大小，默认按实测耗时自动调整")
+    ingest.add_argument("--upsert-batch", type=int, help="固定的上传批次大小，默认按实测耗时自动调整")
+    ingest.add_argument("--id-offset", type=int, default=0, help="按位置分配点ID时的起始值")
+    ingest.add_argument("--no-dedup", action="store_true", help="不合并重复文本")
+    ingest.add_argument("--report-interval", type=float, default=5.0, help="吞吐量报告间隔（秒）")
+    return parser
+
+
+def run_ingest(args: argparse.Namespace, indexer: TextIndexer) -> bool:
+    """
+    执行 ingest 命令。
+
+    参数：
+        args: 解析后的命令行参数
+        indexer: 目标集合的索引管理器
+
+    返回：
+        bool: 全部写入成功返回True
+    """
+    indexer.create_index()
+    checkpoint_path = args.checkpoint or f"{args.collection}.ingest.json"
+    if args.restart:
+        IngestCheckpoint(checkpoint_path).reset()
+    return ingest_files(
+        indexer,
+        args.paths,
+        ColumnMapping(args.text_field, id_field=args.id_field, payload_fields=args.payload_fields),
+        checkpoint_path,
+        file_format=args.format,
+        readers=args.readers,
+        chunk_size=args.chunk_size,
+        id_offset=args.id_offset,
+        report_interval=args.report_interval
+    )
+
+
+def build_indexer(args: argparse.Namespace) -> TextIndexer:
+    """
+    按命令行参数创建向量模型、客户端与索引管理器。
+
+    未指定固定批次大小时，向量化与上传批次由 AdaptiveBatchSizer 按实测耗时调整。
+
+    参数：
+        args: 解析后的命令行参数
+
+    返回：
+        TextIndexer: 索引管理器
+    """
+    metrics = InMemoryMetrics()
+    if args.url:
+        client = QdrantClient(url=args.url, api_key=args.api_key)
+    else:
+        client = QdrantClientConfig(api_key=args.api_key).get_client()
+    model = TransformerEmbedding(
+        args.model,
+        output_dim=args.output_dim,
+        datatype=args.datatype,
+        metrics=metrics,
+        tokenize_workers=args.tokenize_workers,
+        token_cache_size=args.token_cache_size
+    )
+    return TextIndexer(
+        model,
+        QdrantOperations(client, metrics=metrics),
+        args.collection,
+        dedup=not args.no_dedup,
+        metrics=metrics,
+        embed_batch=_batch_sizer(args.embed_batch, initial=32, max_size=256, target_latency=0.5),
+        upsert_batch=_batch_sizer(args.upsert_batch, initial=256, max_size=4096, target_latency=2.0)
+    )
+
+
+def _batch_sizer(fixed: Optional[int], **kwargs) -> AdaptiveBatchSizer:
+    """返回批次大小控制器，指定了固定大小时上下限都取该值"""
+    if fixed:
+        return AdaptiveBatchSizer(initial=fixed, min_size=fixed, max_size=fixed)
+    return AdaptiveBatchSizer(**kwargs)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    命令行入口。
+
+    参数：
+        argv: 命令行参数，默认读取 sys.argv
+
+    返回：
+        int: 退出码，成功为 0
+    """
+    args = build_parser().parse_args(argv)
+    if args.command == "ingest":
+        return 0 if run_ingest(args, build_indexer(args)) else 1
+    return 2
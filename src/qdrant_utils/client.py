@@ -1,8 +1,9 @@
 """
 Qdrant客户端配置模块。
 """
-from typing import Optional
+from typing import Dict, Optional, Tuple
 import os
+import threading
 from dotenv import load_dotenv
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as rest
@@ -12,6 +13,10 @@ load_dotenv()
 class QdrantClientConfig:
     """Qdrant客户端配置类。"""
     
+    # 按连接参数缓存的共享客户端
+    _shared_clients: Dict[Tuple, QdrantClient] = {}
+    _shared_lock = threading.Lock()
+    
     def __init__(
         self,
         host: Optional[str] = None,
@@ -45,4 +50,20 @@ class QdrantClientConfig:
             port=self.port,
             api_key=self.api_key,
             https=self.https
-        ) 
\ No newline at end of file
+        )
+
+    def get_shared_client(self) -> QdrantClient:
+        """
+        获取共享的Qdrant客户端实例。
+
+        相同连接参数的配置返回同一个客户端，多个索引管理器、租户路由和扇出搜索
+        共用一个连接池，避免每个集合各自建立连接。
+
+        返回：
+            QdrantClient: 共享的客户端实例
+        """
+        key = (self.host, self.port, self.api_key, self.https)
+        with QdrantClientConfig._shared_lock:
+            if key not in QdrantClientConfig._shared_clients:
+                QdrantClientConfig._shared_clients[key] = self.get_client()
+            return QdrantClientConfig._shared_clients[key] 
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""
+文本去重模块，在向量化之前合并重复文本。
+"""
+from typing import List, Dict, Any
+import hashlib
+import re
+import unicodedata
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    规范化文本，用于判断两段文本是否重复。
+
+    依次执行 NFKC 规范化（统一全角/半角）、合并连续空白、去除首尾空白并转为小写。
+
+    参数：
+        text: 原始文本
+
+    返回：
+        str: 规范化后的文本
+    """
+    text = unicodedata.normalize("NFKC", text)
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    return text.lower()
+
+
+def text_hash(text: str) -> str:
+    """
+    计算文本规范化后的哈希值。
+
+    参数：
+        text: 原始文本
+
+    返回：
+        str: 十六进制哈希字符串
+    """
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class DedupResult:
+    """去重结果，记录唯一文本及每个原始位置对应的唯一文本下标。"""
+
+    def __init__(self, unique_texts: List[str], inverse: List[int]):
+        """
+        初始化去重结果。
+
+        参数：
+            unique_texts: 去重后的文本列表（保留首次出现的原文）
+            inverse: 原始位置到 unique_texts 下标的映射
+        """
+        self.unique_texts = unique_texts
+        self.inverse = inverse
+
+    @property
+    def total(self) -> int:
+        """原始文本数量"""
+        return len(self.inverse)
+
+    @property
+    def unique(self) -> int:
+        """唯一文本数量"""
+        return len(self.unique_texts)
+
+    @property
+    def ratio(self) -> float:
+        """去重比例，即被合并掉的文本占原始文本的比例"""
+        if not self.inverse:
+            return 0.0
+        return 1.0 - self.unique / self.total
+
+    def scatter(self, items: List[Any]) -> List[Any]:
+        """
+        将按唯一文本计算出的结果分发回所有原始位置。
+
+        参数：
+            items: 与 unique_texts 一一对应的结果列表
+
+        返回：
+            List: 与原始文本一一对应的结果列表
+        """
+        return [items[j] for j in self.inverse]
+
+
+def deduplicate_texts(texts: List[str]) -> DedupResult:
+    """
+    对文本列表去重。
+
+    参数：
+        texts: 文本列表
+
+    返回：
+        DedupResult: 去重结果
+    """
+    positions: Dict[str, int] = {}
+    unique_texts = []
+    inverse = []
+    for text in texts:
+        key = text_hash(text)
+        index = positions.get(key)
+        if index is None:
+            index = len(unique_texts)
+            positions[key] = index
+            unique_texts.append(text)
+        inverse.append(index)
+    return DedupResult(unique_texts, inverse)
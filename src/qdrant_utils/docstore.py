@@ -0,0 +1,135 @@
+"""
+外部文档存储模块：全文保存在本地 SQLite 中，Qdrant 只保存点ID与用于过滤的小字段。
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Sequence, Union
+import json
+import sqlite3
+import threading
+
+PointId = Union[int, str]
+
+
+class DocumentStore(ABC):
+    """文档存储基类，按点ID保存与批量读取文本"""
+
+    @abstractmethod
+    def put_many(self, ids: Sequence[PointId], texts: Sequence[str]) -> None:
+        """
+        批量写入文本，已存在的ID会被覆盖
+        :param ids: 点ID列表
+        :param texts: 与 ids 一一对应的文本列表
+        """
+        pass
+
+    @abstractmethod
+    def get_many(self, ids: Iterable[PointId]) -> Dict[PointId, str]:
+        """
+        批量读取文本
+        :param ids: 点ID列表
+        :return: 点ID到文本的映射，不存在的ID不出现在结果中
+        """
+        pass
+
+    @abstractmethod
+    def delete_many(self, ids: Iterable[PointId]) -> None:
+        """
+        批量删除文本
+        :param ids: 点ID列表
+        """
+        pass
+
+    def close(self) -> None:
+        """释放底层资源"""
+        pass
+
+    def hydrate(self, hits_list: List[List[Dict]], text_key: str = "title") -> List[List[Dict]]:
+        """
+        为多组搜索结果补全文本，所有结果的ID合并后只读取一次
+        :param hits_list: 搜索结果列表的列表，每条结果包含 id 和 payload
+        :param text_key: 写入载荷的文本字段
+        :return: 原结果列表，载荷中补充了文本字段
+        """
+        ids = list({hit["id"]: None for hits in hits_list for hit in hits})
+        if not ids:
+            return hits_list
+        texts = self.get_many(ids)
+        for hits in hits_list:
+            for hit in hits:
+                if hit["id"] in texts:
+                    hit["payload"] = {**(hit["payload"] or {}), text_key: texts[hit["id"]]}
+        return hits_list
+
+
+class SQLiteDocumentStore(DocumentStore):
+    """
+    基于 SQLite 的文档存储。
+
+    使用 WAL 日志和内存映射读取，读多写少时查询只需少量系统调用。点ID以 JSON 编码后作为主键，
+    整数ID与字符串ID互不冲突。连接在线程间共享，由内部锁串行化访问。
+    """
+
+    # 单条 SQL 中绑定的最大参数数量
+    MAX_VARIABLES = 500
+
+    def __init__(self, path: str, mmap_size: int = 256 * 1024 * 1024):
+        """
+        初始化文档存储。
+
+        参数：
+            path: 数据库文件路径，":memory:" 表示内存数据库
+            mmap_size: SQLite 内存映射读取的最大字节数，0 表示不使用内存映射
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents (id TEXT PRIMARY KEY, text TEXT NOT NULL) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _key(point_id: PointId) -> str:
+        return json.dumps(point_id)
+
+    def _chunks(self, ids: Iterable[PointId]) -> Iterable[List[PointId]]:
+        ids = list(ids)
+        for start in range(0, len(ids), self.MAX_VARIABLES):
+            yield ids[start:start + self.MAX_VARIABLES]
+
+    def put_many(self, ids: Sequence[PointId], texts: Sequence[str]) -> None:
+        rows = [(self._key(point_id), text) for point_id, text in zip(ids, texts)]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO documents (id, text) VALUES (?, ?)", rows)
+
+    def get_many(self, ids: Iterable[PointId]) -> Dict[PointId, str]:
+        result = {}
+        with self._lock:
+            for chunk in self._chunks(ids):
+                keys = {self._key(point_id): point_id for point_id in chunk}
+                placeholders = ",".join("?" * len(keys))
+                for key, text in self._conn.execute(
+                    f"SELECT id, text FROM documents WHERE id IN ({placeholders})", list(keys)
+                ):
+                    result[keys[key]] = text
+        return result
+
+    def delete_many(self, ids: Iterable[PointId]) -> None:
+        with self._lock, self._conn:
+            for chunk in self._chunks(ids):
+                placeholders = ",".join("?" * len(chunk))
+                self._conn.execute(
+                    f"DELETE FROM documents WHERE id IN ({placeholders})",
+                    [self._key(point_id) for point_id in chunk]
+                )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
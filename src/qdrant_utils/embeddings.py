@@ -1,22 +1,120 @@
 """
 文本向量生成模块。
 """
-from typing import List
+from typing import Any, Dict, List, Optional
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import copy
+import threading
+import time
 import numpy as np
 import torch
 from abc import ABC, abstractmethod
 from transformers import AutoTokenizer, AutoModel
-import torch.nn.functional as F
+from .metrics import Metrics, NULL_METRICS
+from .adaptive import AdaptiveBatchSizer
+
+# 支持的向量存储类型，与 Qdrant 的 Datatype 取值一致
+SUPPORTED_DATATYPES = ("float32", "float16", "uint8")
+
+def quantize_uint8(vectors: np.ndarray) -> np.ndarray:
+    """
+    将归一化向量线性映射到 uint8
+    :param vectors: 取值范围为 [-1, 1] 的向量矩阵
+    :return: 取值范围为 [0, 255] 的 uint8 向量矩阵
+    """
+    return np.clip(np.rint((vectors + 1.0) * 127.5), 0, 255).astype(np.uint8)
+
+def postprocess_vectors(
+    vectors: np.ndarray,
+    output_dim: Optional[int] = None,
+    datatype: str = "float32"
+) -> np.ndarray:
+    """
+    截断向量维度、重新归一化并转换存储类型
+    :param vectors: 向量矩阵，形状为 (n, hidden_size)
+    :param output_dim: 输出维度，为 None 时保留全部维度
+    :param datatype: 存储类型，取值见 SUPPORTED_DATATYPES
+    :return: 处理后的向量矩阵
+    """
+    if datatype not in SUPPORTED_DATATYPES:
+        raise ValueError(f"不支持的向量类型：{datatype}")
+    if output_dim:
+        vectors = vectors[:, :output_dim]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.maximum(norms, 1e-12)
+    if datatype == "uint8":
+        return quantize_uint8(vectors)
+    return vectors.astype(np.float16 if datatype == "float16" else np.float32)
+
+def to_query_vector(vector: np.ndarray, datatype: str = "float32") -> List[float]:
+    """
+    将向量转换为查询参数
+    
+    uint8 集合存储的是经 quantize_uint8 平移到 [0, 255] 的向量，[-1, 1] 内的浮点查询向量与其
+    相似度远低于正常范围，会被默认阈值过滤，因此浮点查询向量先归一化并按同样的方式映射后再发送；
+    已是 uint8 的向量（模型按 uint8 输出）保持不变。查询向量始终以浮点数列表发送。
+    :param vector: 向量
+    :param datatype: 集合的向量存储类型，取值见 SUPPORTED_DATATYPES
+    :return: 浮点数列表
+    """
+    vector = np.asarray(vector)
+    if datatype == "uint8" and vector.dtype != np.uint8:
+        vector = vector.astype(np.float32)
+        vector = quantize_uint8(vector / max(float(np.linalg.norm(vector)), 1e-12))
+    return vector.astype(np.float32).tolist()
+
+def generate_vectors_adaptive(
+    model: "TextEmbedding",
+    texts: List[str],
+    sizer: AdaptiveBatchSizer,
+    metrics: Metrics = NULL_METRICS
+) -> List[np.ndarray]:
+    """
+    按批次大小控制器逐个微批次向量化，并上报每个微批次前向计算的耗时
+    
+    当前微批次前向计算时，下一个微批次已通过 submit_tokenize 提交分词。下一个微批次按提交时
+    控制器给出的大小切分，因此根据当前微批次耗时做出的调整从再下一个微批次开始生效。
+    前向计算等待分词的耗时记录为 tokenize_wait 阶段。
+    :param model: 向量模型
+    :param texts: 文本列表
+    :param sizer: 批次大小控制器
+    :param metrics: 指标记录器
+    :return: 向量列表
+    """
+    vectors: List[np.ndarray] = []
+    position = 0
+    batch = texts[:sizer.size]
+    pending = model.submit_tokenize(batch) if batch else None
+    while pending is not None:
+        with metrics.timer("tokenize_wait"):
+            tokens = pending.result()
+        position += len(batch)
+        current, batch = batch, texts[position:position + sizer.size]
+        pending = model.submit_tokenize(batch) if batch else None
+        start = time.perf_counter()
+        vectors.extend(model.embed_tokens(tokens))
+        sizer.record(len(current), time.perf_counter() - start)
+        metrics.observe("batch_size", len(current), stage="embed_adaptive")
+    return vectors
 
 class TextEmbedding(ABC):
     """文本向量生成基类"""
     
+    # 指标记录器，子类可在初始化时替换
+    metrics: Metrics = NULL_METRICS
+    
     @property
     @abstractmethod
     def vector_size(self) -> int:
         """向量维度"""
         pass
     
+    @property
+    def datatype(self) -> str:
+        """向量存储类型"""
+        return "float32"
+    
     @abstractmethod
     def generate_vector(self, texts: List[str]) -> List[np.ndarray]:
         """
@@ -25,89 +123,281 @@ class TextEmbedding(ABC):
         :return: 向量列表
         """
         pass
+    
+    def tokenize(self, texts: List[str]) -> Any:
+        """
+        分词阶段，默认不做处理，文本原样交给 embed_tokens
+        :param texts: 文本列表
+        :return: 模型输入
+        """
+        return list(texts)
+    
+    def embed_tokens(self, tokens: Any) -> List[np.ndarray]:
+        """
+        对 tokenize 的结果生成向量，默认调用 generate_vector
+        :param tokens: 模型输入
+        :return: 向量列表
+        """
+        return self.generate_vector(tokens)
+    
+    def submit_tokenize(self, texts: List[str]) -> Future:
+        """
+        提交分词，默认在当前线程中同步执行
+        :param texts: 文本列表
+        :return: 结果为 tokenize(texts) 的 Future
+        """
+        future = Future()
+        try:
+            future.set_result(self.tokenize(texts))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    
+    def generate_vector_batched(self, texts: List[str], batch_size: int = 32) -> List[np.ndarray]:
+        """
+        分批生成文本的向量表示
+        
+        按文本长度排序后切分微批次，使同一批次内的文本长度接近以减少填充，
+        最后按原始顺序返回。
+        :param texts: 文本列表
+        :param batch_size: 每个微批次的文本数量
+        :return: 向量列表
+        """
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors: List[np.ndarray] = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            batch_vectors = self.generate_vector([texts[i] for i in batch])
+            for i, vector in zip(batch, batch_vectors):
+                vectors[i] = vector
+        return vectors
 
-class BGEEmbedding(TextEmbedding):
-    """BGE 文本向量生成类"""
+class TransformerEmbedding(TextEmbedding):
+    """
+    基于 HuggingFace Transformers 的文本向量生成类
+
+    分词与前向计算是两个独立的阶段：generate_vector_batched 在后台线程中提前对后续微批次分词，
+    前向计算当前批次时下一批次的张量已经准备好。可选的 token ID 缓存使重复出现的文本不再分词。
+    """
     
-    def __init__(self, model_name: str = "BAAI/bge-large-zh-v1.5"):
+    def __init__(
+        self,
+        model_name: str,
+        output_dim: Optional[int] = None,
+        datatype: str = "float32",
+        max_length: int = 512,
+        metrics: Optional[Metrics] = None,
+        tokenize_workers: int = 1,
+        prefetch_batches: int = 2,
+        token_cache_size: int = 0
+    ):
         """
-        初始化 BGE 向量生成器。
+        初始化向量生成器。
         
         参数：
             model_name: 模型名称
+            output_dim: 输出维度，小于模型维度时截断并重新归一化
+            datatype: 向量存储类型，可选 float32、float16、uint8
+            max_length: 单个文本的最大 token 数
+            metrics: 可选的指标记录器，记录分词、等待分词、前向计算和后处理耗时
+            tokenize_workers: 分词线程数量，快速分词器在每个线程内部也会并行处理批次
+            prefetch_batches: 分批向量化时提前分词的微批次数量
+            token_cache_size: token ID 缓存的最大文本数，为 0 时不缓存
         """
+        if datatype not in SUPPORTED_DATATYPES:
+            raise ValueError(f"不支持的向量类型：{datatype}")
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.model = AutoModel.from_pretrained(model_name)
         self.model.eval()
-        self._vector_size = self.model.config.hidden_size
+        hidden_size = self.model.config.hidden_size
+        if output_dim is not None and not 0 < output_dim <= hidden_size:
+            raise ValueError(f"output_dim 必须在 1 到 {hidden_size} 之间")
+        self.output_dim = output_dim
+        self.max_length = max_length
+        self._datatype = datatype
+        self._vector_size = output_dim or hidden_size
+        self.metrics = metrics or NULL_METRICS
+        self.tokenize_workers = max(1, tokenize_workers)
+        self.prefetch_batches = max(1, prefetch_batches)
+        self.token_cache_size = token_cache_size
+        self._token_cache: "OrderedDict[str, Dict[str, List[int]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._local = threading.local()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
     
     @property
     def vector_size(self) -> int:
         """向量维度"""
         return self._vector_size
     
-    def generate_vector(self, texts: List[str]) -> List[np.ndarray]:
+    @property
+    def datatype(self) -> str:
+        """向量存储类型"""
+        return self._datatype
+    
+    def _thread_tokenizer(self):
         """
-        生成文本的向量表示
+        返回当前线程使用的分词器
+        
+        多个线程同时调用同一个快速分词器时，修改截断与填充设置会互相冲突，每个线程使用一份副本。
+        """
+        tokenizer = getattr(self._local, "tokenizer", None)
+        if tokenizer is None:
+            tokenizer = self._local.tokenizer = copy.deepcopy(self.tokenizer)
+        return tokenizer
+    
+    def _pad(self, features: List[Dict[str, List[int]]]) -> Dict[str, torch.Tensor]:
+        """
+        将未填充的分词结果在右侧填充为张量，与 tokenizer(..., padding=True) 的结果相同
+        :param features: 每个文本的 input_ids、attention_mask 等字段
+        :return: 模型输入张量
+        """
+        length = max(len(feature["input_ids"]) for feature in features)
+        batch = {}
+        for key in features[0]:
+            pad_value = self.tokenizer.pad_token_id if key == "input_ids" else 0
+            batch[key] = torch.tensor([
+                feature[key] + [pad_value] * (length - len(feature[key])) for feature in features
+            ])
+        return batch
+    
+    def tokenize(self, texts: List[str]) -> Dict[str, torch.Tensor]:
+        """
+        对文本分词并填充为模型输入张量，可在任意线程中调用
+        
+        设置了 token_cache_size 时先查找缓存，只对未缓存的文本分词。
         :param texts: 文本列表
+        :return: 模型输入张量
+        """
+        tokenizer = self._thread_tokenizer()
+        with self.metrics.timer("tokenize"):
+            if not self.token_cache_size:
+                return tokenizer(
+                    texts,
+                    padding=True,
+                    truncation=True,
+                    max_length=self.max_length,
+                    return_tensors='pt'
+                )
+            
+            features: Dict[str, Dict[str, List[int]]] = {}
+            with self._cache_lock:
+                for text in texts:
+                    if text in self._token_cache:
+                        self._token_cache.move_to_end(text)
+                        features[text] = self._token_cache[text]
+            missing = list(dict.fromkeys(text for text in texts if text not in features))
+            self.metrics.incr("cache_hits", len(texts) - len(missing), cache="tokens")
+            if missing:
+                encoded = tokenizer(missing, truncation=True, max_length=self.max_length)
+                with self._cache_lock:
+                    for i, text in enumerate(missing):
+                        features[text] = {key: encoded[key][i] for key in encoded.keys()}
+                        self._token_cache[text] = features[text]
+                    while len(self._token_cache) > self.token_cache_size:
+                        self._token_cache.popitem(last=False)
+            return self._pad([features[text] for text in texts])
+    
+    def embed_tokens(self, encoded_input: Dict[str, torch.Tensor]) -> List[np.ndarray]:
+        """
+        对分词结果执行前向计算与后处理
+        :param encoded_input: tokenize 返回的模型输入张量
         :return: 向量列表
         """
-        # 对文本进行编码
-        encoded_input = self.tokenizer(
-            texts,
-            padding=True,
-            truncation=True,
-            max_length=512,
-            return_tensors='pt'
-        )
+        if self.metrics is not NULL_METRICS:
+            self.metrics.observe("batch_size", len(encoded_input["input_ids"]), stage="embed")
+            self.metrics.incr("tokens", int(encoded_input["attention_mask"].sum()))
 
         # 生成向量
-        with torch.no_grad():
+        with self.metrics.timer("forward"), torch.no_grad():
             model_output = self.model(**encoded_input)
             embeddings = model_output[0][:, 0]  # 使用 [CLS] token 的输出作为句子表示
-            embeddings = F.normalize(embeddings, p=2, dim=1)  # L2 归一化
 
-        return [embedding.numpy() for embedding in embeddings]
-
-class Text2VecEmbedding(TextEmbedding):
-    """Text2Vec 文本向量生成类"""
+        # 截断维度、L2 归一化并转换存储类型
+        with self.metrics.timer("postprocess"):
+            vectors = postprocess_vectors(embeddings.numpy(), self.output_dim, self._datatype)
+        return list(vectors)
     
-    def __init__(self, model_name: str = "shibing624/text2vec-base-chinese"):
+    def generate_vector(self, texts: List[str]) -> List[np.ndarray]:
         """
-        初始化 Text2Vec 向量生成器。
-        
-        参数：
-            model_name: 模型名称
+        生成文本的向量表示
+        :param texts: 文本列表
+        :return: 向量列表
         """
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModel.from_pretrained(model_name)
-        self.model.eval()
-        self._vector_size = self.model.config.hidden_size
+        return self.embed_tokens(self.tokenize(texts))
     
-    @property
-    def vector_size(self) -> int:
-        """向量维度"""
-        return self._vector_size
+    def submit_tokenize(self, texts: List[str]) -> Future:
+        """
+        将分词提交到分词线程池，线程池在首次使用时创建
+        :param texts: 文本列表
+        :return: 结果为 tokenize(texts) 的 Future
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.tokenize_workers,
+                    thread_name_prefix="tokenize"
+                )
+        return self._executor.submit(self.tokenize, texts)
     
-    def generate_vector(self, texts: List[str]) -> List[np.ndarray]:
+    def generate_vector_batched(self, texts: List[str], batch_size: int = 32) -> List[np.ndarray]:
         """
-        生成文本的向量表示
+        分批生成文本的向量表示
+        
+        按文本长度排序后切分微批次。分词在线程池中提前进行，前向计算当前批次时后续最多
+        prefetch_batches 个批次已提交分词，前向计算等待分词的耗时记录为 tokenize_wait 阶段。
         :param texts: 文本列表
+        :param batch_size: 每个微批次的文本数量
         :return: 向量列表
         """
-        # 对文本进行编码
-        encoded_input = self.tokenizer(
-            texts,
-            padding=True,
-            truncation=True,
-            max_length=512,
-            return_tensors='pt'
-        )
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+        if len(batches) <= 1:
+            return super().generate_vector_batched(texts, batch_size)
+        
+        remaining = iter(batches)
+        pending = deque()
+        
+        def submit():
+            batch = next(remaining, None)
+            if batch is not None:
+                pending.append((batch, self.submit_tokenize([texts[i] for i in batch])))
+        
+        for _ in range(self.prefetch_batches):
+            submit()
+        vectors: List[np.ndarray] = [None] * len(texts)
+        while pending:
+            batch, future = pending.popleft()
+            with self.metrics.timer("tokenize_wait"):
+                encoded_input = future.result()
+            submit()
+            for i, vector in zip(batch, self.embed_tokens(encoded_input)):
+                vectors[i] = vector
+        return vectors
 
-        # 生成向量
-        with torch.no_grad():
-            model_output = self.model(**encoded_input)
-            embeddings = model_output[0][:, 0]  # 使用 [CLS] token 的输出作为句子表示
-            embeddings = F.normalize(embeddings, p=2, dim=1)  # L2 归一化
+class BGEEmbedding(TransformerEmbedding):
+    """BGE 文本向量生成类"""
+    
+    def __init__(self, model_name: str = "BAAI/bge-large-zh-v1.5", **kwargs):
+        """
+        初始化 BGE 向量生成器。
+        
+        参数：
+            model_name: 模型名称
+            kwargs: 传给 TransformerEmbedding 的其他参数（output_dim、datatype 等）
+        """
+        super().__init__(model_name, **kwargs)
 
-        return [embedding.numpy() for embedding in embeddings] 
\ No newline at end of file
+class Text2VecEmbedding(TransformerEmbedding):
+    """Text2Vec 文本向量生成类"""
+    
+    def __init__(self, model_name: str = "shibing624/text2vec-base-chinese", **kwargs):
+        """
+        初始化 Text2Vec 向量生成器。
+        
+        参数：
+            model_name: 模型名称
+            kwargs: 传给 TransformerEmbedding 的其他参数（output_dim、datatype 等）
+        """
+        super().__init__(model_name, **kwargs)
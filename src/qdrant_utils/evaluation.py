@@ -0,0 +1,321 @@
+"""
+召回率评估模块：以精确检索结果为基准，评估不同 HNSW 与量化搜索参数下的 recall@k 与查询延迟。
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import itertools
+import time
+import numpy as np
+from qdrant_client.http import models as rest
+from .indexer import TextIndexer
+from .operations import QdrantOperations
+
+
+def search_param_grid(
+    hnsw_ef: Iterable[int] = (16, 32, 64, 128, 256),
+    rescore: Iterable[Optional[bool]] = (None,),
+    oversampling: Iterable[Optional[float]] = (None,)
+) -> List[rest.SearchParams]:
+    """
+    生成搜索参数组合。
+
+    参数：
+        hnsw_ef: HNSW 搜索时的候选数量
+        rescore: 量化检索后是否用原始向量重打分，None 表示使用服务端默认值
+        oversampling: 量化检索的过采样倍数，None 表示不过采样
+
+    返回：
+        List[SearchParams]: 全部参数组合
+    """
+    grid = []
+    for ef, rescore_value, oversampling_value in itertools.product(hnsw_ef, rescore, oversampling):
+        quantization = None
+        if rescore_value is not None or oversampling_value is not None:
+            quantization = rest.QuantizationSearchParams(rescore=rescore_value, oversampling=oversampling_value)
+        grid.append(rest.SearchParams(hnsw_ef=ef, exact=False, quantization=quantization))
+    return grid
+
+
+def describe_params(params: Optional[rest.SearchParams]) -> str:
+    """
+    生成搜索参数的简短描述。
+
+    参数：
+        params: 搜索参数
+
+    返回：
+        str: 如 "ef=64 rescore=True oversampling=2.0"
+    """
+    if params is None:
+        return "default"
+    if params.exact:
+        return "exact"
+    parts = [f"ef={params.hnsw_ef}" if params.hnsw_ef is not None else "ef=default"]
+    if params.quantization is not None:
+        if params.quantization.rescore is not None:
+            parts.append(f"rescore={params.quantization.rescore}")
+        if params.quantization.oversampling is not None:
+            parts.append(f"oversampling={params.quantization.oversampling}")
+    return " ".join(parts)
+
+
+def mark_pareto(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    标记召回率-延迟的帕累托最优配置。
+
+    某个配置的召回率不低于、p99 延迟不高于另一配置且至少一项严格更优时，后者被支配。
+    未被支配的配置 pareto 字段为 True。
+
+    参数：
+        results: evaluate 返回的结果列表
+
+    返回：
+        List[Dict]: 按 p50 延迟升序排列的结果列表
+    """
+    for row in results:
+        row["pareto"] = not any(
+            other["recall"] >= row["recall"] and other["p99_ms"] <= row["p99_ms"]
+            and (other["recall"] > row["recall"] or other["p99_ms"] < row["p99_ms"])
+            for other in results
+        )
+    return sorted(results, key=lambda row: (row["p50_ms"], -row["recall"]))
+
+
+def cheapest_config(results: List[Dict[str, Any]], target_recall: float) -> Optional[Dict[str, Any]]:
+    """
+    选出满足召回率目标且 p99 延迟最低的配置。
+
+    参数：
+        results: evaluate 返回的结果列表
+        target_recall: 召回率目标，如 0.95
+
+    返回：
+        Dict: 满足目标的配置，没有配置满足时返回None
+    """
+    candidates = [row for row in results if row["recall"] >= target_recall]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda row: (row["p99_ms"], row["p50_ms"]))
+
+
+def format_table(results: List[Dict[str, Any]], k: int) -> str:
+    """
+    将评估结果格式化为表格，帕累托最优的配置以 * 标记。
+
+    参数：
+        results: evaluate 返回的结果列表
+        k: recall@k 的 k
+
+    返回：
+        str: 表格文本
+    """
+    lines = [f"{'config':<36} {'recall@' + str(k):>10} {'p50_ms':>9} {'p99_ms':>9} {'mean_ms':>9}  pareto"]
+    for row in results:
+        lines.append(
+            f"{row['config']:<36} {row['recall']:>10.4f} {row['p50_ms']:>9.3f} "
+            f"{row['p99_ms']:>9.3f} {row['mean_ms']:>9.3f}  {'*' if row.get('pareto') else ''}"
+        )
+    return "\n".join(lines)
+
+
+class RecallEvaluator:
+    """
+    基于 TextIndexer 的召回率-延迟评估器。
+
+    从集合载荷（或索引管理器的文档存储）中抽取查询文本，或使用给定的查询，用索引管理器的
+    向量模型生成查询向量，以精确检索结果为基准计算每组搜索参数的 recall@k 和 p50/p99 延迟，
+    用于选择满足召回率目标的最低成本配置。基准可以由 Qdrant 精确搜索（exact=True）得到，也可以读取
+    集合全部向量后在本地用 NumPy 暴力计算。
+
+    评估时绕过结果缓存，延迟只包含向量检索请求，不包含查询向量化。
+    """
+
+    def __init__(
+        self,
+        indexer: TextIndexer,
+        k: int = 10,
+        ground_truth: str = "exact",
+        text_key: str = "title",
+        repeats: int = 1,
+        warmup: bool = True
+    ):
+        """
+        初始化评估器。
+
+        参数：
+            indexer: 文本索引管理器
+            k: recall@k 的 k
+            ground_truth: 基准结果的计算方式，"exact" 使用 Qdrant 精确搜索，"numpy" 在本地暴力计算
+            text_key: 载荷中保存文本的字段
+            repeats: 每组参数下每个查询的重复次数，召回率取第一次的结果
+            warmup: 每组参数正式计时前是否先把全部查询执行一遍
+        """
+        if ground_truth not in ("exact", "numpy"):
+            raise ValueError(f"不支持的基准计算方式: {ground_truth}")
+        self.indexer = indexer
+        self.k = k
+        self.ground_truth = ground_truth
+        self.text_key = text_key
+        self.repeats = repeats
+        self.warmup = warmup
+        # 不使用结果缓存的操作类，避免缓存命中影响延迟
+        self.qdrant_ops = QdrantOperations(indexer.qdrant_ops.client, metrics=indexer.qdrant_ops.metrics)
+        self.queries: List[str] = []
+        self.query_vectors: List[List[float]] = []
+        self.truth: List[List[Any]] = []
+
+    def _sample_texts(self, num_queries: int, seed: int) -> List[str]:
+        if self.indexer.doc_store is not None:
+            # 文本保存在外部文档存储中
+            ids = [record.id for record in self.qdrant_ops.scroll_all(self.indexer.collection_name, with_payload=False)]
+            stored = self.indexer.doc_store.get_many(ids)
+            texts = [stored[point_id] for point_id in ids if point_id in stored]
+        else:
+            texts = [
+                record.payload[self.text_key]
+                for record in self.qdrant_ops.scroll_all(self.indexer.collection_name, with_payload=[self.text_key])
+                if isinstance((record.payload or {}).get(self.text_key), str)
+            ]
+        if len(texts) <= num_queries:
+            return texts
+        rng = np.random.default_rng(seed)
+        return [texts[i] for i in sorted(rng.choice(len(texts), size=num_queries, replace=False))]
+
+    def _distance(self) -> rest.Distance:
+        try:
+            vectors = self.qdrant_ops.client.get_collection(self.indexer.collection_name).config.params.vectors
+            if isinstance(vectors, dict):
+                vectors = vectors.get("") or next(iter(vectors.values()))
+            return vectors.distance
+        except Exception:
+            return rest.Distance.COSINE
+
+    def _exact_truth(self) -> List[List[Any]]:
+        exact = rest.SearchParams(exact=True)
+        return [
+            [point.id for point in self.qdrant_ops.query_points(
+                self.indexer.collection_name, vector, limit=self.k, score_threshold=None, search_params=exact
+            )]
+            for vector in self.query_vectors
+        ]
+
+    def _numpy_truth(self) -> List[List[Any]]:
+        ids, vectors = [], []
+        for record in self.qdrant_ops.scroll_all(
+            self.indexer.collection_name, with_payload=False, with_vectors=[""]
+        ):
+            vector = record.vector.get("") if isinstance(record.vector, dict) else record.vector
+            if vector is not None:
+                ids.append(record.id)
+                vectors.append(vector)
+        if not ids:
+            return [[] for _ in self.query_vectors]
+        docs = np.asarray(vectors, dtype=np.float32)
+        queries = np.asarray(self.query_vectors, dtype=np.float32)
+        distance = self._distance()
+        if distance == rest.Distance.COSINE:
+            docs = docs / np.maximum(np.linalg.norm(docs, axis=1, keepdims=True), 1e-12)
+            queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+            scores = queries @ docs.T
+        elif distance == rest.Distance.DOT:
+            scores = queries @ docs.T
+        elif distance == rest.Distance.EUCLID:
+            scores = -((queries[:, None, :] - docs[None, :, :]) ** 2).sum(axis=2)
+        else:
+            scores = -np.abs(queries[:, None, :] - docs[None, :, :]).sum(axis=2)
+        top = np.argsort(-scores, axis=1, kind="stable")[:, :self.k]
+        return [[ids[i] for i in row] for row in top]
+
+    def prepare(self, queries: Optional[Sequence[str]] = None, num_queries: int = 100, seed: int = 0) -> bool:
+        """
+        生成查询向量并计算基准结果。
+
+        参数：
+            queries: 查询文本，未指定时从集合载荷中随机抽取
+            num_queries: 抽取的查询数量
+            seed: 随机种子
+
+        返回：
+            bool: 成功返回True，集合中没有可用的查询文本时返回False
+        """
+        self.queries = list(queries) if queries is not None else self._sample_texts(num_queries, seed)
+        if not self.queries:
+            print("没有可用于评估的查询文本")
+            return False
+        with self.qdrant_ops.metrics.timer("vectorize"):
+            vectors = self.indexer.embedding_model.generate_vector_batched(self.queries)
+        self.query_vectors = [vector.tolist() for vector in vectors]
+        with self.qdrant_ops.metrics.timer("ground_truth"):
+            self.truth = self._exact_truth() if self.ground_truth == "exact" else self._numpy_truth()
+        return True
+
+    def evaluate_params(self, params: Optional[rest.SearchParams]) -> Dict[str, Any]:
+        """
+        评估一组搜索参数，需先调用 prepare。
+
+        参数：
+            params: 搜索参数，None 表示服务端默认参数
+
+        返回：
+            Dict: 包含 config、params、recall、p50_ms、p99_ms、mean_ms
+        """
+        def search(vector):
+            return self.qdrant_ops.query_points(
+                self.indexer.collection_name, vector, limit=self.k, score_threshold=None, search_params=params
+            )
+
+        if self.warmup:
+            for vector in self.query_vectors:
+                search(vector)
+        latencies = []
+        recalls = []
+        for vector, truth in zip(self.query_vectors, self.truth):
+            for repeat in range(self.repeats):
+                start = time.perf_counter()
+                points = search(vector)
+                latencies.append(time.perf_counter() - start)
+                if repeat == 0 and truth:
+                    recalls.append(len(set(truth) & {point.id for point in points}) / len(truth))
+        samples = np.asarray(latencies) * 1000.0
+        return {
+            "config": describe_params(params),
+            "params": params,
+            "recall": round(float(np.mean(recalls)) if recalls else 0.0, 4),
+            "p50_ms": round(float(np.percentile(samples, 50)), 3),
+            "p99_ms": round(float(np.percentile(samples, 99)), 3),
+            "mean_ms": round(float(samples.mean()), 3)
+        }
+
+    def evaluate(self, params_list: Iterable[Optional[rest.SearchParams]]) -> List[Dict[str, Any]]:
+        """
+        依次评估多组搜索参数，需先调用 prepare。
+
+        参数：
+            params_list: 搜索参数列表，可由 search_param_grid 生成
+
+        返回：
+            List[Dict]: 按 p50 延迟升序排列并标记帕累托最优的结果
+        """
+        return mark_pareto([self.evaluate_params(params) for params in params_list])
+
+    def run(
+        self,
+        params_list: Iterable[Optional[rest.SearchParams]],
+        queries: Optional[Sequence[str]] = None,
+        num_queries: int = 100,
+        seed: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        准备查询与基准结果后评估多组搜索参数。
+
+        参数：
+            params_list: 搜索参数列表
+            queries: 查询文本，未指定时从集合中抽取
+            num_queries: 抽取的查询数量
+            seed: 随机种子
+
+        返回：
+            List[Dict]: 评估结果，准备失败时返回空列表
+        """
+        if not self.prepare(queries, num_queries, seed):
+            return []
+        return self.evaluate(params_list)
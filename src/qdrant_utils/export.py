@@ -0,0 +1,198 @@
+"""
+集合导出模块：向量写入内存映射的 .npy 文件，点 ID 与载荷写入 JSON Lines。
+"""
+from typing import Any, Dict, List, Optional
+import json
+import os
+import numpy as np
+from qdrant_client.http.models import Filter, Record
+from .operations import QdrantOperations
+from .async_operations import AsyncQdrantOperations
+
+
+class _ExportWriter:
+    """
+    导出文件写入器。
+
+    .npy 文件的第 i 行与 JSON Lines 文件的第 i 行对应同一个点。两个文件先写入 .part 临时文件，
+    全部写完后再重命名，导出中途失败不会留下不完整的文件。
+    """
+
+    def __init__(self, vectors_path: str, records_path: str, total: int, vector_name: str, dtype: str):
+        self.vectors_path = vectors_path
+        self.records_path = records_path
+        self.total = total
+        self.vector_name = vector_name
+        self.dtype = np.dtype(dtype)
+        self.count = 0
+        self._vectors: Optional[np.memmap] = None
+        self._records = open(records_path + ".part", "w", encoding="utf-8")
+
+    def _vector(self, record: Record) -> List[float]:
+        vector = record.vector
+        if isinstance(vector, dict):
+            vector = vector.get(self.vector_name)
+        if vector is None:
+            raise ValueError(f"点 {record.id} 没有向量 {self.vector_name!r}")
+        return vector
+
+    def write(self, record: Record) -> None:
+        if self.count >= self.total:
+            raise ValueError("导出过程中集合的点数量增加")
+        vector = self._vector(record)
+        if self._vectors is None:
+            # 以第一个向量的维度创建内存映射文件
+            self._vectors = np.lib.format.open_memmap(
+                self.vectors_path + ".part",
+                mode="w+",
+                dtype=self.dtype,
+                shape=(self.total, len(vector))
+            )
+        self._vectors[self.count] = vector
+        line: Dict[str, Any] = {"id": record.id}
+        if record.payload is not None:
+            line["payload"] = record.payload
+        self._records.write(json.dumps(line, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self, success: bool) -> bool:
+        self._records.close()
+        if self._vectors is None and success:
+            # 空集合导出为 (0, 0) 的数组
+            with open(self.vectors_path + ".part", "wb") as f:
+                np.save(f, np.empty((0, 0), dtype=self.dtype))
+        elif self._vectors is not None:
+            self._vectors.flush()
+            del self._vectors
+            self._vectors = None
+        if success and self.count != self.total:
+            print(f"导出数量 {self.count} 与集合点数量 {self.total} 不一致")
+            success = False
+        for path in (self.vectors_path, self.records_path):
+            if success:
+                os.replace(path + ".part", path)
+            elif os.path.exists(path + ".part"):
+                os.remove(path + ".part")
+        return success
+
+
+class CollectionExporter:
+    """
+    集合导出器，用于审计、迁移和离线分析。
+    """
+
+    def __init__(self, qdrant_ops: QdrantOperations, page_size: int = 256):
+        """
+        初始化导出器。
+
+        参数：
+            qdrant_ops: Qdrant 操作类实例
+            page_size: 遍历集合时每页的点数量
+        """
+        self.qdrant_ops = qdrant_ops
+        self.page_size = page_size
+
+    def export(
+        self,
+        collection_name: str,
+        vectors_path: str,
+        records_path: str,
+        vector_name: str = "",
+        dtype: str = "float32",
+        scroll_filter: Optional[Filter] = None,
+        with_payload: bool = True
+    ) -> bool:
+        """
+        导出集合。
+
+        参数：
+            collection_name: 集合名称
+            vectors_path: 向量文件路径（.npy），可用 np.load(path, mmap_mode="r") 读取
+            records_path: 点 ID 与载荷文件路径（JSON Lines），每行为 {"id": ..., "payload": ...}
+            vector_name: 导出的向量名称，默认为未命名的稠密向量
+            dtype: 向量文件的数据类型
+            scroll_filter: 可选的载荷过滤条件
+            with_payload: 是否导出载荷
+
+        返回：
+            bool: 导出成功返回True
+        """
+        total = self.qdrant_ops.count_points(collection_name, scroll_filter)
+        if total is None:
+            return False
+        writer = _ExportWriter(vectors_path, records_path, total, vector_name, dtype)
+        try:
+            for record in self.qdrant_ops.scroll_all(
+                collection_name,
+                page_size=self.page_size,
+                with_payload=with_payload,
+                with_vectors=[vector_name],
+                scroll_filter=scroll_filter
+            ):
+                writer.write(record)
+        except Exception as e:
+            print(f"导出集合失败：{e}")
+            self.qdrant_ops.metrics.incr("errors", stage="export")
+            return writer.close(False)
+        return writer.close(True)
+
+
+class AsyncCollectionExporter:
+    """
+    异步集合导出器，行为与 CollectionExporter 相同。
+    """
+
+    def __init__(self, operations: AsyncQdrantOperations, page_size: int = 256):
+        """
+        初始化导出器。
+
+        Args:
+            operations: 异步 Qdrant 操作类实例
+            page_size: 遍历集合时每页的点数量
+        """
+        self.operations = operations
+        self.page_size = page_size
+
+    async def export(
+        self,
+        collection_name: str,
+        vectors_path: str,
+        records_path: str,
+        vector_name: str = "",
+        dtype: str = "float32",
+        scroll_filter: Optional[Filter] = None,
+        with_payload: bool = True
+    ) -> bool:
+        """
+        导出集合。
+
+        Args:
+            collection_name: 集合名称
+            vectors_path: 向量文件路径（.npy）
+            records_path: 点 ID 与载荷文件路径（JSON Lines）
+            vector_name: 导出的向量名称，默认为未命名的稠密向量
+            dtype: 向量文件的数据类型
+            scroll_filter: 可选的载荷过滤条件
+            with_payload: 是否导出载荷
+
+        Returns:
+            bool: 导出成功返回True
+        """
+        total = await self.operations.count_points(collection_name, scroll_filter)
+        if total is None:
+            return False
+        writer = _ExportWriter(vectors_path, records_path, total, vector_name, dtype)
+        try:
+            async for record in self.operations.scroll_all(
+                collection_name,
+                page_size=self.page_size,
+                with_payload=with_payload,
+                with_vectors=[vector_name],
+                scroll_filter=scroll_filter
+            ):
+                writer.write(record)
+        except Exception as e:
+            print(f"导出集合失败: {e}")
+            self.operations.metrics.incr("errors", stage="export")
+            return writer.close(False)
+        return writer.close(True)
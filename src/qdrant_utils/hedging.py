@@ -0,0 +1,130 @@
+"""
+对冲请求模块：首个请求超过近期延迟分位数仍未返回时，向另一副本或连接发送重复请求，先返回者胜出。
+"""
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+import asyncio
+import threading
+import time
+import numpy as np
+from .metrics import Metrics, NULL_METRICS
+
+
+class HedgePolicy:
+    """
+    对冲请求策略。
+
+    记录最近若干次请求的延迟，对冲等待时间取其中的指定分位数（如 p95）：只有约 5% 的请求
+    会发出重复请求，额外负载有限，而长尾延迟被截断在分位数附近。样本不足时使用 initial_delay。
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        window: int = 512,
+        initial_delay: float = 0.05,
+        min_delay: float = 0.002,
+        max_hedges: int = 1,
+        min_samples: int = 20
+    ):
+        """
+        初始化对冲策略。
+
+        参数：
+            percentile: 对冲等待时间对应的延迟分位数
+            window: 参与统计的最近请求数量
+            initial_delay: 样本不足时的对冲等待时间（秒）
+            min_delay: 对冲等待时间下限（秒），避免延迟很低时几乎每个请求都被对冲
+            max_hedges: 每次调用最多发送的重复请求数量
+            min_samples: 开始使用分位数前需要的最少样本数量
+        """
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_hedges = max_hedges
+        self.min_samples = min_samples
+        self._samples: deque = deque(maxlen=window)
+        self._delay: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        """
+        记录一次成功请求的延迟。
+
+        参数：
+            latency: 延迟（秒）
+        """
+        with self._lock:
+            self._samples.append(latency)
+            self._delay = None
+
+    def delay(self) -> float:
+        """
+        返回当前的对冲等待时间（秒）。
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return self.initial_delay
+            if self._delay is None:
+                self._delay = max(self.min_delay, float(np.percentile(self._samples, self.percentile)))
+            return self._delay
+
+
+async def hedged_call(
+    call: Callable[[Any], Awaitable[Any]],
+    targets: Sequence[Any],
+    policy: HedgePolicy,
+    metrics: Metrics = NULL_METRICS,
+    stage: str = "search"
+) -> Any:
+    """
+    发送可对冲的请求。
+
+    先向 targets[0] 发送请求；等待 policy.delay() 后仍未返回时，依次向后续目标（只有一个目标时
+    向同一目标）发送重复请求，第一个成功的结果被返回，其余请求被取消。某个请求失败时立即发送
+    下一个重复请求；全部失败时抛出最后一个异常。调用方被取消（如超过截止时间）时取消全部请求。
+
+    参数：
+        call: 以目标（客户端）为参数、返回协程的函数
+        targets: 可用的目标列表，第一个为主目标
+        policy: 对冲策略
+        metrics: 指标记录器，记录发出的重复请求数
+        stage: 指标的阶段标签
+
+    返回：
+        Any: 第一个成功返回的结果
+    """
+    starts: Dict[asyncio.Future, float] = {}
+    pending: List[asyncio.Future] = []
+    hedges = 0
+    last_error: Optional[BaseException] = None
+
+    def launch(target):
+        task = asyncio.ensure_future(call(target))
+        starts[task] = time.perf_counter()
+        pending.append(task)
+
+    launch(targets[0])
+    try:
+        while pending:
+            can_hedge = hedges < policy.max_hedges
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=policy.delay() if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                pending.remove(task)
+                if task.exception() is None:
+                    policy.record(time.perf_counter() - starts[task])
+                    return task.result()
+                last_error = task.exception()
+            if can_hedge and (not done or not pending):
+                # 等待超时或已发出的请求全部失败时发送重复请求
+                hedges += 1
+                metrics.incr("hedged_requests", stage=stage)
+                launch(targets[hedges % len(targets)])
+        raise last_error
+    finally:
+        for task in pending:
+            task.cancel()
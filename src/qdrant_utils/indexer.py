@@ -1,11 +1,37 @@
 """
 索引管理器模块。
 """
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Union
+import copy
+import os
+import tempfile
+import time
 import numpy as np
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, PointStruct
-from .embeddings import TextEmbedding
+from qdrant_client.http.models import Distance, VectorParams, PointStruct, Filter, HasIdCondition
+from .embeddings import TextEmbedding, to_query_vector, generate_vectors_adaptive
+from .operations import QdrantOperations
+from .dedup import deduplicate_texts
+from .chunking import TextChunker, chunk_point_id
+from .metrics import Metrics, NULL_METRICS
+from .adaptive import AdaptiveBatchSizer
+from .sparse import SparseEncoder, SPARSE_VECTOR_NAME
+from .rerank import Reranker
+from .docstore import DocumentStore
+from .sharding import CollectionProfile, ShardKey
+
+def versioned_collection_name(alias: str, current: Optional[str] = None) -> str:
+    """
+    生成重建索引使用的版本化集合名称 {alias}_v{毫秒时间戳}
+    :param alias: 别名
+    :param current: 别名当前指向的集合，新版本号保证大于其版本号
+    :return: 集合名称
+    """
+    version = int(time.time() * 1000)
+    prefix = f"{alias}_v"
+    if current and current.startswith(prefix) and current[len(prefix):].isdigit():
+        version = max(version, int(current[len(prefix):]) + 1)
+    return f"{prefix}{version}"
 
 class TextIndexer:
     """文本索引管理器类"""
@@ -14,7 +40,18 @@ class TextIndexer:
         self,
         embedding_model: TextEmbedding,
         qdrant_ops: QdrantClient,
-        collection_name: str
+        collection_name: str,
+        dedup: bool = True,
+        chunk_size: int = 510,
+        chunk_overlap: int = 64,
+        metrics: Optional[Metrics] = None,
+        embed_batch: Optional[AdaptiveBatchSizer] = None,
+        upsert_batch: Optional[AdaptiveBatchSizer] = None,
+        sparse_encoder: Optional[SparseEncoder] = None,
+        reranker: Optional[Reranker] = None,
+        rerank_candidates: int = 50,
+        doc_store: Optional[DocumentStore] = None,
+        profile: Optional[CollectionProfile] = None
     ):
         """
         初始化索引管理器。
@@ -23,10 +60,129 @@ class TextIndexer:
             embedding_model: 文本向量生成模型
             qdrant_ops: Qdrant 客户端实例
             collection_name: 集合名称
+            dedup: 是否在向量化前合并重复文本
+            chunk_size: 长文档切分时每个片段的最大 token 数
+            chunk_overlap: 相邻片段重叠的 token 数
+            metrics: 可选的指标记录器，默认不记录
+            embed_batch: 可选的向量化微批次大小控制器，设置后按实测耗时调整微批次
+            upsert_batch: 可选的上传批次大小控制器，设置后按实测耗时与上传结果分批上传
+            sparse_encoder: 可选的稀疏向量编码器，设置后同时写入稀疏向量并支持 search_hybrid
+            reranker: 可选的重排序模型，设置后 search 与 search_batch 先多召回候选再重新排序
+            rerank_candidates: 每个查询交给重排序模型的候选数量
+            doc_store: 可选的外部文档存储，设置后全文只写入文档存储，载荷中只保留附加字段，
+                搜索结果在返回前批量补全 title
+            profile: 可选的集群拓扑配置，创建集合时使用；设置了 shard_key_field 时写入按载荷中的分片键分组
         """
         self.embedding_model = embedding_model
         self.qdrant_ops = qdrant_ops
         self.collection_name = collection_name
+        self.dedup = dedup
+        # 最近一次向量化的去重比例
+        self.last_dedup_ratio = 0.0
+        self.chunker = TextChunker(
+            getattr(embedding_model, "tokenizer", None),
+            chunk_size=chunk_size,
+            overlap=chunk_overlap
+        )
+        self.metrics = metrics or NULL_METRICS
+        self.embed_batch = embed_batch
+        self.upsert_batch = upsert_batch
+        self.sparse_encoder = sparse_encoder
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
+        self.doc_store = doc_store
+        self.profile = profile
+    
+    def _embed(self, texts: List[str], batch_size: Optional[int] = None) -> List[np.ndarray]:
+        """
+        生成文本向量，不做去重。
+        :param texts: 文本列表
+        :param batch_size: 向量化微批次大小，为 None 时一次性向量化；设置了 embed_batch 时忽略
+        :return: 向量列表
+        """
+        if not texts:
+            return []
+        if self.embed_batch is None:
+            if batch_size:
+                return self.embedding_model.generate_vector_batched(texts, batch_size)
+            return self.embedding_model.generate_vector(texts)
+        
+        # 按控制器给出的大小逐个微批次向量化，下一个微批次的分词与当前微批次的前向计算重叠
+        return generate_vectors_adaptive(self.embedding_model, texts, self.embed_batch, self.metrics)
+    
+    def _generate_vectors(self, texts: List[str], batch_size: Optional[int] = None) -> List[np.ndarray]:
+        """
+        生成文本向量，开启去重时每个唯一文本只向量化一次。
+        :param texts: 文本列表
+        :param batch_size: 向量化微批次大小，为 None 时一次性向量化
+        :return: 与文本一一对应的向量列表
+        """
+        with self.metrics.timer("embed"):
+            if not self.dedup:
+                return self._embed(texts, batch_size)
+            result = deduplicate_texts(texts)
+            vectors = self._embed(result.unique_texts, batch_size)
+        self.last_dedup_ratio = result.ratio
+        self.metrics.incr("cache_hits", result.total - result.unique, cache="dedup")
+        return result.scatter(vectors)
+    
+    def _upsert_points(self, points: List[Dict]) -> bool:
+        """
+        上传点数据，设置了 upsert_batch 时按控制器给出的大小分批上传。
+        :param points: 点数据列表
+        :return: 是否全部上传成功
+        """
+        if self.upsert_batch is None:
+            return self.qdrant_ops.upsert_points_batch(
+                collection_name=self.collection_name,
+                points=points
+            )
+        
+        success = True
+        position = 0
+        while position < len(points):
+            batch = points[position:position + self.upsert_batch.size]
+            start = time.perf_counter()
+            batch_success = self.qdrant_ops.upsert_points_batch(
+                collection_name=self.collection_name,
+                points=batch
+            )
+            self.upsert_batch.record(len(batch), time.perf_counter() - start, success=batch_success)
+            success = success and batch_success
+            position += len(batch)
+        return success
+    
+    def _fetch_limit(self, limit: int) -> int:
+        """
+        计算向量检索的召回数量，设置了重排序模型时多召回候选
+        :param limit: 最终返回的结果数量
+        :return: 召回数量
+        """
+        return max(limit, self.rerank_candidates) if self.reranker else limit
+    
+    def _rerank(self, queries: List[str], results: List[List[Dict]], limit: int) -> List[List[Dict]]:
+        """
+        使用重排序模型对候选结果重新排序，未设置重排序模型时原样返回
+        :param queries: 查询文本列表
+        :param results: 与 queries 一一对应的候选结果列表
+        :param limit: 每个查询保留的结果数量
+        :return: 重新排序后的结果列表
+        """
+        if self.reranker is None:
+            return results
+        with self.metrics.timer("rerank"):
+            return self.reranker.rerank_batch(queries, results, limit)
+    
+    def _hydrate(self, results: List[List[Dict]]) -> List[List[Dict]]:
+        """
+        设置了 doc_store 时为搜索结果补全文本，多个查询的结果合并后只读取一次
+        :param results: 搜索结果列表的列表
+        :return: 补全文本后的结果列表
+        """
+        if self.doc_store is None:
+            return results
+        with self.metrics.timer("hydrate"):
+            return self.doc_store.hydrate(results)
     
     def create_index(self, force: bool = False) -> bool:
         """
@@ -51,48 +207,174 @@ class TextIndexer:
             # 创建新集合
             return self.qdrant_ops.create_collection(
                 collection_name=self.collection_name,
-                vector_size=self.embedding_model.vector_size
+                vector_size=self.embedding_model.vector_size,
+                datatype=self.embedding_model.datatype,
+                sparse_vector_name=SPARSE_VECTOR_NAME if self.sparse_encoder else None,
+                profile=self.profile
             )
         except Exception as e:
             print(f"创建索引失败：{e}")
+            self.metrics.incr("errors", stage="create_index")
+            return False
+    
+    def reindex(
+        self,
+        build: Callable[["TextIndexer"], bool],
+        drop_old: bool = True,
+        bulk: bool = True,
+        wait_timeout: float = 600.0
+    ) -> bool:
+        """
+        蓝绿重建索引，重建期间搜索不中断。
+        
+        collection_name 作为别名使用：数据写入新的版本化集合（{collection_name}_v{毫秒时间戳}），
+        写入完成且索引构建完毕后原子地将别名切换到新集合，再删除旧集合。build 失败时删除新集合，
+        别名仍指向旧集合。若 collection_name 当前是普通集合而不是别名，切换时需要先删除该集合
+        再创建同名别名，两步之间有短暂的不可用窗口，之后的重建不再有此问题。
+        
+        参数：
+            build: 写入函数，参数为指向新集合的索引管理器，返回是否写入成功，
+                例如 lambda builder: builder.add_texts(texts)，也可以在其中运行 IngestJob
+            drop_old: 切换后是否删除旧集合
+            bulk: 写入期间是否暂停构建向量索引，写入完成后恢复
+            wait_timeout: 等待新集合完成索引构建的最长秒数
+        
+        返回：
+            bool: 成功切换返回True
+        """
+        alias = self.collection_name
+        new_collection = versioned_collection_name(alias, self.qdrant_ops.get_alias_target(alias))
+        builder = copy.copy(self)
+        builder.collection_name = new_collection
+        try:
+            if not builder.create_index():
+                return False
+            threshold = None
+            if bulk:
+                # 未设置时使用服务端默认值
+                info = self.qdrant_ops.client.get_collection(new_collection)
+                threshold = info.config.optimizer_config.indexing_threshold or 20000
+                self.qdrant_ops.update_indexing_threshold(new_collection, 0)
+            
+            with self.metrics.timer("reindex_build"):
+                built = build(builder)
+            if built and threshold is not None:
+                built = self.qdrant_ops.update_indexing_threshold(new_collection, threshold)
+            if not built or not self.qdrant_ops.wait_until_green(new_collection, timeout=wait_timeout):
+                print(f"重建索引失败，保留当前集合：{self.qdrant_ops.get_alias_target(alias) or alias}")
+                self.qdrant_ops.delete_collection(new_collection)
+                return False
+            
+            # 切换别名
+            old_collection = self.qdrant_ops.get_alias_target(alias)
+            if old_collection is None and self.qdrant_ops.client.collection_exists(alias):
+                self.qdrant_ops.delete_collection(alias)
+            if not self.qdrant_ops.switch_alias(alias, new_collection):
+                return False
+            if drop_old and old_collection:
+                self.qdrant_ops.delete_collection(old_collection)
+            return True
+        except Exception as e:
+            print(f"重建索引失败：{e}")
+            self.metrics.incr("errors", stage="reindex")
             return False
     
-    def add_texts(self, texts: List[str]) -> bool:
+    def clone_to(
+        self,
+        new_collection: str,
+        target_ops: Optional[QdrantOperations] = None,
+        workdir: Optional[str] = None
+    ) -> Optional["TextIndexer"]:
+        """
+        通过快照将当前集合复制为新集合，不需要重新向量化和上传。
+        
+        在服务端创建快照后下载到本地临时目录，再上传到目标服务并恢复为新集合，
+        最后删除服务端的快照。collection_name 是别名时复制其指向的集合。
+        
+        参数：
+            new_collection: 新集合名称，已存在时数据被快照覆盖
+            target_ops: 目标服务的操作类实例，默认复制到同一服务
+            workdir: 快照文件的临时目录，默认使用系统临时目录
+        
+        返回：
+            Optional[TextIndexer]: 指向新集合的索引管理器，失败时返回None
+        """
+        target_ops = target_ops or self.qdrant_ops
+        source = self.qdrant_ops.get_alias_target(self.collection_name) or self.collection_name
+        snapshot_name = self.qdrant_ops.create_snapshot(source)
+        if snapshot_name is None:
+            return None
+        try:
+            with tempfile.TemporaryDirectory(dir=workdir) as tmpdir:
+                path = os.path.join(tmpdir, snapshot_name)
+                if not self.qdrant_ops.download_snapshot(source, snapshot_name, path):
+                    return None
+                if not target_ops.upload_snapshot(new_collection, path):
+                    return None
+        finally:
+            self.qdrant_ops.delete_snapshot(source, snapshot_name)
+        
+        clone = copy.copy(self)
+        clone.qdrant_ops = target_ops
+        clone.collection_name = new_collection
+        return clone
+    
+    def add_texts(
+        self,
+        texts: List[str],
+        ids: Optional[List[Union[int, str]]] = None,
+        payloads: Optional[List[Dict[str, Any]]] = None
+    ) -> bool:
         """
         添加文本到索引
         :param texts: 文本列表
+        :param ids: 可选的点ID列表，默认使用文本下标
+        :param payloads: 可选的附加载荷列表，会与 {"title": text} 合并
         :return: 是否成功添加
         """
         try:
             # 生成向量
-            vectors = self.embedding_model.generate_vector(texts)
+            vectors = self._generate_vectors(texts)
             
             # 添加向量
-            return self.add_vectors(vectors, texts)
+            return self.add_vectors(vectors, texts, ids=ids, payloads=payloads)
         except Exception as e:
             print(f"添加文本失败：{str(e)}")
+            self.metrics.incr("errors", stage="add_texts")
             return False
     
-    def search(self, query: str, limit: int = 10, score_threshold: float = 0.0) -> List[Dict]:
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        score_threshold: float = 0.0,
+        query_filter: Optional[Filter] = None,
+        shard_keys: Optional[Union[ShardKey, List[ShardKey]]] = None
+    ) -> List[Dict]:
         """
         搜索相似文本
         :param query: 查询文本
         :param limit: 返回结果数量限制
         :param score_threshold: 相似度阈值
-        :return: 搜索结果列表
+        :param query_filter: 可选的载荷过滤条件
+        :param shard_keys: 可选的分片键，只搜索这些分片
+        :return: 搜索结果列表，设置了重排序模型时按 rerank_score 排序
         """
         try:
             # 生成查询文本的向量
-            query_vector = self.embedding_model.generate_vector([query])[0]
+            with self.metrics.timer("embed"):
+                query_vector = self.embedding_model.generate_vector([query])[0]
             
             # 执行搜索
             results = self.qdrant_ops.query_points(
                 collection_name=self.collection_name,
-                vector=query_vector.tolist(),
-                limit=limit,
-                score_threshold=score_threshold
+                vector=to_query_vector(query_vector, self.embedding_model.datatype),
+                limit=self._fetch_limit(limit),
+                score_threshold=score_threshold,
+                query_filter=query_filter,
+                shard_keys=shard_keys
             )
-            return [
+            hits = [
                 {
                     "id": point.id,
                     "score": point.score,
@@ -100,30 +382,96 @@ class TextIndexer:
                 }
                 for point in results
             ]
+            return self._rerank([query], self._hydrate([hits]), limit)[0]
         except Exception as e:
             print(f"搜索失败：{str(e)}")
+            self.metrics.incr("errors", stage="search")
             return []
     
-    def search_batch(self, queries: List[str], limit: int = 10, score_threshold: float = 0.0) -> List[List[Dict]]:
+    def search_hybrid(
+        self,
+        query: str,
+        limit: int = 10,
+        prefetch_limit: Optional[int] = None,
+        score_threshold: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        稠密向量与关键词（稀疏向量）混合搜索，需要在初始化时设置 sparse_encoder
+        :param query: 查询文本
+        :param limit: 返回结果数量限制
+        :param prefetch_limit: 每一路召回的候选数量，默认为 limit 的 4 倍
+        :param score_threshold: RRF 融合得分阈值
+        :return: 搜索结果列表，格式与 search 相同
+        """
+        if self.sparse_encoder is None:
+            print("混合搜索失败：未设置 sparse_encoder")
+            return []
+        try:
+            with self.metrics.timer("embed"):
+                query_vector = self.embedding_model.generate_vector([query])[0]
+            with self.metrics.timer("sparse_encode"):
+                sparse_vector = self.sparse_encoder.encode_queries([query])[0]
+            
+            results = self.qdrant_ops.query_hybrid(
+                collection_name=self.collection_name,
+                dense_vector=to_query_vector(query_vector, self.embedding_model.datatype),
+                sparse_vector=sparse_vector,
+                limit=limit,
+                prefetch_limit=prefetch_limit,
+                score_threshold=score_threshold
+            )
+            return self._hydrate([[
+                {
+                    "id": point.id,
+                    "score": point.score,
+                    "payload": point.payload
+                }
+                for point in results
+            ]])[0]
+        except Exception as e:
+            print(f"混合搜索失败：{str(e)}")
+            self.metrics.incr("errors", stage="search_hybrid")
+            return []
+    
+    def search_batch(
+        self,
+        queries: List[str],
+        limit: int = 10,
+        score_threshold: float = 0.0,
+        query_filter: Optional[Filter] = None,
+        shard_keys: Optional[Union[ShardKey, List[ShardKey]]] = None
+    ) -> List[List[Dict]]:
         """
         批量搜索相似文本
         :param queries: 查询文本列表
         :param limit: 每个查询返回的结果数量限制
         :param score_threshold: 相似度阈值
+        :param query_filter: 可选的载荷过滤条件，对所有查询生效
+        :param shard_keys: 可选的分片键，只搜索这些分片
         :return: 搜索结果列表的列表
         """
         try:
+            # 合并重复查询，每个唯一查询只向量化和搜索一次
+            dedup_result = deduplicate_texts(queries) if self.dedup else None
+            unique_queries = dedup_result.unique_texts if dedup_result else queries
+            if dedup_result:
+                self.last_dedup_ratio = dedup_result.ratio
+                self.metrics.incr("cache_hits", dedup_result.total - dedup_result.unique, cache="dedup")
+            
             # 生成查询文本的向量
-            query_vectors = self.embedding_model.generate_vector(queries)
+            with self.metrics.timer("embed"):
+                query_vectors = self._embed(unique_queries)
             
             # 执行批量搜索
             results = []
             for query_vector in query_vectors:
                 result = self.qdrant_ops.query_points(
                     collection_name=self.collection_name,
-                    vector=query_vector.tolist(),
-                    limit=limit,
-                    score_threshold=score_threshold
+                    vector=to_query_vector(query_vector, self.embedding_model.datatype),
+                    limit=self._fetch_limit(limit),
+                    score_threshold=score_threshold,
+                    query_filter=query_filter,
+                    shard_keys=shard_keys
                 )
                 results.append([
                     {
@@ -133,16 +481,22 @@ class TextIndexer:
                     }
                     for point in result
                 ])
+            results = self._rerank(unique_queries, self._hydrate(results), limit)
+            if dedup_result:
+                # 将结果分发回每个原始查询位置
+                results = [list(r) for r in dedup_result.scatter(results)]
             return results
         except Exception as e:
             print(f"批量搜索失败：{str(e)}")
+            self.metrics.incr("errors", stage="search_batch")
             return []
     
     def search_by_vector(
         self,
         vector: np.ndarray,
         limit: int = 10,
-        score_threshold: Optional[float] = None
+        score_threshold: Optional[float] = None,
+        shard_keys: Optional[Union[ShardKey, List[ShardKey]]] = None
     ) -> List[Dict[str, Any]]:
         """
         使用向量搜索相似文本。
@@ -151,6 +505,7 @@ class TextIndexer:
             vector: 查询向量
             limit: 返回的最大结果数
             score_threshold: 最小相似度阈值
+            shard_keys: 可选的分片键，只搜索这些分片
         
         返回：
             List[Dict]: 搜索结果列表
@@ -158,46 +513,386 @@ class TextIndexer:
         try:
             results = self.qdrant_ops.query_points(
                 collection_name=self.collection_name,
-                vector=vector.tolist(),
+                vector=to_query_vector(vector, self.embedding_model.datatype),
                 limit=limit,
-                score_threshold=score_threshold or 0.0
+                score_threshold=score_threshold or 0.0,
+                shard_keys=shard_keys
             )
             
-            return [
+            return self._hydrate([[
                 {
                     "id": point.id,
                     "score": point.score,
                     "payload": point.payload
                 }
                 for point in results
-            ]
+            ]])[0]
         except Exception as e:
             print(f"向量搜索失败：{e}")
+            self.metrics.incr("errors", stage="search_by_vector")
             return []
     
-    def add_vectors(self, vectors: List[np.ndarray], texts: List[str]) -> bool:
+    def search_by_id(
+        self,
+        point_id: Union[int, str],
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        query_filter: Optional[Filter] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        搜索与已索引文本相似的文本（"更多类似内容"），直接使用 Qdrant 中存储的向量，不需要向量化。
+        
+        参数：
+            point_id: 已索引文本的点ID
+            limit: 返回的最大结果数
+            score_threshold: 最小相似度阈值
+            query_filter: 可选的载荷过滤条件
+        
+        返回：
+            List[Dict]: 搜索结果列表，不包含该点本身
+        """
+        return self.recommend([point_id], limit=limit, score_threshold=score_threshold, query_filter=query_filter)
+    
+    def search_by_ids(
+        self,
+        point_ids: List[Union[int, str]],
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        query_filter: Optional[Filter] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        批量搜索与多个已索引文本相似的文本，所有查询在一次请求中完成。
+        
+        参数：
+            point_ids: 已索引文本的点ID列表
+            limit: 每个点返回的最大结果数
+            score_threshold: 最小相似度阈值
+            query_filter: 可选的载荷过滤条件，对所有查询生效
+        
+        返回：
+            List[List[Dict]]: 与 point_ids 一一对应的搜索结果列表
+        """
+        try:
+            responses = self.qdrant_ops.recommend_batch(self.collection_name, [
+                {
+                    "positive": [point_id],
+                    "limit": limit,
+                    "score_threshold": score_threshold,
+                    "filter": query_filter
+                }
+                for point_id in point_ids
+            ])
+            return self._hydrate([
+                [
+                    {
+                        "id": point.id,
+                        "score": point.score,
+                        "payload": point.payload
+                    }
+                    for point in points
+                ]
+                for points in responses
+            ])
+        except Exception as e:
+            print(f"批量相似搜索失败：{e}")
+            self.metrics.incr("errors", stage="search_by_ids")
+            return []
+    
+    def recommend(
+        self,
+        positive_ids: List[Union[int, str]],
+        negative_ids: Optional[List[Union[int, str]]] = None,
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        query_filter: Optional[Filter] = None,
+        strategy: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        根据正负样本推荐相似文本，服务端读取样本点的向量，一次请求完成且不需要向量化。
+        
+        参数：
+            positive_ids: 正样本点ID列表
+            negative_ids: 可选的负样本点ID列表
+            limit: 返回的最大结果数
+            score_threshold: 最小相似度阈值
+            query_filter: 可选的载荷过滤条件
+            strategy: 推荐策略，average_vector（默认）、best_score 或 sum_scores
+        
+        返回：
+            List[Dict]: 搜索结果列表，不包含样本点
+        """
+        try:
+            results = self.qdrant_ops.recommend(
+                self.collection_name,
+                positive_ids,
+                negative=negative_ids,
+                limit=limit,
+                score_threshold=score_threshold,
+                query_filter=query_filter,
+                strategy=strategy
+            )
+            return self._hydrate([[
+                {
+                    "id": point.id,
+                    "score": point.score,
+                    "payload": point.payload
+                }
+                for point in results
+            ]])[0]
+        except Exception as e:
+            print(f"推荐搜索失败：{e}")
+            self.metrics.incr("errors", stage="recommend")
+            return []
+    
+    def add_vectors(
+        self,
+        vectors: List[np.ndarray],
+        texts: List[str],
+        ids: Optional[List[Union[int, str]]] = None,
+        payloads: Optional[List[Dict[str, Any]]] = None
+    ) -> bool:
         """
         添加向量到索引
         :param vectors: 向量列表
         :param texts: 文本列表
+        :param ids: 可选的点ID列表，默认使用文本下标
+        :param payloads: 可选的附加载荷列表，会与 {"title": text} 合并
         :return: 是否成功添加
+        
+        设置了 doc_store 时文本先写入文档存储，载荷中只保留附加字段。
         """
         try:
+            if ids is None:
+                ids = list(range(len(texts)))
+            
+            if self.doc_store is not None:
+                with self.metrics.timer("doc_store"):
+                    self.doc_store.put_many(ids, texts)
+            
             # 构建点数据
-            points = [
-                {
-                    "id": i,
-                    "vector": vector.tolist(),
-                    "payload": {"title": text}
-                }
-                for i, (vector, text) in enumerate(zip(vectors, texts))
-            ]
+            with self.metrics.timer("to_list"):
+                points = [
+                    {
+                        "id": id_,
+                        "vector": vector.tolist(),
+                        "payload": {
+                            **({} if self.doc_store is not None else {"title": text}),
+                            **(payloads[i] if payloads else {})
+                        }
+                    }
+                    for i, (id_, vector, text) in enumerate(zip(ids, vectors, texts))
+                ]
+            
+            # 同时写入稀疏向量
+            if self.sparse_encoder is not None:
+                with self.metrics.timer("sparse_encode"):
+                    sparse_vectors = self.sparse_encoder.encode_documents(texts)
+                for point, sparse_vector in zip(points, sparse_vectors):
+                    point["vector"] = {"": point["vector"], SPARSE_VECTOR_NAME: sparse_vector}
+            if self.profile is not None:
+                self.profile.assign_shard_keys(points)
             
             # 添加点数据
-            return self.qdrant_ops.upsert_points_batch(
+            return self._upsert_points(points)
+        except Exception as e:
+            print(f"添加向量失败：{str(e)}")
+            self.metrics.incr("errors", stage="add_vectors")
+            return False 
+    
+    def update_payload(
+        self,
+        payload: Dict[str, Any],
+        ids: Optional[List[Union[int, str]]] = None,
+        query_filter: Optional[Filter] = None,
+        overwrite: bool = False
+    ) -> bool:
+        """
+        更新选中文本的载荷（如标签、状态），只发送载荷，不重新上传向量。
+        
+        参数：
+            payload: 要设置的载荷字段
+            ids: 点ID列表
+            query_filter: 载荷过滤条件，与 ids 同时指定时取交集
+            overwrite: 是否整体替换载荷；未设置 doc_store 时文本保存在 title 字段中，整体替换会将其删除
+        
+        返回：
+            bool: 是否成功更新
+        """
+        update = self.qdrant_ops.overwrite_payload if overwrite else self.qdrant_ops.set_payload
+        return update(self.collection_name, payload, points=ids, points_filter=query_filter)
+    
+    def update_payloads(self, updates: Dict[Union[int, str], Dict[str, Any]], overwrite: bool = False) -> bool:
+        """
+        为多个文本分别更新不同的载荷，批量合并为少量请求。
+        
+        参数：
+            updates: 点ID到载荷字段的映射
+            overwrite: 是否整体替换载荷
+        
+        返回：
+            bool: 是否全部成功更新
+        """
+        return self.qdrant_ops.set_payloads(self.collection_name, updates, overwrite=overwrite)
+    
+    def delete_payload_keys(
+        self,
+        keys: List[str],
+        ids: Optional[List[Union[int, str]]] = None,
+        query_filter: Optional[Filter] = None
+    ) -> bool:
+        """
+        删除选中文本的载荷字段。
+        
+        参数：
+            keys: 要删除的字段名列表
+            ids: 点ID列表
+            query_filter: 载荷过滤条件，与 ids 同时指定时取交集
+        
+        返回：
+            bool: 是否成功删除
+        """
+        return self.qdrant_ops.delete_payload_keys(self.collection_name, keys, points=ids, points_filter=query_filter)
+    
+    def delete(
+        self,
+        ids: Optional[List[Union[int, str]]] = None,
+        query_filter: Optional[Filter] = None
+    ) -> bool:
+        """
+        从索引中删除文本，设置了 doc_store 时同时删除文档存储中的全文。
+        
+        设置了 doc_store 且按过滤条件删除时，先遍历出全部匹配的点ID，再按ID删除；
+        遍历中途出错时不删除任何点并返回False，避免集合与文档存储只删除了一部分。
+        
+        参数：
+            ids: 点ID列表
+            query_filter: 载荷过滤条件，与 ids 同时指定时取交集
+        
+        返回：
+            bool: 是否成功删除
+        """
+        try:
+            if self.doc_store is not None and query_filter is not None:
+                scroll_filter = query_filter if ids is None else Filter(
+                    must=[HasIdCondition(has_id=list(ids)), query_filter]
+                )
+                ids = [
+                    record.id
+                    for record in self.qdrant_ops.scroll_all(
+                        self.collection_name, with_payload=False, scroll_filter=scroll_filter
+                    )
+                ]
+                query_filter = None
+                if not ids:
+                    return True
+            if not self.qdrant_ops.delete_points(self.collection_name, points=ids, points_filter=query_filter):
+                return False
+            if self.doc_store is not None:
+                with self.metrics.timer("doc_store"):
+                    self.doc_store.delete_many(ids)
+            return True
+        except Exception as e:
+            print(f"删除文本失败：{e}")
+            self.metrics.incr("errors", stage="delete")
+            return False
+    
+    def add_documents(
+        self,
+        documents: List[str],
+        doc_ids: Optional[List[Union[int, str]]] = None,
+        batch_size: int = 32
+    ) -> bool:
+        """
+        切分长文档并添加到索引
+        
+        每个片段作为独立的点写入，载荷中记录父文档ID（parent_id）和片段序号（chunk_index）。
+        文档按顺序切分，每凑满 batch_size 个片段就向量化并写入一次，内存占用与文档总量无关；
+        某个批次写入失败时继续写入其余批次，最后汇总输出失败批次涉及的文档ID。
+        :param documents: 文档列表
+        :param doc_ids: 可选的文档ID列表，默认使用文档下标
+        :param batch_size: 每个批次的片段数量
+        :return: 是否全部添加成功
+        """
+        try:
+            if doc_ids is None:
+                doc_ids = list(range(len(documents)))
+            
+            def chunk_batches():
+                chunks, ids, payloads = [], [], []
+                for doc_id, document in zip(doc_ids, documents):
+                    for index, chunk in enumerate(self.chunker.split(document)):
+                        chunks.append(chunk)
+                        ids.append(chunk_point_id(doc_id, index))
+                        payloads.append({"parent_id": doc_id, "chunk_index": index})
+                        if len(chunks) >= batch_size:
+                            yield chunks, ids, payloads
+                            chunks, ids, payloads = [], [], []
+                if chunks:
+                    yield chunks, ids, payloads
+            
+            # 逐批生成片段向量并写入
+            total, failed, failed_docs = 0, 0, []
+            for chunks, ids, payloads in chunk_batches():
+                total += 1
+                vectors = self._generate_vectors(chunks)
+                if not self.add_vectors(vectors, chunks, ids=ids, payloads=payloads):
+                    failed += 1
+                    failed_docs.extend(payload["parent_id"] for payload in payloads)
+                    self.metrics.incr("errors", stage="add_documents")
+            if failed:
+                print(f"添加文档部分失败：{failed}/{total} 个批次写入失败，涉及的文档ID：{list(dict.fromkeys(failed_docs))}")
+                return False
+            return True
+        except Exception as e:
+            print(f"添加文档失败：{str(e)}")
+            self.metrics.incr("errors", stage="add_documents")
+            return False
+    
+    def search_documents(
+        self,
+        query: str,
+        limit: int = 10,
+        group_size: int = 1,
+        score_threshold: float = 0.0
+    ) -> List[Dict]:
+        """
+        搜索相似文档，同一文档的多个片段合并为一条结果
+        :param query: 查询文本
+        :param limit: 返回的文档数量限制
+        :param group_size: 每个文档返回的片段数量
+        :param score_threshold: 相似度阈值
+        :return: 文档结果列表，每项包含 parent_id、score（最佳片段得分）和 hits
+        """
+        try:
+            with self.metrics.timer("embed"):
+                query_vector = self.embedding_model.generate_vector([query])[0]
+            groups = self.qdrant_ops.query_points_groups(
                 collection_name=self.collection_name,
-                points=points
+                vector=to_query_vector(query_vector, self.embedding_model.datatype),
+                group_by="parent_id",
+                limit=limit,
+                group_size=group_size,
+                score_threshold=score_threshold
             )
+            documents = [
+                {
+                    "parent_id": group.id,
+                    "score": group.hits[0].score,
+                    "hits": [
+                        {
+                            "id": point.id,
+                            "score": point.score,
+                            "payload": point.payload
+                        }
+                        for point in group.hits
+                    ]
+                }
+                for group in groups
+                if group.hits
+            ]
+            self._hydrate([document["hits"] for document in documents])
+            return documents
         except Exception as e:
-            print(f"添加向量失败：{str(e)}")
-            return False 
\ No newline at end of file
+            print(f"文档搜索失败：{str(e)}")
+            self.metrics.incr("errors", stage="search_documents")
+            return []
@@ -0,0 +1,442 @@
+"""
+文件写入模块：并行读取 JSONL、CSV、Parquet 文件，按列映射为记录后交给写入任务。
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from .indexer import TextIndexer
+from .jobs import IngestJob
+from .metrics import Metrics, InMemoryMetrics, NULL_METRICS
+
+# 文件扩展名到格式的映射
+FORMATS = {
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".csv": "csv",
+    ".tsv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet"
+}
+
+# 读取线程结束时放入队列的标记
+_END = object()
+
+# 非数字、非 UUID 的ID列值映射为点ID时使用的命名空间，同一值总是得到同一ID
+ID_NAMESPACE = uuid.UUID("3d9a6e1f-7c2b-4f58-a0e4-6b1c8d2f9a37")
+
+# Qdrant 整数点ID的上限（uint64）
+MAX_POINT_ID = 2 ** 64 - 1
+
+
+def detect_format(path: str) -> str:
+    """
+    根据扩展名判断文件格式。
+
+    参数：
+        path: 文件路径
+
+    返回：
+        str: jsonl、csv 或 parquet
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"无法识别的文件格式：{path}，请指定 file_format")
+    return FORMATS[extension]
+
+
+def read_jsonl(path: str, columns: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    逐行读取 JSON Lines 文件，跳过空行。
+
+    参数：
+        path: 文件路径
+        columns: 未使用，与其他读取函数保持相同签名
+
+    返回：
+        Iterator: 每行解析出的字典
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_csv(path: str, columns: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    逐行读取带表头的 CSV 文件，扩展名为 .tsv 时以制表符分隔。
+
+    参数：
+        path: 文件路径
+        columns: 未使用，与其他读取函数保持相同签名
+
+    返回：
+        Iterator: 每行的列名到值的字典，值均为字符串
+    """
+    delimiter = "\t" if path.lower().endswith(".tsv") else ","
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        yield from csv.DictReader(f, delimiter=delimiter)
+
+
+def read_parquet(
+    path: str,
+    columns: Optional[List[str]] = None,
+    batch_size: int = 1024
+) -> Iterator[Dict[str, Any]]:
+    """
+    按记录批次流式读取 Parquet 文件，需要安装 pyarrow。
+
+    参数：
+        path: 文件路径
+        columns: 只读取的列，默认读取全部列
+        batch_size: 每次解码的行数
+
+    返回：
+        Iterator: 每行的列名到值的字典
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("读取 Parquet 文件需要安装 pyarrow") from e
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        yield from batch.to_pylist()
+
+
+READERS: Dict[str, Callable[..., Iterator[Dict[str, Any]]]] = {
+    "jsonl": read_jsonl,
+    "csv": read_csv,
+    "parquet": read_parquet
+}
+
+
+def _coerce_id(value: Any) -> Tuple[Union[int, str], bool]:
+    """
+    将ID列的值转换为 Qdrant 接受的点ID。
+
+    不超过 uint64 的非负整数与十进制数字字符串（CSV 中的ID列）转换为整数，合法的 UUID 字符串
+    统一为标准格式，其余值（如 "book-17" 或超出范围的整数）通过 uuid5 确定性地映射为 UUID，
+    重复写入时得到相同的点ID。
+
+    参数：
+        value: ID列的值
+
+    返回：
+        Tuple[Union[int, str], bool]: 整数或 UUID 字符串形式的点ID，以及是否经 uuid5 映射
+        （此时无法从点ID还原原始值）
+    """
+    if isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= MAX_POINT_ID:
+        return value, False
+    text = str(value).strip()
+    if text.isdecimal() and int(text) <= MAX_POINT_ID:
+        return int(text), False
+    try:
+        return str(uuid.UUID(text)), False
+    except ValueError:
+        return str(uuid.uuid5(ID_NAMESPACE, text)), True
+
+
+class ColumnMapping:
+    """
+    文件列到写入记录的映射。
+
+    text_field 列作为向量化的文本；id_field 列作为点ID，未指定时由写入任务按记录位置分配，
+    不能直接作为点ID的值映射为 UUID，原始值同时写入载荷的 id_field 字段；
+    payload_fields 中的列写入载荷，未指定时除文本列和ID列外的全部列都写入载荷。
+    """
+
+    def __init__(
+        self,
+        text_field: str = "text",
+        id_field: Optional[str] = None,
+        payload_fields: Optional[Sequence[str]] = None
+    ):
+        """
+        初始化列映射。
+
+        参数：
+            text_field: 文本列
+            id_field: 点ID列
+            payload_fields: 写入载荷的列，空列表表示不写入附加载荷
+        """
+        self.text_field = text_field
+        self.id_field = id_field
+        self.payload_fields = list(payload_fields) if payload_fields is not None else None
+
+    def columns(self) -> Optional[List[str]]:
+        """
+        返回需要读取的列，用于 Parquet 列裁剪。
+
+        返回：
+            List[str]: 列名列表，需要全部列时返回None
+        """
+        if self.payload_fields is None:
+            return None
+        columns = [self.text_field] + ([self.id_field] if self.id_field else []) + self.payload_fields
+        return list(dict.fromkeys(columns))
+
+    def to_record(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        将一行数据转换为写入任务的记录。
+
+        参数：
+            row: 列名到值的字典
+
+        返回：
+            Dict: 包含 text、payload 以及可选 id 的记录，文本为空时返回None
+        """
+        text = row.get(self.text_field)
+        if text is None or not str(text).strip():
+            return None
+        if self.payload_fields is None:
+            payload = {key: value for key, value in row.items() if key not in (self.text_field, self.id_field)}
+        else:
+            payload = {key: row[key] for key in self.payload_fields if key in row}
+        record = {"text": str(text), "payload": payload}
+        if self.id_field is not None and row.get(self.id_field) not in (None, ""):
+            record["id"], mapped = _coerce_id(row[self.id_field])
+            if mapped:
+                # 映射后的点ID无法还原，原始ID写入载荷以便按原始ID查找
+                payload[self.id_field] = row[self.id_field]
+        return record
+
+
+class ParallelFileReader:
+    """
+    多个文件的并行读取器。
+
+    每个文件由一个读取线程解析并映射为记录，按块放入该文件的有界队列；迭代时按文件顺序
+    依次取出，因此记录顺序与串行读取相同，写入任务的检查点在重启后仍然有效。同时读取的
+    文件数量不超过 workers，每个文件预读的记录数不超过 prefetch，内存占用与文件大小无关。
+    读取与解析在后台线程中进行，与向量化和上传重叠。
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[str],
+        mapping: ColumnMapping,
+        file_format: Optional[str] = None,
+        workers: int = 4,
+        prefetch: int = 4096,
+        block_size: int = 256,
+        metrics: Optional[Metrics] = None
+    ):
+        """
+        初始化读取器。
+
+        参数：
+            paths: 文件路径列表
+            mapping: 列映射
+            file_format: 文件格式（jsonl、csv、parquet），默认按扩展名判断
+            workers: 同时读取的文件数量
+            prefetch: 每个文件最多预读的记录数
+            block_size: 读取线程每次放入队列的记录数
+            metrics: 可选的指标记录器，记录读取的行数与跳过的空文本行数
+        """
+        if file_format is not None and file_format not in READERS:
+            raise ValueError(f"不支持的文件格式：{file_format}")
+        self.paths = list(paths)
+        self.formats = [file_format or detect_format(path) for path in self.paths]
+        self.mapping = mapping
+        self.workers = max(1, workers)
+        self.block_size = max(1, block_size)
+        self.queue_blocks = max(1, prefetch // self.block_size)
+        self.metrics = metrics or NULL_METRICS
+
+    def _read(self, path: str, file_format: str, output: queue.Queue, stop: threading.Event) -> None:
+        """在读取线程中解析一个文件，记录按块放入队列，出错时放入异常"""
+        try:
+            block = []
+            rows = 0
+            for row in READERS[file_format](path, columns=self.mapping.columns()):
+                rows += 1
+                record = self.mapping.to_record(row)
+                if record is None:
+                    self.metrics.incr("skipped", stage="read")
+                    continue
+                block.append(record)
+                if len(block) >= self.block_size:
+                    if not self._put(output, block, stop):
+                        return
+                    block = []
+            if block and not self._put(output, block, stop):
+                return
+            self.metrics.incr("rows", rows, stage="read")
+            self._put(output, _END, stop)
+        except Exception as e:
+            self._put(output, e, stop)
+
+    @staticmethod
+    def _put(output: queue.Queue, item: Any, stop: threading.Event) -> bool:
+        """放入队列，队列已满时等待，迭代提前结束时放弃并返回False"""
+        while not stop.is_set():
+            try:
+                output.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        stop = threading.Event()
+        queues = [queue.Queue(maxsize=self.queue_blocks) for _ in self.paths]
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="file-reader")
+        try:
+            # 按文件顺序提交，线程池先开始读取前面的文件，迭代等待的文件总是已在读取或已读完
+            for path, file_format, output in zip(self.paths, self.formats, queues):
+                executor.submit(self._read, path, file_format, output, stop)
+            for path, output in zip(self.paths, queues):
+                while True:
+                    item = output.get()
+                    if item is _END:
+                        break
+                    if isinstance(item, Exception):
+                        raise RuntimeError(f"读取文件 {path} 失败：{item}") from item
+                    yield from item
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ThroughputReporter:
+    """
+    写入吞吐量的实时报告。
+
+    后台线程每隔 interval 秒读取指标记录器中写入任务确认的记录数，输出最近一个间隔和
+    全程的平均速度，以及向量化在总耗时中的占比，结束时输出汇总。
+    """
+
+    def __init__(
+        self,
+        metrics: InMemoryMetrics,
+        interval: float = 5.0,
+        stream: Optional[TextIO] = None,
+        total: Optional[int] = None
+    ):
+        """
+        初始化报告器。
+
+        参数：
+            metrics: 写入任务使用的指标记录器
+            interval: 报告间隔（秒）
+            stream: 输出流，默认 sys.stderr
+            total: 可选的记录总数，设置后输出完成百分比
+        """
+        self.metrics = metrics
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self.total = total
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start = self._last_time = time.perf_counter()
+        self._last_count = self._initial = 0.0
+
+    def _written(self) -> float:
+        return self.metrics.counter("records", stage="ingest_job")
+
+    def report(self) -> str:
+        """
+        输出一行当前进度。
+
+        返回：
+            str: 输出的内容
+        """
+        now = time.perf_counter()
+        count = self._written() - self._initial
+        recent = (count - self._last_count) / max(now - self._last_time, 1e-9)
+        average = count / max(now - self._start, 1e-9)
+        embed_seconds = self.metrics.histogram("stage_seconds", stage="embed")["sum"]
+        line = f"已写入 {int(count)} 条"
+        if self.total:
+            line += f"（{count / self.total:.1%}）"
+        line += f"，当前 {recent:.1f} 条/秒，平均 {average:.1f} 条/秒，向量化占比 {embed_seconds / max(now - self._start, 1e-9):.0%}"
+        errors = self.metrics.counter("errors", stage="add_texts")
+        if errors:
+            line += f"，失败 {int(errors)} 次"
+        print(line, file=self.stream, flush=True)
+        self._last_time, self._last_count = now, count
+        return line
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def start(self) -> "ThroughputReporter":
+        """开始定时报告"""
+        self._start = self._last_time = time.perf_counter()
+        self._initial = self._written()
+        self._last_count = 0.0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="throughput-reporter", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """停止定时报告并输出汇总"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.report()
+
+    def __enter__(self) -> "ThroughputReporter":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.stop()
+        return False
+
+
+def ingest_files(
+    indexer: TextIndexer,
+    paths: Sequence[str],
+    mapping: ColumnMapping,
+    checkpoint_path: str,
+    file_format: Optional[str] = None,
+    readers: int = 4,
+    chunk_size: int = 1024,
+    id_offset: int = 0,
+    report_interval: Optional[float] = 5.0,
+    stream: Optional[TextIO] = None
+) -> bool:
+    """
+    将文件中的记录写入索引。
+
+    文件由 ParallelFileReader 并行读取，经 IngestJob 分块向量化、上传并保存检查点，
+    重启后从上次确认的位置继续。索引管理器使用 InMemoryMetrics 时实时报告吞吐量。
+
+    参数：
+        indexer: 文本索引管理器
+        paths: 文件路径列表，每次运行需保持相同顺序
+        mapping: 列映射
+        checkpoint_path: 检查点文件路径
+        file_format: 文件格式，默认按扩展名判断
+        readers: 同时读取的文件数量
+        chunk_size: 每块的记录数，每块写入后保存一次检查点
+        id_offset: 未指定ID列时点ID的起始值
+        report_interval: 吞吐量报告间隔（秒），为None时不报告
+        stream: 报告输出流，默认 sys.stderr
+
+    返回：
+        bool: 全部写入成功返回True
+    """
+    source = ParallelFileReader(
+        paths, mapping, file_format=file_format, workers=readers,
+        prefetch=max(chunk_size * 2, 4096), metrics=indexer.metrics
+    )
+    job = IngestJob(indexer, checkpoint_path, chunk_size=chunk_size, id_offset=id_offset)
+    try:
+        if report_interval is None or not isinstance(indexer.metrics, InMemoryMetrics):
+            return job.run(source)
+        with ThroughputReporter(indexer.metrics, interval=report_interval, stream=stream):
+            return job.run(source)
+    except Exception as e:
+        print(f"写入文件失败：{str(e)}")
+        indexer.metrics.incr("errors", stage="ingest_files")
+        return False
@@ -0,0 +1,214 @@
+"""
+可断点续传的写入任务模块。
+"""
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Tuple, Union
+import itertools
+import json
+import os
+import time
+from .indexer import TextIndexer
+from .async_indexer import AsyncTextIndexer
+
+# 数据源中的一条记录：文本，或包含 text 以及可选 id、payload 字段的字典
+Record = Union[str, Dict[str, Any]]
+
+
+class IngestCheckpoint:
+    """
+    写入进度检查点，以 JSON 文件保存在本地。
+
+    记录已确认写入的记录数（cursor）和最后一个点ID，写入时先写临时文件再原子替换，
+    进程在任意时刻退出都不会留下损坏的检查点。
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化检查点。
+
+        参数：
+            path: 检查点文件路径
+        """
+        self.path = path
+
+    def load(self) -> Dict[str, Any]:
+        """
+        读取检查点。
+
+        返回：
+            Dict: 包含 cursor 和 last_point_id，文件不存在时 cursor 为 0
+        """
+        if not os.path.exists(self.path):
+            return {"cursor": 0, "last_point_id": None}
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, cursor: int, last_point_id: Optional[Union[int, str]] = None, **extra: Any) -> None:
+        """
+        原子地保存检查点。
+
+        参数：
+            cursor: 已确认写入的记录数
+            last_point_id: 最后一个已写入的点ID
+            extra: 需要一并保存的其他字段
+        """
+        state = {"cursor": cursor, "last_point_id": last_point_id, "updated_at": time.time(), **extra}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def reset(self) -> None:
+        """删除检查点，下次从头开始"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _parse_record(record: Record, position: int, id_offset: int) -> Tuple[Union[int, str], str, Dict[str, Any]]:
+    """
+    解析一条记录。
+
+    参数：
+        record: 记录
+        position: 记录在数据源中的位置
+        id_offset: 默认点ID的起始值
+
+    返回：
+        Tuple: (点ID, 文本, 附加载荷)
+    """
+    if isinstance(record, str):
+        return position + id_offset, record, {}
+    return record.get("id", position + id_offset), record["text"], record.get("payload") or {}
+
+
+def _chunks(source: Iterable[Record], start: int, chunk_size: int) -> Iterator[Tuple[int, List[Record]]]:
+    """
+    跳过已写入的记录后按块读取数据源。
+
+    参数：
+        source: 有序数据源
+        start: 跳过的记录数
+        chunk_size: 每块的记录数
+
+    返回：
+        Iterator: (块起始位置, 记录列表)
+    """
+    iterator = itertools.islice(iter(source), start, None)
+    position = start
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield position, chunk
+        position += len(chunk)
+
+
+class IngestJob:
+    """
+    基于 TextIndexer 的可断点续传写入任务。
+
+    数据源按顺序分块读取，每块写入确认后保存检查点；重启后跳过已确认的记录继续写入。
+    数据源必须在每次运行时以相同顺序产生记录。未指定 id 的记录以其在数据源中的位置
+    作为点ID，重复写入同一块是幂等的。
+    """
+
+    def __init__(
+        self,
+        indexer: TextIndexer,
+        checkpoint_path: str,
+        chunk_size: int = 256,
+        id_offset: int = 0
+    ):
+        """
+        初始化写入任务。
+
+        参数：
+            indexer: 文本索引管理器
+            checkpoint_path: 检查点文件路径
+            chunk_size: 每块的记录数，每块写入后保存一次检查点
+            id_offset: 默认点ID的起始值
+        """
+        self.indexer = indexer
+        self.checkpoint = IngestCheckpoint(checkpoint_path)
+        self.chunk_size = chunk_size
+        self.id_offset = id_offset
+
+    def run(self, source: Iterable[Record]) -> bool:
+        """
+        运行写入任务。
+
+        参数：
+            source: 有序数据源
+
+        返回：
+            bool: 全部写入成功返回True，某块失败时停止并返回False，重启后从该块继续
+        """
+        cursor = self.checkpoint.load()["cursor"]
+        for start, records in _chunks(source, cursor, self.chunk_size):
+            parsed = [_parse_record(r, start + i, self.id_offset) for i, r in enumerate(records)]
+            ids, texts, payloads = (list(column) for column in zip(*parsed))
+            if not self.indexer.add_texts(texts, ids=ids, payloads=payloads):
+                print(f"写入任务在第 {start} 条记录处失败，已保存的进度：{cursor}")
+                return False
+            cursor = start + len(records)
+            self.checkpoint.save(cursor, ids[-1])
+            self.indexer.metrics.incr("records", len(records), stage="ingest_job")
+        return True
+
+
+class AsyncIngestJob:
+    """
+    基于 AsyncTextIndexer 的可断点续传写入任务，行为与 IngestJob 相同。
+    """
+
+    def __init__(
+        self,
+        indexer: AsyncTextIndexer,
+        checkpoint_path: str,
+        chunk_size: int = 256,
+        batch_size: int = 32,
+        id_offset: int = 0
+    ):
+        """
+        初始化写入任务。
+
+        Args:
+            indexer: 异步文本索引管理器
+            checkpoint_path: 检查点文件路径
+            chunk_size: 每块的记录数，每块写入后保存一次检查点
+            batch_size: 每块内部的上传批次大小
+            id_offset: 默认点ID的起始值
+        """
+        self.indexer = indexer
+        self.checkpoint = IngestCheckpoint(checkpoint_path)
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.id_offset = id_offset
+
+    async def run(self, source: Iterable[Record]) -> bool:
+        """
+        运行写入任务。
+
+        Args:
+            source: 有序数据源
+
+        Returns:
+            bool: 全部写入成功返回True，某块失败时停止并返回False，重启后从该块继续
+        """
+        cursor = self.checkpoint.load()["cursor"]
+        for start, records in _chunks(source, cursor, self.chunk_size):
+            parsed = [_parse_record(r, start + i, self.id_offset) for i, r in enumerate(records)]
+            ids, texts, payloads = (list(column) for column in zip(*parsed))
+            if not await self.indexer.add_texts_batch(
+                texts,
+                batch_size=self.batch_size,
+                ids=ids,
+                payloads=payloads
+            ):
+                print(f"写入任务在第 {start} 条记录处失败，已保存的进度：{cursor}")
+                return False
+            cursor = start + len(records)
+            self.checkpoint.save(cursor, ids[-1])
+            self.indexer.metrics.incr("records", len(records), stage="ingest_job")
+        return True
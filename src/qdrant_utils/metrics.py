@@ -0,0 +1,284 @@
+"""
+指标记录模块，用于统计各处理阶段的耗时、批次大小和计数。
+"""
+from typing import Dict, List, Optional, Tuple
+import bisect
+import threading
+import time
+
+# 默认的耗时直方图分桶（秒）
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 默认的数量直方图分桶（批次大小、token 数等）
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+
+
+class _NullTimer:
+    """不做任何记录的计时器"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    """记录阶段耗时的计时器"""
+
+    __slots__ = ("metrics", "stage", "labels", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str, labels: Dict[str, str]):
+        self.metrics = metrics
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        self.metrics.observe("stage_seconds", elapsed, stage=self.stage, **self.labels)
+        return False
+
+
+class Metrics:
+    """
+    指标记录基类。
+
+    默认实现不做任何记录，各组件在未传入 metrics 时使用 NULL_METRICS。
+    子类通过重写 observe 和 incr 接入具体的指标系统。
+    """
+
+    def timer(self, stage: str, **labels: str):
+        """
+        阶段计时上下文管理器，退出时以 stage_seconds 记录耗时。
+
+        参数：
+            stage: 阶段名称，如 tokenize、forward、upsert、search
+            labels: 附加标签
+        """
+        return _NULL_TIMER
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """
+        记录一次直方图观测值。
+
+        参数：
+            name: 指标名称，如 stage_seconds、batch_size、tokens
+            value: 观测值
+            labels: 附加标签
+        """
+
+    def incr(self, name: str, value: float = 1, **labels: str) -> None:
+        """
+        增加计数器。
+
+        参数：
+            name: 指标名称，如 errors、retries、cache_hits
+            value: 增量
+            labels: 附加标签
+        """
+
+
+NULL_METRICS = Metrics()
+
+
+class _Histogram:
+    """固定分桶的直方图"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class InMemoryMetrics(Metrics):
+    """在进程内存中汇总指标的记录器，线程安全。"""
+
+    def __init__(self, buckets: Optional[Dict[str, Tuple[float, ...]]] = None):
+        """
+        初始化记录器。
+
+        参数：
+            buckets: 指标名称到直方图分桶的映射，未指定的指标中
+                以 _seconds 结尾的使用 LATENCY_BUCKETS，其余使用 SIZE_BUCKETS
+        """
+        self.buckets = buckets or {}
+        self._histograms: Dict[Tuple, _Histogram] = {}
+        self._counters: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def _buckets_for(self, name: str) -> Tuple[float, ...]:
+        if name in self.buckets:
+            return self.buckets[name]
+        return LATENCY_BUCKETS if name.endswith("_seconds") else SIZE_BUCKETS
+
+    def timer(self, stage: str, **labels: str):
+        return _StageTimer(self, stage, labels)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(self._buckets_for(name))
+            histogram.observe(value)
+
+    def incr(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def counter(self, name: str, **labels: str) -> float:
+        """
+        读取计数器的当前值。
+
+        参数：
+            name: 指标名称
+            labels: 标签
+
+        返回：
+            float: 计数值，不存在时为 0
+        """
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def histogram(self, name: str, **labels: str) -> Dict[str, float]:
+        """
+        读取直方图的汇总值。
+
+        参数：
+            name: 指标名称
+            labels: 标签
+
+        返回：
+            Dict: 包含 count 和 sum，不存在时均为 0
+        """
+        with self._lock:
+            histogram = self._histograms.get((name, tuple(sorted(labels.items()))))
+            if histogram is None:
+                return {"count": 0, "sum": 0.0}
+            return {"count": histogram.count, "sum": histogram.sum}
+
+    def reset(self) -> None:
+        """清空所有指标"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def _format_labels(labels: Tuple, extra: Tuple = ()) -> str:
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    parts = []
+    for key, value in items:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class PrometheusMetrics(InMemoryMetrics):
+    """以 Prometheus 文本格式导出的指标记录器"""
+
+    def __init__(self, namespace: str = "qdrant_utils", buckets: Optional[Dict[str, Tuple[float, ...]]] = None):
+        """
+        初始化记录器。
+
+        参数：
+            namespace: 指标名称前缀
+            buckets: 指标名称到直方图分桶的映射
+        """
+        super().__init__(buckets)
+        self.namespace = namespace
+
+    def render(self) -> str:
+        """
+        生成 Prometheus 文本格式（text/plain; version=0.0.4）的指标内容。
+
+        返回：
+            str: 指标文本
+        """
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        lines: List[str] = []
+        typed = set()
+        for (name, labels), histogram in histograms:
+            metric = f"{self.namespace}_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{metric}_bucket{_format_labels(labels, (('le', bound),))} {cumulative}")
+            lines.append(f"{metric}_bucket{_format_labels(labels, (('le', '+Inf'),))} {histogram.count}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+        for (name, labels), value in counters:
+            metric = f"{self.namespace}_{name}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class OpenTelemetryMetrics(Metrics):
+    """转发到 OpenTelemetry Meter 的指标记录器，需要安装 opentelemetry-api。"""
+
+    def __init__(self, meter=None, namespace: str = "qdrant_utils"):
+        """
+        初始化记录器。
+
+        参数：
+            meter: OpenTelemetry Meter 实例，默认使用全局 MeterProvider 创建
+            namespace: 指标名称前缀
+        """
+        if meter is None:
+            try:
+                from opentelemetry import metrics as otel_metrics
+            except ImportError as e:
+                raise ImportError("OpenTelemetryMetrics 需要安装 opentelemetry-api") from e
+            meter = otel_metrics.get_meter(namespace)
+        self.meter = meter
+        self.namespace = namespace
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def timer(self, stage: str, **labels: str):
+        return _StageTimer(self, stage, labels)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.get(name)
+                if histogram is None:
+                    unit = "s" if name.endswith("_seconds") else "1"
+                    histogram = self.meter.create_histogram(f"{self.namespace}.{name}", unit=unit)
+                    self._histograms[name] = histogram
+        histogram.record(value, attributes=labels)
+
+    def incr(self, name: str, value: float = 1, **labels: str) -> None:
+        counter = self._counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.get(name)
+                if counter is None:
+                    counter = self.meter.create_counter(f"{self.namespace}.{name}")
+                    self._counters[name] = counter
+        counter.add(value, attributes=labels)
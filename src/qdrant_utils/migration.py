@@ -0,0 +1,344 @@
+"""
+向量迁移模块：用新的嵌入模型重新生成已有集合的向量，文本直接取自点的载荷。
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+import asyncio
+from qdrant_client.http.models import Filter, Record
+from .embeddings import TextEmbedding
+from .operations import QdrantOperations
+from .async_operations import AsyncQdrantOperations
+from .jobs import IngestCheckpoint
+from .docstore import DocumentStore
+
+
+class _MigrationBase:
+    """同步与异步迁移共用的参数处理与点构造"""
+
+    def __init__(
+        self,
+        embedding_model: TextEmbedding,
+        source_collection: str,
+        target_collection: Optional[str],
+        vector_name: Optional[str],
+        checkpoint_path: Optional[str],
+        text_key: str,
+        page_size: int,
+        batch_size: int,
+        scroll_filter: Optional[Filter],
+        doc_store: Optional[DocumentStore]
+    ):
+        if target_collection is None and vector_name is None:
+            raise ValueError("target_collection 与 vector_name 至少需要指定一个")
+        if target_collection == source_collection and vector_name is None:
+            raise ValueError("写回源集合时必须指定 vector_name")
+        self.embedding_model = embedding_model
+        self.source_collection = source_collection
+        self.target_collection = target_collection or source_collection
+        self.vector_name = vector_name
+        self.checkpoint = IngestCheckpoint(checkpoint_path) if checkpoint_path else None
+        self.text_key = text_key
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self.scroll_filter = scroll_filter
+        self.doc_store = doc_store
+
+    def _load_state(self) -> Dict[str, Any]:
+        if self.checkpoint is None:
+            return {"cursor": 0, "offset": None}
+        return self.checkpoint.load()
+
+    def _save_state(self, cursor: int, offset: Optional[Union[int, str]]) -> None:
+        if self.checkpoint is not None:
+            self.checkpoint.save(cursor, offset=offset, completed=offset is None)
+
+    def _build_points(self, records: List[Record]) -> Tuple[List[Dict], int]:
+        """
+        重新生成一页点的向量。
+
+        返回：
+            Tuple: (待写入的点列表, 载荷中缺少文本而跳过的点数量)
+        """
+        total = len(records)
+        if self.doc_store is not None:
+            stored = self.doc_store.get_many([r.id for r in records])
+            records = [r for r in records if r.id in stored]
+            texts = [stored[r.id] for r in records]
+        else:
+            records = [r for r in records if isinstance((r.payload or {}).get(self.text_key), str)]
+            texts = [r.payload[self.text_key] for r in records]
+        skipped = total - len(records)
+        if not records:
+            return [], skipped
+        vectors = self.embedding_model.generate_vector_batched(texts, batch_size=self.batch_size)
+        points = []
+        for record, vector in zip(records, vectors):
+            vector = vector.tolist()
+            if self.vector_name is not None:
+                points.append({"id": record.id, "vector": {self.vector_name: vector}})
+            else:
+                points.append({"id": record.id, "vector": vector, "payload": record.payload})
+        return points, skipped
+
+
+class EmbeddingMigration(_MigrationBase):
+    """
+    同步向量迁移。
+
+    按页遍历源集合，用新模型对载荷中的文本重新生成向量，写入新集合（复制点ID与载荷），
+    或写入某个集合中已配置的命名向量（只更新该向量，载荷与其他向量不变）。遍历、推理
+    与写入三个阶段流水线执行：后台线程预取下一页、主线程推理当前页的同时，上一页在
+    写入线程中上传，整体速度只受推理吞吐限制。每页写入确认后保存检查点，重启后从下一页继续。
+
+    Qdrant 不支持向已有集合追加命名向量，写入命名向量时目标集合需在创建时就配置该向量。
+    源集合中的稀疏向量不会复制到新集合。
+    """
+
+    def __init__(
+        self,
+        embedding_model: TextEmbedding,
+        qdrant_ops: QdrantOperations,
+        source_collection: str,
+        target_collection: Optional[str] = None,
+        vector_name: Optional[str] = None,
+        checkpoint_path: Optional[str] = None,
+        text_key: str = "title",
+        page_size: int = 256,
+        batch_size: int = 32,
+        scroll_filter: Optional[Filter] = None,
+        target_ops: Optional[QdrantOperations] = None,
+        doc_store: Optional[DocumentStore] = None
+    ):
+        """
+        初始化迁移任务。
+
+        参数：
+            embedding_model: 新的文本嵌入模型
+            qdrant_ops: 源集合所在的Qdrant操作类实例
+            source_collection: 源集合名称
+            target_collection: 目标集合名称，未指定时写回源集合（此时必须指定 vector_name）
+            vector_name: 写入的命名向量，未指定时写入目标集合的未命名向量并复制载荷
+            checkpoint_path: 检查点文件路径，未指定时不支持断点续传
+            text_key: 载荷中保存文本的字段
+            page_size: 每页的点数量，每页写入后保存一次检查点
+            batch_size: 推理的微批次大小
+            scroll_filter: 可选的载荷过滤条件，只迁移匹配的点
+            target_ops: 目标集合所在的Qdrant操作类实例，默认与源集合相同
+            doc_store: 可选的外部文档存储，设置后文本按点ID从文档存储读取而不是载荷
+        """
+        super().__init__(
+            embedding_model, source_collection, target_collection, vector_name,
+            checkpoint_path, text_key, page_size, batch_size, scroll_filter, doc_store
+        )
+        self.qdrant_ops = qdrant_ops
+        self.target_ops = target_ops or qdrant_ops
+
+    def _prepare_target(self) -> bool:
+        """写入新集合时按新模型的维度创建目标集合，集合已存在时直接使用"""
+        if self.vector_name is not None or self.target_ops.client.collection_exists(self.target_collection):
+            return True
+        return self.target_ops.create_collection(
+            self.target_collection,
+            vector_size=self.embedding_model.vector_size,
+            datatype=self.embedding_model.datatype
+        )
+
+    def _write(self, points: List[Dict]) -> bool:
+        if not points:
+            return True
+        if self.vector_name is not None:
+            return self.target_ops.update_vectors(self.target_collection, points)
+        return self.target_ops.upsert_points_batch(self.target_collection, points)
+
+    def run(self) -> bool:
+        """
+        运行迁移。
+
+        返回：
+            bool: 全部迁移成功返回True，遍历或写入失败时返回False，重启后从最后确认的页继续
+        """
+        state = self._load_state()
+        if state.get("completed"):
+            return True
+        try:
+            if not self._prepare_target():
+                return False
+        except Exception as e:
+            print(f"准备目标集合失败: {str(e)}")
+            self.qdrant_ops.metrics.incr("errors", stage="migration")
+            return False
+
+        cursor = state["cursor"]
+        offset = state.get("offset")
+        finished = False
+        pending: Optional[Tuple[Future, int, Optional[Union[int, str]]]] = None
+
+        def confirm() -> bool:
+            future, done, next_offset = pending
+            if not future.result():
+                print(f"迁移在第 {cursor} 个点之后写入失败")
+                return False
+            self._save_state(done, next_offset)
+            self.qdrant_ops.metrics.incr("records", done - cursor, stage="migration")
+            return True
+
+        try:
+            with ThreadPoolExecutor(max_workers=1) as writer:
+                for records, next_offset in self.qdrant_ops.scroll_pages(
+                    self.source_collection,
+                    page_size=self.page_size,
+                    with_payload=True,
+                    with_vectors=False,
+                    scroll_filter=self.scroll_filter,
+                    offset=offset
+                ):
+                    with self.qdrant_ops.metrics.timer("migration_embed"):
+                        points, skipped = self._build_points(records)
+                    if skipped:
+                        self.qdrant_ops.metrics.incr("skipped", skipped, stage="migration")
+                    if pending is not None:
+                        if not confirm():
+                            return False
+                        cursor = pending[1]
+                    pending = (writer.submit(self._write, points), cursor + len(records), next_offset)
+                    finished = next_offset is None
+                if pending is not None:
+                    if not confirm():
+                        return False
+                    cursor = pending[1]
+        except Exception as e:
+            # 遍历或推理中途出错，已确认写入的页保存在检查点中，重启后继续
+            print(f"迁移在第 {cursor} 个点之后中断: {str(e)}")
+            self.qdrant_ops.metrics.incr("errors", stage="migration")
+            return False
+        return finished
+
+
+class AsyncEmbeddingMigration(_MigrationBase):
+    """
+    异步向量迁移，行为与 EmbeddingMigration 相同。
+
+    推理在线程池中执行，上一页的写入与下一页的预取在事件循环中并发进行。
+    """
+
+    def __init__(
+        self,
+        embedding_model: TextEmbedding,
+        operations: AsyncQdrantOperations,
+        source_collection: str,
+        target_collection: Optional[str] = None,
+        vector_name: Optional[str] = None,
+        checkpoint_path: Optional[str] = None,
+        text_key: str = "title",
+        page_size: int = 256,
+        batch_size: int = 32,
+        scroll_filter: Optional[Filter] = None,
+        target_operations: Optional[AsyncQdrantOperations] = None,
+        doc_store: Optional[DocumentStore] = None
+    ):
+        """
+        初始化迁移任务。
+
+        Args:
+            embedding_model: 新的文本嵌入模型
+            operations: 源集合所在的异步Qdrant操作类实例
+            source_collection: 源集合名称
+            target_collection: 目标集合名称，未指定时写回源集合（此时必须指定 vector_name）
+            vector_name: 写入的命名向量，未指定时写入目标集合的未命名向量并复制载荷
+            checkpoint_path: 检查点文件路径，未指定时不支持断点续传
+            text_key: 载荷中保存文本的字段
+            page_size: 每页的点数量，每页写入后保存一次检查点
+            batch_size: 推理的微批次大小
+            scroll_filter: 可选的载荷过滤条件，只迁移匹配的点
+            target_operations: 目标集合所在的异步Qdrant操作类实例，默认与源集合相同
+            doc_store: 可选的外部文档存储，设置后文本按点ID从文档存储读取而不是载荷
+        """
+        super().__init__(
+            embedding_model, source_collection, target_collection, vector_name,
+            checkpoint_path, text_key, page_size, batch_size, scroll_filter, doc_store
+        )
+        self.operations = operations
+        self.target_operations = target_operations or operations
+
+    async def _prepare_target(self) -> bool:
+        if self.vector_name is not None or await self.target_operations.client.collection_exists(self.target_collection):
+            return True
+        return await self.target_operations.create_collection(
+            self.target_collection,
+            vector_size=self.embedding_model.vector_size,
+            datatype=self.embedding_model.datatype
+        )
+
+    async def _write(self, points: List[Dict]) -> bool:
+        if not points:
+            return True
+        if self.vector_name is not None:
+            return await self.target_operations.update_vectors(self.target_collection, points)
+        return await self.target_operations.upsert_points_batch(self.target_collection, points)
+
+    async def run(self) -> bool:
+        """
+        运行迁移。
+
+        Returns:
+            bool: 全部迁移成功返回True，遍历或写入失败时返回False，重启后从最后确认的页继续
+        """
+        state = self._load_state()
+        if state.get("completed"):
+            return True
+        try:
+            if not await self._prepare_target():
+                return False
+        except Exception as e:
+            print(f"准备目标集合失败: {str(e)}")
+            self.operations.metrics.incr("errors", stage="migration")
+            return False
+
+        loop = asyncio.get_running_loop()
+        cursor = state["cursor"]
+        offset = state.get("offset")
+        finished = False
+        pending = None
+
+        async def confirm() -> bool:
+            task, done, next_offset = pending
+            if not await task:
+                print(f"迁移在第 {cursor} 个点之后写入失败")
+                return False
+            self._save_state(done, next_offset)
+            self.operations.metrics.incr("records", done - cursor, stage="migration")
+            return True
+
+        try:
+            async for records, next_offset in self.operations.scroll_pages(
+                self.source_collection,
+                page_size=self.page_size,
+                with_payload=True,
+                with_vectors=False,
+                scroll_filter=self.scroll_filter,
+                offset=offset
+            ):
+                with self.operations.metrics.timer("migration_embed"):
+                    points, skipped = await loop.run_in_executor(None, self._build_points, records)
+                if skipped:
+                    self.operations.metrics.incr("skipped", skipped, stage="migration")
+                if pending is not None:
+                    if not await confirm():
+                        return False
+                    cursor = pending[1]
+                pending = (asyncio.ensure_future(self._write(points)), cursor + len(records), next_offset)
+                finished = next_offset is None
+            if pending is not None:
+                if not await confirm():
+                    return False
+                cursor = pending[1]
+                pending = None
+        except Exception as e:
+            # 遍历或推理中途出错，已确认写入的页保存在检查点中，重启后继续
+            print(f"迁移在第 {cursor} 个点之后中断: {str(e)}")
+            self.operations.metrics.incr("errors", stage="migration")
+            return False
+        finally:
+            if pending is not None and not pending[0].done():
+                pending[0].cancel()
+        return finished
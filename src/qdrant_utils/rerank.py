@@ -0,0 +1,151 @@
+"""
+重排序模块，使用交叉编码器对向量检索的候选结果重新打分。
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, Dict, Tuple, Optional
+import threading
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from .metrics import Metrics, NULL_METRICS
+
+class Reranker(ABC):
+    """重排序基类"""
+
+    # 指标记录器，子类可在初始化时替换
+    metrics: Metrics = NULL_METRICS
+
+    @abstractmethod
+    def score(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        """
+        计算 (查询, 文本) 对的相关性得分
+        :param pairs: (查询, 文本) 列表
+        :return: 与 pairs 一一对应的得分，越大越相关
+        """
+        pass
+
+    def rerank_batch(
+        self,
+        queries: List[str],
+        hits_list: List[List[Dict]],
+        top_k: int,
+        text_key: str = "title"
+    ) -> List[List[Dict]]:
+        """
+        对多个查询的候选结果重新排序
+
+        所有查询的候选对合并后一次打分，每条结果增加 rerank_score 字段，
+        原有的 score（向量相似度）保持不变。
+        :param queries: 查询文本列表
+        :param hits_list: 与 queries 一一对应的候选结果列表，每条结果包含 payload
+        :param top_k: 每个查询保留的结果数量
+        :param text_key: 载荷中保存文本的字段
+        :return: 重新排序后的结果列表的列表
+        """
+        pairs = [
+            (query, str((hit.get("payload") or {}).get(text_key, "")))
+            for query, hits in zip(queries, hits_list)
+            for hit in hits
+        ]
+        scores = iter(self.score(pairs)) if pairs else iter(())
+        results = []
+        for hits in hits_list:
+            scored = [dict(hit, rerank_score=next(scores)) for hit in hits]
+            scored.sort(key=lambda hit: hit["rerank_score"], reverse=True)
+            results.append(scored[:top_k])
+        return results
+
+    def rerank(self, query: str, hits: List[Dict], top_k: int, text_key: str = "title") -> List[Dict]:
+        """
+        对单个查询的候选结果重新排序
+        :param query: 查询文本
+        :param hits: 候选结果列表
+        :param top_k: 保留的结果数量
+        :param text_key: 载荷中保存文本的字段
+        :return: 重新排序后的结果列表
+        """
+        return self.rerank_batch([query], [hits], top_k, text_key)[0]
+
+class CrossEncoderReranker(Reranker):
+    """
+    基于本地交叉编码器（如 bge-reranker）的重排序类
+
+    待打分的文本对按长度排序后分批计算，减少填充；得分按 (查询, 文本) 缓存，
+    重复的查询或热门文本不会重复计算。
+    """
+
+    def __init__(
+        self,
+        model_name: str = "BAAI/bge-reranker-base",
+        max_length: int = 512,
+        batch_size: int = 32,
+        cache_size: int = 10000,
+        metrics: Optional[Metrics] = None
+    ):
+        """
+        初始化重排序模型。
+
+        参数：
+            model_name: 交叉编码器模型名称或本地路径
+            max_length: 每个文本对的最大 token 数
+            batch_size: 每个批次的文本对数量
+            cache_size: 得分缓存的最大条目数，为 0 时不缓存
+            metrics: 可选的指标记录器，记录前向计算耗时与缓存命中数
+        """
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        self.model.eval()
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.metrics = metrics or NULL_METRICS
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _forward(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        """
+        计算一个批次的得分
+        :param pairs: (查询, 文本) 列表
+        :return: 得分列表
+        """
+        encoded = self.tokenizer(
+            [query for query, _ in pairs],
+            [text for _, text in pairs],
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors='pt'
+        )
+        with self.metrics.timer("rerank_forward"), torch.no_grad():
+            logits = self.model(**encoded).logits
+        # 单输出模型直接使用 logit，多分类模型使用最后一类（相关）的 logit
+        return logits[:, -1].float().tolist()
+
+    def score(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        """
+        计算 (查询, 文本) 对的相关性得分
+        :param pairs: (查询, 文本) 列表
+        :return: 与 pairs 一一对应的得分
+        """
+        scores: Dict[Tuple[str, str], float] = {}
+        with self._lock:
+            for pair in pairs:
+                if pair in self._cache:
+                    self._cache.move_to_end(pair)
+                    scores[pair] = self._cache[pair]
+        missing = list(dict.fromkeys(pair for pair in pairs if pair not in scores))
+        self.metrics.incr("cache_hits", len(pairs) - len(missing), cache="rerank")
+
+        # 按长度排序后分批计算
+        missing.sort(key=lambda pair: len(pair[0]) + len(pair[1]))
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            scores.update(zip(batch, self._forward(batch)))
+
+        if self.cache_size:
+            with self._lock:
+                for pair in missing:
+                    self._cache[pair] = scores[pair]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return [scores[pair] for pair in pairs]
@@ -0,0 +1,210 @@
+"""
+写入重试模块：带抖动的指数退避、超大批次拆分判断以及失败批次日志。
+"""
+from typing import List, Dict, Any, Optional
+import json
+import os
+import random
+import threading
+import time
+from qdrant_client.http.exceptions import ResponseHandlingException
+
+# 可以重试的 HTTP 状态码
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+# 可以重试的 gRPC 状态
+RETRYABLE_GRPC_CODES = {"UNAVAILABLE", "DEADLINE_EXCEEDED", "ABORTED"}
+
+
+def _grpc_code(exc: Exception) -> Optional[str]:
+    """获取 gRPC 异常的状态名称，非 gRPC 异常返回 None"""
+    code = getattr(exc, "code", None)
+    if not callable(code):
+        return None
+    try:
+        return getattr(code(), "name", None)
+    except Exception:
+        return None
+
+
+def is_payload_too_large(exc: Exception) -> bool:
+    """
+    判断异常是否由请求体过大引起。
+
+    参数：
+        exc: 异常
+
+    返回：
+        bool: 请求体过大时返回True
+    """
+    if getattr(exc, "status_code", None) == 413:
+        return True
+    if _grpc_code(exc) == "RESOURCE_EXHAUSTED":
+        return True
+    message = str(exc).lower()
+    return "payload too large" in message or "larger than allowed" in message
+
+
+def is_transient_error(exc: Exception) -> bool:
+    """
+    判断异常是否为可重试的临时错误（网络中断、超时、限流、服务端 5xx）。
+
+    参数：
+        exc: 异常
+
+    返回：
+        bool: 可重试时返回True
+    """
+    status_code = getattr(exc, "status_code", None)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    if _grpc_code(exc) in RETRYABLE_GRPC_CODES:
+        return True
+    return isinstance(exc, (ConnectionError, TimeoutError, ResponseHandlingException))
+
+
+class RetryPolicy:
+    """写入重试策略"""
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        split_on_too_large: bool = True
+    ):
+        """
+        初始化重试策略。
+
+        参数：
+            max_attempts: 每个批次的最大尝试次数（含首次）
+            base_delay: 首次重试的退避上限（秒），之后每次翻倍
+            max_delay: 单次退避的最大时长（秒）
+            split_on_too_large: 请求体过大时是否将批次对半拆分后重试
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts 必须大于等于 1")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.split_on_too_large = split_on_too_large
+
+    def delay(self, attempt: int) -> float:
+        """
+        计算第 attempt 次重试前的等待时间，使用完全抖动（full jitter）。
+
+        参数：
+            attempt: 已失败的次数，从 0 开始
+
+        返回：
+            float: 等待秒数
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def should_retry(self, exc: Exception, attempt: int) -> bool:
+        """
+        判断是否继续重试。
+
+        参数：
+            exc: 本次失败的异常
+            attempt: 已失败的次数，从 0 开始
+
+        返回：
+            bool: 需要重试时返回True
+        """
+        return attempt + 1 < self.max_attempts and is_transient_error(exc)
+
+
+# 不重试的策略，用于需要保持原有行为的场景
+NO_RETRY = RetryPolicy(max_attempts=1, split_on_too_large=False)
+
+
+class FailedBatchJournal:
+    """
+    失败批次日志。
+
+    重试耗尽后仍失败的批次（含已计算的向量）以 JSON Lines 追加写入本地文件，
+    之后可通过 QdrantOperations.replay_journal 重新上传，无需重新向量化。
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化失败批次日志。
+
+        参数：
+            path: 日志文件路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, collection_name: str, points: List[Dict[str, Any]], error: str) -> None:
+        """
+        记录一个失败批次。
+
+        参数：
+            collection_name: 集合名称
+            points: 点数据列表，格式与 upsert_points_batch 的参数相同
+            error: 错误信息
+        """
+        entry = {
+            "collection_name": collection_name,
+            "points": points,
+            "error": error,
+            "time": time.time()
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    @property
+    def replaying_path(self) -> str:
+        """重放中的批次暂存文件路径"""
+        return self.path + ".replaying"
+
+    @staticmethod
+    def _read(path: str) -> List[Dict[str, Any]]:
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """
+        读取当前记录的失败批次。
+
+        返回：
+            List[Dict]: 失败批次记录
+        """
+        with self._lock:
+            return self._read(self.path)
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """
+        取出全部失败批次用于重放。
+
+        批次移动到暂存文件，重放完成后调用 commit_replay 删除；进程在重放中途退出时，
+        下次 drain 会重新取出暂存文件中的批次。重放时再次失败的批次会重新写入日志。
+
+        返回：
+            List[Dict]: 失败批次记录
+        """
+        with self._lock:
+            if os.path.exists(self.path):
+                with open(self.path, encoding="utf-8") as src, \
+                        open(self.replaying_path, "a", encoding="utf-8") as dst:
+                    dst.write(src.read())
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                os.remove(self.path)
+            return self._read(self.replaying_path)
+
+    def commit_replay(self) -> None:
+        """重放完成后删除暂存文件"""
+        with self._lock:
+            if os.path.exists(self.replaying_path):
+                os.remove(self.replaying_path)
+
+    def __len__(self) -> int:
+        return len(self.entries())
@@ -0,0 +1,463 @@
+"""
+多租户路由与跨集合扇出搜索模块。
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Union
+import asyncio
+import heapq
+import uuid
+from qdrant_client.http.models import Filter, FieldCondition, MatchValue
+from .embeddings import TextEmbedding, to_query_vector
+from .indexer import TextIndexer
+from .operations import QdrantOperations
+from .async_indexer import AsyncTextIndexer
+from .async_operations import AsyncQdrantOperations
+from .metrics import Metrics, NULL_METRICS
+
+# 默认的租户载荷字段
+TENANT_KEY = "tenant_id"
+
+# 租户点 ID 的命名空间，修改后已写入的点 ID 将无法对应
+TENANT_NAMESPACE = uuid.UUID("8e3f1c5a-6d2b-4a7e-b9f0-1c4d7a2e5b93")
+
+
+def tenant_point_id(tenant_id: str, doc_id: Union[int, str]) -> str:
+    """
+    生成租户文档对应的点 ID，不同租户的相同文档 ID 不会互相覆盖。
+
+    参数：
+        tenant_id: 租户 ID
+        doc_id: 租户内的文档 ID
+
+    返回：
+        str: 由租户 ID 和文档 ID 确定的 UUID 字符串
+    """
+    return str(uuid.uuid5(TENANT_NAMESPACE, f"{tenant_id}:{doc_id}"))
+
+
+def tenant_filter(tenant_id: str, tenant_key: str = TENANT_KEY) -> Filter:
+    """
+    构建只匹配指定租户的过滤条件。
+
+    参数：
+        tenant_id: 租户 ID
+        tenant_key: 租户载荷字段
+
+    返回：
+        Filter: 过滤条件
+    """
+    return Filter(must=[FieldCondition(key=tenant_key, match=MatchValue(value=tenant_id))])
+
+
+def _tenant_points(
+    tenant_id: str,
+    tenant_key: str,
+    count: int,
+    ids: Optional[List[Union[int, str]]],
+    payloads: Optional[List[Dict[str, Any]]]
+) -> tuple:
+    """
+    将租户内的文档 ID 和载荷转换为共享集合中的点 ID 和载荷。
+
+    参数：
+        tenant_id: 租户 ID
+        tenant_key: 租户载荷字段
+        count: 文本数量
+        ids: 租户内的文档 ID 列表，默认使用文本下标
+        payloads: 附加载荷列表
+
+    返回：
+        tuple: (点 ID 列表, 载荷列表)
+    """
+    doc_ids = ids if ids is not None else list(range(count))
+    point_ids = [tenant_point_id(tenant_id, doc_id) for doc_id in doc_ids]
+    tenant_payloads = [
+        {**(payloads[i] if payloads else {}), tenant_key: tenant_id, "doc_id": doc_id}
+        for i, doc_id in enumerate(doc_ids)
+    ]
+    return point_ids, tenant_payloads
+
+
+def _merge_top_k(results: List[List[Dict]], collection_names: List[str], limit: int) -> List[Dict]:
+    """
+    合并多个集合的搜索结果并按得分截取前 limit 条。
+
+    参数：
+        results: 与 collection_names 一一对应的搜索结果
+        collection_names: 集合名称列表
+        limit: 返回结果数量
+
+    返回：
+        List[Dict]: 合并后的结果，每条结果增加 collection 字段
+    """
+    hits = (
+        dict(hit, collection=name)
+        for name, collection_hits in zip(collection_names, results)
+        for hit in collection_hits
+    )
+    return heapq.nlargest(limit, hits, key=lambda hit: hit["score"])
+
+
+class TenantRouter:
+    """
+    共享集合的多租户路由。
+
+    所有租户写入同一个集合，以租户载荷字段区分，并为该字段创建租户索引；
+    写入时点 ID 按租户重新生成，原始文档 ID 保存在载荷的 doc_id 字段，
+    搜索时自动附加租户过滤条件，租户之间的数据互不可见。
+    """
+
+    def __init__(self, indexer: TextIndexer, tenant_key: str = TENANT_KEY):
+        """
+        初始化多租户路由。
+
+        参数：
+            indexer: 共享集合的文本索引管理器
+            tenant_key: 租户载荷字段
+        """
+        self.indexer = indexer
+        self.tenant_key = tenant_key
+
+    def create_index(self, force: bool = False) -> bool:
+        """
+        创建共享集合及租户索引。
+
+        参数：
+            force: 如果为True，则强制重新创建集合
+
+        返回：
+            bool: 成功返回True，集合已存在时返回False
+        """
+        if not self.indexer.create_index(force=force):
+            return False
+        return self.indexer.qdrant_ops.create_payload_index(
+            self.indexer.collection_name,
+            self.tenant_key,
+            is_tenant=True
+        )
+
+    def add_texts(
+        self,
+        tenant_id: str,
+        texts: List[str],
+        ids: Optional[List[Union[int, str]]] = None,
+        payloads: Optional[List[Dict[str, Any]]] = None
+    ) -> bool:
+        """
+        添加租户文本。
+
+        参数：
+            tenant_id: 租户 ID
+            texts: 文本列表
+            ids: 可选的租户内文档 ID 列表，默认使用文本下标
+            payloads: 可选的附加载荷列表
+
+        返回：
+            bool: 是否添加成功
+        """
+        point_ids, tenant_payloads = _tenant_points(tenant_id, self.tenant_key, len(texts), ids, payloads)
+        return self.indexer.add_texts(texts, ids=point_ids, payloads=tenant_payloads)
+
+    def search(self, tenant_id: str, query: str, limit: int = 10, score_threshold: float = 0.0) -> List[Dict]:
+        """
+        在租户范围内搜索相似文本。
+
+        参数：
+            tenant_id: 租户 ID
+            query: 查询文本
+            limit: 返回结果数量限制
+            score_threshold: 相似度阈值
+
+        返回：
+            List[Dict]: 搜索结果列表
+        """
+        return self.indexer.search(
+            query,
+            limit=limit,
+            score_threshold=score_threshold,
+            query_filter=tenant_filter(tenant_id, self.tenant_key)
+        )
+
+    def search_batch(
+        self,
+        tenant_id: str,
+        queries: List[str],
+        limit: int = 10,
+        score_threshold: float = 0.0
+    ) -> List[List[Dict]]:
+        """
+        在租户范围内批量搜索相似文本。
+
+        参数：
+            tenant_id: 租户 ID
+            queries: 查询文本列表
+            limit: 每个查询返回的结果数量限制
+            score_threshold: 相似度阈值
+
+        返回：
+            List[List[Dict]]: 搜索结果列表的列表
+        """
+        return self.indexer.search_batch(
+            queries,
+            limit=limit,
+            score_threshold=score_threshold,
+            query_filter=tenant_filter(tenant_id, self.tenant_key)
+        )
+
+
+class AsyncTenantRouter:
+    """
+    共享集合的异步多租户路由，行为与 TenantRouter 相同。
+    """
+
+    def __init__(self, indexer: AsyncTextIndexer, tenant_key: str = TENANT_KEY):
+        """
+        初始化多租户路由。
+
+        Args:
+            indexer: 共享集合的异步文本索引管理器
+            tenant_key: 租户载荷字段
+        """
+        self.indexer = indexer
+        self.tenant_key = tenant_key
+
+    async def create_index(self, force: bool = False) -> bool:
+        """
+        创建共享集合及租户索引。
+
+        Args:
+            force: 是否强制重建集合
+
+        Returns:
+            bool: 是否成功创建
+        """
+        if not await self.indexer.create_index(force=force):
+            return False
+        return await self.indexer.operations.create_payload_index(
+            self.indexer.collection_name,
+            self.tenant_key,
+            is_tenant=True
+        )
+
+    async def add_texts_batch(
+        self,
+        tenant_id: str,
+        texts: List[str],
+        batch_size: int = 32,
+        ids: Optional[List[Union[int, str]]] = None,
+        payloads: Optional[List[Dict[str, Any]]] = None
+    ) -> bool:
+        """
+        批量添加租户文本。
+
+        Args:
+            tenant_id: 租户 ID
+            texts: 文本列表
+            batch_size: 批处理大小
+            ids: 可选的租户内文档 ID 列表，默认使用文本下标
+            payloads: 可选的附加载荷列表
+
+        Returns:
+            bool: 是否全部添加成功
+        """
+        point_ids, tenant_payloads = _tenant_points(tenant_id, self.tenant_key, len(texts), ids, payloads)
+        return await self.indexer.add_texts_batch(
+            texts,
+            batch_size=batch_size,
+            ids=point_ids,
+            payloads=tenant_payloads
+        )
+
+    async def search(self, tenant_id: str, query: str, limit: int = 10, score_threshold: float = 0.0) -> List[Dict]:
+        """
+        在租户范围内搜索相似文本。
+
+        Args:
+            tenant_id: 租户 ID
+            query: 查询文本
+            limit: 返回结果数量限制
+            score_threshold: 相似度阈值
+
+        Returns:
+            List[Dict]: 搜索结果列表
+        """
+        return await self.indexer.search(
+            query,
+            limit=limit,
+            score_threshold=score_threshold,
+            query_filter=tenant_filter(tenant_id, self.tenant_key)
+        )
+
+    async def search_batch(
+        self,
+        tenant_id: str,
+        queries: List[str],
+        limit: int = 10,
+        score_threshold: float = 0.0
+    ) -> List[List[Dict]]:
+        """
+        在租户范围内批量搜索相似文本。
+
+        Args:
+            tenant_id: 租户 ID
+            queries: 查询文本列表
+            limit: 每个查询返回的结果数量限制
+            score_threshold: 相似度阈值
+
+        Returns:
+            List[List[Dict]]: 搜索结果列表的列表
+        """
+        return await self.indexer.search_batch(
+            queries,
+            limit=limit,
+            score_threshold=score_threshold,
+            query_filter=tenant_filter(tenant_id, self.tenant_key)
+        )
+
+
+class FanOutSearcher:
+    """
+    跨集合扇出搜索。
+
+    查询只向量化一次，随后在线程池中并发搜索各集合，合并后按得分返回前 limit 条。
+    各集合需使用相同的向量模型和距离度量，得分才可比较；某个集合搜索失败时
+    只返回其余集合的结果。
+    """
+
+    def __init__(
+        self,
+        embedding_model: TextEmbedding,
+        qdrant_ops: QdrantOperations,
+        collection_names: List[str],
+        max_workers: Optional[int] = None,
+        metrics: Optional[Metrics] = None
+    ):
+        """
+        初始化扇出搜索。
+
+        参数：
+            embedding_model: 文本向量生成模型
+            qdrant_ops: 所有集合共用的 Qdrant 操作类实例
+            collection_names: 集合名称列表
+            max_workers: 并发搜索的线程数，默认为集合数量
+            metrics: 可选的指标记录器，默认不记录
+        """
+        self.embedding_model = embedding_model
+        self.qdrant_ops = qdrant_ops
+        self.collection_names = list(collection_names)
+        self.max_workers = max_workers
+        self.metrics = metrics or NULL_METRICS
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        score_threshold: float = 0.0,
+        query_filter: Optional[Filter] = None
+    ) -> List[Dict]:
+        """
+        在所有集合中搜索相似文本。
+
+        参数：
+            query: 查询文本
+            limit: 合并后返回的结果数量
+            score_threshold: 相似度阈值
+            query_filter: 可选的载荷过滤条件
+
+        返回：
+            List[Dict]: 搜索结果列表，每条结果包含 id、score、payload 和 collection
+        """
+        try:
+            with self.metrics.timer("embed"):
+                query_vector = to_query_vector(
+                    self.embedding_model.generate_vector([query])[0], self.embedding_model.datatype
+                )
+
+            def search_collection(collection_name: str) -> List[Dict]:
+                return [
+                    {"id": point.id, "score": point.score, "payload": point.payload}
+                    for point in self.qdrant_ops.query_points(
+                        collection_name=collection_name,
+                        vector=query_vector,
+                        limit=limit,
+                        score_threshold=score_threshold,
+                        query_filter=query_filter
+                    )
+                ]
+
+            with self.metrics.timer("fan_out"):
+                with ThreadPoolExecutor(max_workers=self.max_workers or len(self.collection_names) or 1) as executor:
+                    results = list(executor.map(search_collection, self.collection_names))
+            return _merge_top_k(results, self.collection_names, limit)
+        except Exception as e:
+            print(f"扇出搜索失败：{str(e)}")
+            self.metrics.incr("errors", stage="fan_out")
+            return []
+
+
+class AsyncFanOutSearcher:
+    """
+    异步跨集合扇出搜索，行为与 FanOutSearcher 相同，各集合的请求并发发出。
+    """
+
+    def __init__(
+        self,
+        embedding_model: TextEmbedding,
+        operations: AsyncQdrantOperations,
+        collection_names: List[str],
+        metrics: Optional[Metrics] = None
+    ):
+        """
+        初始化扇出搜索。
+
+        Args:
+            embedding_model: 文本向量生成模型
+            operations: 所有集合共用的异步 Qdrant 操作类实例
+            collection_names: 集合名称列表
+            metrics: 可选的指标记录器，默认不记录
+        """
+        self.embedding_model = embedding_model
+        self.operations = operations
+        self.collection_names = list(collection_names)
+        self.metrics = metrics or NULL_METRICS
+
+    async def search(
+        self,
+        query: str,
+        limit: int = 10,
+        score_threshold: float = 0.0,
+        query_filter: Optional[Filter] = None
+    ) -> List[Dict]:
+        """
+        在所有集合中搜索相似文本。
+
+        Args:
+            query: 查询文本
+            limit: 合并后返回的结果数量
+            score_threshold: 相似度阈值
+            query_filter: 可选的载荷过滤条件
+
+        Returns:
+            List[Dict]: 搜索结果列表，每条结果包含 id、score、payload 和 collection
+        """
+        try:
+            with self.metrics.timer("embed"):
+                query_vector = to_query_vector(
+                    self.embedding_model.generate_vector([query])[0], self.embedding_model.datatype
+                )
+            request = {
+                "vector": query_vector,
+                "limit": limit,
+                "score_threshold": score_threshold,
+                "filter": query_filter
+            }
+            with self.metrics.timer("fan_out"):
+                results = await asyncio.gather(*[
+                    self.operations.search_batch([dict(request, collection_name=name)])
+                    for name in self.collection_names
+                ])
+            return _merge_top_k([r[0] if r else [] for r in results], self.collection_names, limit)
+        except Exception as e:
+            print(f"扇出搜索失败: {str(e)}")
+            self.metrics.incr("errors", stage="fan_out")
+            return []
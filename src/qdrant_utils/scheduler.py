@@ -0,0 +1,164 @@
+"""
+优先级调度模块：交互式查询与后台写入共用向量模型和 Qdrant 连接时，按优先级分配有限的并发槽位。
+"""
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+import asyncio
+import time
+from .metrics import Metrics, NULL_METRICS
+
+# 优先级类别
+QUERY = "query"
+INGEST = "ingest"
+
+
+class SchedulerOverloaded(Exception):
+    """等待队列已满，请求被拒绝"""
+
+
+class PriorityScheduler:
+    """
+    两级优先级调度器。
+
+    每个工作单元（一个向量化微批次或一次 Qdrant 请求）执行前申请一个槽位，执行完毕后释放。
+    槽位空出时总是先分配给等待中的查询，只有没有查询等待时才分配给写入；写入同时占用的槽位
+    不超过 max_ingest_concurrency，保证查询总有可用的槽位。写入按微批次申请槽位，因此查询
+    最多等待一个写入微批次，相当于在微批次边界抢占写入。
+
+    等待中的查询超过 max_query_queue 时新的查询直接被拒绝（抛出 SchedulerOverloaded），
+    避免过载时排队延迟无限增长；写入默认不限制队列长度，通过等待实现背压。
+
+    调度器基于事件循环的 Future，同一实例只应在一个事件循环中使用。
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 1,
+        max_ingest_concurrency: int = 1,
+        max_query_queue: Optional[int] = 256,
+        max_ingest_queue: Optional[int] = None,
+        metrics: Optional[Metrics] = None
+    ):
+        """
+        初始化调度器。
+
+        参数：
+            max_concurrency: 同时执行的工作单元数量上限
+            max_ingest_concurrency: 写入同时占用的槽位上限，应小于 max_concurrency 以便为查询预留槽位；
+                max_concurrency 为 1 时写入与查询轮流使用唯一的槽位
+            max_query_queue: 等待中的查询数量上限，None 表示不限制
+            max_ingest_queue: 等待中的写入数量上限，None 表示不限制
+            metrics: 可选的指标记录器，记录排队耗时（scheduler_wait_seconds）与拒绝次数（rejected）
+        """
+        if max_concurrency < 1 or max_ingest_concurrency < 1:
+            raise ValueError("并发数量上限必须大于0")
+        self.max_concurrency = max_concurrency
+        self.limits = {QUERY: max_concurrency, INGEST: min(max_ingest_concurrency, max_concurrency)}
+        self.max_queue = {QUERY: max_query_queue, INGEST: max_ingest_queue}
+        self.metrics = metrics or NULL_METRICS
+        self._running: Dict[str, int] = {QUERY: 0, INGEST: 0}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {QUERY: deque(), INGEST: deque()}
+
+    def _check_priority(self, priority: str) -> None:
+        if priority not in self._running:
+            raise ValueError(f"不支持的优先级类别: {priority}")
+
+    def _can_start(self, priority: str) -> bool:
+        if sum(self._running.values()) >= self.max_concurrency:
+            return False
+        if self._running[priority] >= self.limits[priority]:
+            return False
+        # 写入只在没有查询等待时启动
+        return priority == QUERY or not self._pending(QUERY)
+
+    def _pending(self, priority: str) -> int:
+        return sum(1 for waiter in self._waiters[priority] if not waiter.done())
+
+    def _dispatch(self) -> None:
+        """按优先级把空出的槽位分配给等待者"""
+        for priority in (QUERY, INGEST):
+            waiters = self._waiters[priority]
+            while waiters:
+                if waiters[0].done():
+                    # 已超时或被取消的等待者
+                    waiters.popleft()
+                    continue
+                if not self._can_start(priority):
+                    break
+                self._running[priority] += 1
+                waiters.popleft().set_result(None)
+
+    @property
+    def running(self) -> Dict[str, int]:
+        """各优先级类别正在执行的工作单元数量"""
+        return dict(self._running)
+
+    @property
+    def queued(self) -> Dict[str, int]:
+        """各优先级类别等待中的工作单元数量"""
+        return {priority: self._pending(priority) for priority in self._waiters}
+
+    async def acquire(self, priority: str, timeout: Optional[float] = None) -> None:
+        """
+        申请一个槽位，与 release 成对调用。
+
+        参数：
+            priority: 优先级类别，QUERY 或 INGEST
+            timeout: 可选的最长等待秒数，超时抛出 asyncio.TimeoutError
+
+        异常：
+            SchedulerOverloaded: 该类别的等待队列已满
+        """
+        self._check_priority(priority)
+        if not self._pending(priority) and self._can_start(priority):
+            self._running[priority] += 1
+            self.metrics.observe("scheduler_wait_seconds", 0.0, stage=priority)
+            return
+        limit = self.max_queue[priority]
+        if limit is not None and self._pending(priority) >= limit:
+            self.metrics.incr("rejected", stage=priority)
+            raise SchedulerOverloaded(f"{priority} 等待队列已满（{limit}）")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        start = time.perf_counter()
+        try:
+            if timeout is None:
+                await waiter
+            else:
+                await asyncio.wait_for(waiter, timeout)
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # 已分配到槽位但调用方被取消，归还槽位
+                self.release(priority)
+            else:
+                waiter.cancel()
+                self._dispatch()
+            raise
+        self.metrics.observe("scheduler_wait_seconds", time.perf_counter() - start, stage=priority)
+
+    def release(self, priority: str) -> None:
+        """
+        释放一个槽位并唤醒等待者。
+
+        参数：
+            priority: 申请槽位时的优先级类别
+        """
+        self._running[priority] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: str, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        占用一个槽位的上下文管理器。
+
+        参数：
+            priority: 优先级类别，QUERY 或 INGEST
+            timeout: 可选的最长等待秒数
+        """
+        await self.acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            self.release(priority)
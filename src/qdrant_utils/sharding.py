@@ -0,0 +1,161 @@
+"""
+集群拓扑模块：集合的分片、副本与写一致性配置，以及按分片键分组写入。
+"""
+from typing import Any, Dict, List, Optional, Sequence, Union
+from qdrant_client.http import models as rest
+
+ShardKey = Union[int, str]
+
+
+class CollectionProfile:
+    """
+    集合的集群拓扑配置。
+
+    创建集合时传入，设置分片数量、副本数量和写一致性。使用自定义分片（sharding_method="custom"）时，
+    数据按分片键放置：创建集合后自动创建 shard_keys 中的分片键，写入时从载荷的 shard_key_field 字段
+    取得每个点的分片键，同一分片键的点合并为一个请求，不同分片键的请求并发发送。
+    """
+
+    def __init__(
+        self,
+        shard_number: Optional[int] = None,
+        replication_factor: Optional[int] = None,
+        write_consistency_factor: Optional[int] = None,
+        sharding_method: Optional[str] = None,
+        shard_keys: Optional[Sequence[ShardKey]] = None,
+        shard_key_field: Optional[str] = None,
+        on_disk_payload: Optional[bool] = None
+    ):
+        """
+        初始化拓扑配置。
+
+        参数：
+            shard_number: 分片数量，自定义分片时为每个分片键的分片数量，默认由服务端决定
+            replication_factor: 每个分片的副本数量
+            write_consistency_factor: 写入需要确认的副本数量，不能大于 replication_factor
+            sharding_method: 分片方式，"auto"（按点ID哈希）或 "custom"（按分片键），默认 auto
+            shard_keys: 自定义分片时创建集合后要创建的分片键
+            shard_key_field: 写入时从载荷中读取分片键的字段
+            on_disk_payload: 载荷是否存放在磁盘上
+        """
+        if replication_factor is not None and write_consistency_factor is not None \
+                and write_consistency_factor > replication_factor:
+            raise ValueError("write_consistency_factor 不能大于 replication_factor")
+        self.shard_number = shard_number
+        self.replication_factor = replication_factor
+        self.write_consistency_factor = write_consistency_factor
+        self.sharding_method = rest.ShardingMethod(sharding_method) if sharding_method else None
+        self.shard_keys = list(shard_keys or [])
+        self.shard_key_field = shard_key_field
+        self.on_disk_payload = on_disk_payload
+        if self.shard_keys and self.sharding_method != rest.ShardingMethod.CUSTOM:
+            raise ValueError("shard_keys 需要 sharding_method=\"custom\"")
+
+    @classmethod
+    def for_cluster(
+        cls,
+        num_nodes: int,
+        replication_factor: int = 2,
+        shards_per_node: int = 2,
+        write_consistency_factor: int = 1
+    ) -> "CollectionProfile":
+        """
+        按节点数量生成自动分片配置。
+
+        分片数量取节点数量的整数倍，扩容时可以把分片迁移到新节点而不必重新分片。
+
+        参数：
+            num_nodes: 集群节点数量
+            replication_factor: 每个分片的副本数量，不超过节点数量
+            shards_per_node: 每个节点承载的分片数量
+            write_consistency_factor: 写入需要确认的副本数量
+
+        返回：
+            CollectionProfile: 拓扑配置
+        """
+        replication_factor = max(1, min(replication_factor, num_nodes))
+        return cls(
+            shard_number=num_nodes * shards_per_node,
+            replication_factor=replication_factor,
+            write_consistency_factor=min(write_consistency_factor, replication_factor)
+        )
+
+    def collection_kwargs(self) -> Dict[str, Any]:
+        """
+        返回 create_collection 的拓扑参数，未设置的参数不出现。
+
+        返回：
+            Dict: 关键字参数
+        """
+        kwargs = {
+            "shard_number": self.shard_number,
+            "replication_factor": self.replication_factor,
+            "write_consistency_factor": self.write_consistency_factor,
+            "sharding_method": self.sharding_method,
+            "on_disk_payload": self.on_disk_payload
+        }
+        return {key: value for key, value in kwargs.items() if value is not None}
+
+    def shard_key_for(self, payload: Optional[Dict[str, Any]]) -> Optional[ShardKey]:
+        """
+        从载荷中取得点的分片键。
+
+        参数：
+            payload: 点的载荷
+
+        返回：
+            分片键，未设置 shard_key_field 或载荷中没有该字段时返回None
+        """
+        if self.shard_key_field is None or not payload:
+            return None
+        return payload.get(self.shard_key_field)
+
+    def assign_shard_keys(self, points: List[Dict]) -> List[Dict]:
+        """
+        根据载荷为点数据设置 shard_key 字段，载荷中没有分片键的点保持不变。
+
+        参数：
+            points: 点数据列表
+
+        返回：
+            List[Dict]: 原点数据列表
+        """
+        if self.shard_key_field is None:
+            return points
+        for point in points:
+            shard_key = self.shard_key_for(point.get("payload"))
+            if shard_key is not None:
+                point["shard_key"] = shard_key
+        return points
+
+
+def group_by_shard_key(points: List[Dict]) -> Dict[Optional[ShardKey], List[Dict]]:
+    """
+    按点数据中的 shard_key 字段分组，保持组内顺序。
+
+    参数：
+        points: 点数据列表，可包含 shard_key 字段
+
+    返回：
+        Dict: 分片键到点数据列表的映射，没有分片键的点归入 None
+    """
+    groups: Dict[Optional[ShardKey], List[Dict]] = {}
+    for point in points:
+        groups.setdefault(point.get("shard_key"), []).append(point)
+    return groups
+
+
+def shard_key_selector(shard_keys: Optional[Union[ShardKey, Sequence[ShardKey]]]) -> Optional[Any]:
+    """
+    将一个或多个分片键转换为请求中的分片键选择器。
+
+    参数：
+        shard_keys: 分片键或分片键列表
+
+    返回：
+        分片键选择器，未指定时返回None（查询全部分片）
+    """
+    if shard_keys is None or isinstance(shard_keys, (int, str)):
+        return shard_keys
+    shard_keys = list(shard_keys)
+    return shard_keys or None
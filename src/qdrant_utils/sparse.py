@@ -0,0 +1,165 @@
+"""
+稀疏向量模块，用于关键词（BM25）检索以及与稠密向量的混合检索。
+"""
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Callable, List, Dict, Any, Optional, Union
+import hashlib
+import re
+from qdrant_client.http import models as rest
+from .dedup import normalize_text
+
+# 集合中稀疏向量的名称，稠密向量仍使用默认的未命名向量
+SPARSE_VECTOR_NAME = "sparse"
+
+# 中日韩统一表意文字、假名与谚文
+_CJK_PATTERN = r"぀-ヿ㐀-䶿一-鿿가-힯豈-﫿"
+_TOKEN_RE = re.compile(rf"[{_CJK_PATTERN}]+|[^\W{_CJK_PATTERN}]+")
+_CJK_RE = re.compile(rf"[{_CJK_PATTERN}]")
+
+# 稀疏向量格式：{"indices": [...], "values": [...]}，可以直接写入 JSON
+SparseVectorDict = Dict[str, List[Union[int, float]]]
+
+
+def analyze(text: str) -> List[str]:
+    """
+    默认分词器。
+
+    文本先做 NFKC 规范化与小写转换，拉丁字母与数字按单词切分，中日韩文字切分为
+    单字和相邻两字，不依赖分词词典也能匹配词语。
+
+    参数：
+        text: 文本
+
+    返回：
+        List[str]: 词项列表
+    """
+    terms = []
+    for token in _TOKEN_RE.findall(normalize_text(text)):
+        if _CJK_RE.match(token):
+            terms.extend(token)
+            terms.extend(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            terms.append(token)
+    return terms
+
+
+def term_index(term: str) -> int:
+    """
+    将词项映射为稀疏向量下标（32 位无符号整数），跨进程稳定。
+
+    参数：
+        term: 词项
+
+    返回：
+        int: 稀疏向量下标
+    """
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def to_vector_struct(vector: Any) -> Any:
+    """
+    将点数据中的向量转换为 PointStruct 接受的格式。
+
+    命名向量字典中形如 {"indices": [...], "values": [...]} 的值转换为 SparseVector，
+    其他格式原样返回。
+
+    参数：
+        vector: 稠密向量，或 {向量名称: 向量} 字典
+
+    返回：
+        PointStruct 的 vector 参数
+    """
+    if not isinstance(vector, dict):
+        return vector
+    return {
+        name: rest.SparseVector(**value) if isinstance(value, dict) else value
+        for name, value in vector.items()
+    }
+
+
+class SparseEncoder(ABC):
+    """稀疏向量编码器基类"""
+
+    @abstractmethod
+    def encode_documents(self, texts: List[str]) -> List[SparseVectorDict]:
+        """
+        生成文档的稀疏向量。
+
+        参数：
+            texts: 文本列表
+
+        返回：
+            List[Dict]: 稀疏向量列表
+        """
+        pass
+
+    @abstractmethod
+    def encode_queries(self, texts: List[str]) -> List[SparseVectorDict]:
+        """
+        生成查询的稀疏向量。
+
+        参数：
+            texts: 查询文本列表
+
+        返回：
+            List[Dict]: 稀疏向量列表
+        """
+        pass
+
+
+class BM25SparseEncoder(SparseEncoder):
+    """
+    本地 BM25 稀疏向量编码器。
+
+    文档向量保存每个词项经 BM25 饱和与长度归一化后的词频，查询向量中每个词项的权重为 1；
+    IDF 由 Qdrant 按集合统计（集合需以 IDF 修饰符创建），两者点积即为 BM25 得分。
+    语料统计只由服务端维护，编码器无状态，可以在多个进程中并行使用。
+    """
+
+    def __init__(
+        self,
+        tokenizer: Optional[Callable[[str], List[str]]] = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+        avg_doc_len: float = 32.0
+    ):
+        """
+        初始化编码器。
+
+        参数：
+            tokenizer: 分词函数，输入文本返回词项列表（如 jieba.lcut），默认使用 analyze
+            k1: 词频饱和参数
+            b: 文档长度归一化参数
+            avg_doc_len: 语料的平均文档长度（词项数），用于长度归一化
+        """
+        self.tokenizer = tokenizer or analyze
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_len = avg_doc_len
+
+    def _counts(self, text: str) -> Dict[int, int]:
+        counts: Dict[int, int] = Counter()
+        for term in self.tokenizer(text):
+            counts[term_index(term)] += 1
+        return counts
+
+    def encode_documents(self, texts: List[str]) -> List[SparseVectorDict]:
+        vectors = []
+        for text in texts:
+            counts = self._counts(text)
+            length = sum(counts.values())
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_doc_len)
+            indices = sorted(counts)
+            vectors.append({
+                "indices": indices,
+                "values": [counts[i] * (self.k1 + 1) / (counts[i] + norm) for i in indices]
+            })
+        return vectors
+
+    def encode_queries(self, texts: List[str]) -> List[SparseVectorDict]:
+        vectors = []
+        for text in texts:
+            indices = sorted(self._counts(text))
+            vectors.append({"indices": indices, "values": [1.0] * len(indices)})
+        return vectors
@@ -0,0 +1,108 @@
+"""
+单元测试共用的测试向量模型。
+"""
+from abc import abstractmethod
+import threading
+import zlib
+import numpy as np
+from src.qdrant_utils.embeddings import TextEmbedding, postprocess_vectors
+
+class FakeEmbedding(TextEmbedding):
+    """
+    测试模型基类，记录调用次数（calls）、每次的批次大小（batches）和向量化过的文本（seen），
+    子类实现 vector 生成单个文本的向量
+    """
+
+    dim = 4
+
+    def __init__(self):
+        self.calls = 0
+        self.batches = []
+        self.seen = []
+        self._lock = threading.Lock()
+
+    @property
+    def vector_size(self) -> int:
+        return self.dim
+
+    @abstractmethod
+    def vector(self, text):
+        """生成单个文本的向量"""
+
+    def generate_vector(self, texts):
+        with self._lock:
+            self.calls += 1
+            self.batches.append(len(texts))
+            self.seen.extend(texts)
+        return [self.vector(text) for text in texts]
+
+class FirstCharEmbedding(FakeEmbedding):
+    """按首字符生成向量的测试模型，首字符相同的文本向量相同"""
+
+    def vector(self, text):
+        vector = np.full(4, 0.1, dtype=np.float32)
+        vector[ord(text[0]) % 4] = 1.0
+        return vector
+
+class LengthEmbedding(FakeEmbedding):
+    """按文本长度生成向量的测试模型"""
+
+    def __init__(self, dim=4):
+        super().__init__()
+        self.dim = dim
+
+    def vector(self, text):
+        return np.array([1.0, len(text), 0.5, 0.1][:self.dim], dtype=np.float32)
+
+class HashEmbedding(FakeEmbedding):
+    """按文本的 CRC32 生成归一化随机向量的测试模型，结果在不同进程间保持一致"""
+
+    dim = 8
+
+    def vector(self, text):
+        vector = np.random.default_rng(zlib.crc32(text.encode())).standard_normal(self.dim).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+class QuantizedEmbedding(HashEmbedding):
+    """与 HashEmbedding 向量相同、按 uint8 输出的测试模型"""
+
+    dim = 64
+
+    @property
+    def datatype(self) -> str:
+        return "uint8"
+
+    def float_vector(self, text):
+        """返回量化前的浮点向量"""
+        return super().vector(text)
+
+    def vector(self, text):
+        return postprocess_vectors(self.float_vector(text)[None, :], datatype="uint8")[0]
+
+class CharCountEmbedding(FakeEmbedding):
+    """按字符统计生成归一化向量的测试模型"""
+
+    dim = 16
+
+    def vector(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for char in text:
+            vector[ord(char) % self.dim] += 1.0
+        return vector / max(np.linalg.norm(vector), 1e-12)
+
+class ConstantEmbedding(FakeEmbedding):
+    """所有文本向量相同的测试模型，稠密检索无法区分文本"""
+
+    def vector(self, text):
+        return np.array([1.0, 0.5, 0.25, 0.1], dtype=np.float32)
+
+class TableEmbedding(FakeEmbedding):
+    """按给定的文本到向量映射返回向量的测试模型"""
+
+    def __init__(self, table):
+        super().__init__()
+        self.table = table
+        self.dim = len(next(iter(table.values())))
+
+    def vector(self, text):
+        return np.asarray(self.table[text], dtype=np.float32)
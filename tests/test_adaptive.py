@@ -0,0 +1,88 @@
+"""
+自适应批次大小的单元测试。
+"""
+import unittest
+import asyncio
+from unittest import mock
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from src.qdrant_utils.adaptive import AdaptiveBatchSizer, current_rss_mb
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from tests.fakes import LengthEmbedding
+
+class TestAdaptiveBatchSizer(unittest.TestCase):
+    """测试批次大小控制器"""
+
+    def test_increase(self):
+        """测试延迟低于目标时增大批次"""
+        sizer = AdaptiveBatchSizer(initial=8, max_size=20, target_latency=1.0, increase_step=4)
+        sizer.record(8, 0.1)
+        self.assertEqual(sizer.size, 12)
+        for _ in range(10):
+            sizer.record(sizer.size, 0.1)
+        self.assertEqual(sizer.size, 20)
+
+    def test_decrease(self):
+        """测试延迟超过目标或失败时减小批次"""
+        sizer = AdaptiveBatchSizer(initial=32, min_size=4, target_latency=1.0)
+        sizer.record(32, 5.0)
+        self.assertEqual(sizer.size, 16)
+        sizer.record(16, 0.1, success=False)
+        self.assertEqual(sizer.size, 8)
+        for _ in range(5):
+            sizer.record(sizer.size, 0.1, success=False)
+        self.assertEqual(sizer.size, 4)
+
+    def test_memory_limit(self):
+        """测试常驻内存超过上限时减小批次"""
+        sizer = AdaptiveBatchSizer(initial=32, max_rss_mb=100)
+        with mock.patch("src.qdrant_utils.adaptive.current_rss_mb", return_value=200.0):
+            sizer.record(32, 0.01)
+        self.assertEqual(sizer.size, 16)
+        self.assertIsNotNone(current_rss_mb())
+
+    def test_invalid_range(self):
+        """测试无效参数"""
+        with self.assertRaises(ValueError):
+            AdaptiveBatchSizer(min_size=10, max_size=5)
+
+    def test_indexer(self):
+        """测试索引管理器按控制器大小向量化和上传"""
+        client = QdrantClient(":memory:")
+        model = LengthEmbedding()
+        embed_batch = AdaptiveBatchSizer(initial=4, max_size=16, target_latency=10.0, increase_step=4)
+        upsert_batch = AdaptiveBatchSizer(initial=5, max_size=5)
+        indexer = TextIndexer(
+            model, QdrantOperations(client), "test_adaptive",
+            embed_batch=embed_batch, upsert_batch=upsert_batch
+        )
+        indexer.create_index()
+        texts = [f"标题{i}" for i in range(30)] + ["标题0"] * 5
+        self.assertTrue(indexer.add_texts(texts))
+        # 下一个微批次在当前微批次前向计算前已提交分词，控制器的调整晚一个微批次生效
+        self.assertEqual(model.batches, [4, 4, 8, 12, 2])
+        self.assertEqual(client.count("test_adaptive").count, 35)
+
+    def test_async_indexer(self):
+        """测试异步索引管理器按控制器大小上传"""
+        async def run_test():
+            client = AsyncQdrantClient(":memory:")
+            model = LengthEmbedding()
+            upsert_batch = AdaptiveBatchSizer(initial=3, max_size=6, target_latency=10.0, increase_step=3)
+            indexer = AsyncTextIndexer(
+                model, AsyncQdrantOperations(client), "test_adaptive",
+                embed_batch=AdaptiveBatchSizer(initial=10), upsert_batch=upsert_batch
+            )
+            await indexer.create_index()
+            texts = [f"标题{i}" for i in range(20)]
+            self.assertTrue(await indexer.add_texts_batch(texts))
+            self.assertEqual(upsert_batch.size, 6)
+            self.assertEqual((await client.count("test_adaptive")).count, 20)
+
+        asyncio.run(run_test())
+
+if __name__ == '__main__':
+    unittest.main()
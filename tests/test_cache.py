@@ -0,0 +1,154 @@
+"""
+搜索结果缓存的单元测试。
+"""
+import unittest
+import asyncio
+import threading
+import time
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from qdrant_client.models import Filter, FieldCondition, MatchValue
+from src.qdrant_utils.cache import SearchResultCache
+from src.qdrant_utils.metrics import InMemoryMetrics
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+
+def make_points(start, count):
+    """构造测试点数据"""
+    return [
+        {"id": i, "vector": [1.0, float(i), 0.5], "payload": {"title": f"标题{i}", "even": i % 2 == 0}}
+        for i in range(start, start + count)
+    ]
+
+class FakeClock:
+    """可手动推进的时钟"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestSearchResultCache(unittest.TestCase):
+    """测试搜索结果缓存"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.metrics = InMemoryMetrics()
+        self.clock = FakeClock()
+        self.cache = SearchResultCache(max_entries=3, ttl=10.0, metrics=self.metrics, clock=self.clock)
+        self.ops = QdrantOperations(QdrantClient(":memory:"), result_cache=self.cache)
+        self.ops.create_collection("titles", vector_size=3)
+        self.ops.upsert_points_batch("titles", make_points(0, 5))
+        self.calls = 0
+        search = self.ops.client.search
+
+        def counting_search(*args, **kwargs):
+            self.calls += 1
+            return search(*args, **kwargs)
+
+        self.ops.client.search = counting_search
+
+    def test_hit_and_key(self):
+        """测试命中与缓存键"""
+        first = self.ops.query_points("titles", [1.0, 2.0, 0.5], limit=3)
+        second = self.ops.query_points("titles", [1.0, 2.00001, 0.5], limit=3)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual([p.id for p in first], [p.id for p in second])
+        self.assertEqual(self.metrics.counter("cache_hits", stage="search"), 1)
+
+        self.ops.query_points("titles", [1.0, 2.0, 0.5], limit=4)
+        even = Filter(must=[FieldCondition(key="even", match=MatchValue(value=True))])
+        self.ops.query_points("titles", [1.0, 2.0, 0.5], limit=3, query_filter=even)
+        self.assertEqual(self.calls, 3)
+
+    def test_invalidation_after_write(self):
+        """测试写入后缓存失效"""
+        self.assertEqual(len(self.ops.query_points("titles", [1.0, 2.0, 0.5], limit=10)), 5)
+        self.ops.upsert_points_batch("titles", make_points(5, 2))
+        self.assertEqual(len(self.ops.query_points("titles", [1.0, 2.0, 0.5], limit=10)), 7)
+        self.assertEqual(self.calls, 2)
+
+    def test_ttl_and_capacity(self):
+        """测试过期时间与容量上限"""
+        self.ops.query_points("titles", [1.0, 2.0, 0.5])
+        self.clock.now = 11.0
+        self.ops.query_points("titles", [1.0, 2.0, 0.5])
+        self.assertEqual(self.calls, 2)
+        for i in range(5):
+            self.ops.query_points("titles", [1.0, float(i), 0.0])
+        self.assertEqual(len(self.cache), 3)
+
+    def test_write_during_fetch(self):
+        """测试请求期间发生写入时结果不写入缓存"""
+        key = self.cache.make_key("titles", [1.0], 10, None)
+
+        def fetch():
+            self.cache.invalidate("titles")
+            return ["old"]
+
+        self.assertEqual(self.cache.get_or_fetch(key, fetch), ["old"])
+        self.assertEqual(len(self.cache), 0)
+
+    def test_coalescing(self):
+        """测试并发的相同请求只发起一次"""
+        key = self.cache.make_key("titles", [1.0], 10, None)
+        calls = []
+        results = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.2)
+            return [len(calls)]
+
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.get_or_fetch(key, fetch)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [[1]] * 8)
+        self.assertEqual(self.metrics.counter("cache_coalesced", stage="search"), 7)
+
+    def test_errors_not_cached(self):
+        """测试失败的请求不写入缓存"""
+        key = self.cache.make_key("titles", [1.0], 10, None)
+
+        def fail():
+            raise RuntimeError("unavailable")
+
+        with self.assertRaises(RuntimeError):
+            self.cache.get_or_fetch(key, fail)
+        self.assertEqual(self.cache.get_or_fetch(key, lambda: [1]), [1])
+
+    def test_async(self):
+        """测试异步缓存与请求合并"""
+        async def run_test():
+            cache = SearchResultCache()
+            ops = AsyncQdrantOperations(AsyncQdrantClient(":memory:"), result_cache=cache)
+            await ops.create_collection("titles", vector_size=3)
+            await ops.upsert_points_batch("titles", make_points(0, 5))
+            calls = []
+            query_points = ops.client.query_points
+
+            async def slow_query_points(*args, **kwargs):
+                calls.append(1)
+                await asyncio.sleep(0.05)
+                return await query_points(*args, **kwargs)
+
+            ops.client.query_points = slow_query_points
+            results = await asyncio.gather(*[ops.query_points("titles", [1.0, 2.0, 0.5]) for _ in range(5)])
+            self.assertEqual(len(calls), 1)
+            self.assertTrue(all(len(r) == 5 for r in results))
+
+            await ops.upsert_points_batch("titles", make_points(5, 1))
+            self.assertEqual(len(await ops.query_points("titles", [1.0, 2.0, 0.5])), 6)
+            self.assertEqual(len(calls), 2)
+
+        asyncio.run(run_test())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+"""
+长文档切分模块的单元测试。
+"""
+import unittest
+import asyncio
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from src.qdrant_utils.chunking import TextChunker, chunk_point_id
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from src.qdrant_utils.metrics import InMemoryMetrics
+from tests.fakes import CharCountEmbedding
+
+class FailingOps(QdrantOperations):
+    """记录每次上传的点数，第 fail_at 次上传失败的操作类"""
+
+    def __init__(self, client, fail_at=None):
+        super().__init__(client)
+        self.fail_at = fail_at
+        self.uploads = []
+
+    def upsert_points_batch(self, collection_name, points):
+        self.uploads.append(len(points))
+        if len(self.uploads) == self.fail_at:
+            return False
+        return super().upsert_points_batch(collection_name, points)
+
+class SlowAsyncOps(AsyncQdrantOperations):
+    """上传前等待 delay 秒并记录被取消次数的异步操作类"""
+
+    def __init__(self, client, delay=0.0):
+        super().__init__(client)
+        self.delay = delay
+        self.uploads = []
+        self.cancelled = 0
+
+    async def upsert_points_batch(self, collection_name, points):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        self.uploads.append(len(points))
+        return await super().upsert_points_batch(collection_name, points)
+
+class BrokenEmbedding(CharCountEmbedding):
+    """第 fail_at 次向量化时抛出异常的测试模型"""
+
+    def __init__(self, fail_at):
+        super().__init__()
+        self.fail_at = fail_at
+
+    def generate_vector(self, texts):
+        if self.calls + 1 == self.fail_at:
+            raise RuntimeError("模型推理失败")
+        return super().generate_vector(texts)
+
+class TestChunking(unittest.TestCase):
+    """测试长文档切分"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.documents = [
+            "修仙" * 30,
+            "都市" * 30,
+            "短文"
+        ]
+
+    def test_split(self):
+        """测试滑动窗口切分"""
+        chunker = TextChunker(chunk_size=4, overlap=1)
+        self.assertEqual(chunker.split("abcdefghij"), ["abcd", "defg", "ghij"])
+        self.assertEqual(chunker.split("abc"), ["abc"])
+
+    def test_invalid_overlap(self):
+        """测试非法参数"""
+        with self.assertRaises(ValueError):
+            TextChunker(chunk_size=4, overlap=4)
+
+    def test_chunk_point_id(self):
+        """测试片段ID稳定且互不相同"""
+        self.assertEqual(chunk_point_id(1, 0), chunk_point_id(1, 0))
+        self.assertNotEqual(chunk_point_id(1, 0), chunk_point_id(1, 1))
+        self.assertNotEqual(chunk_point_id(1, 0), chunk_point_id("1-0", 0))
+
+    def test_generate_vector_batched(self):
+        """测试分批向量化保持原始顺序"""
+        model = CharCountEmbedding()
+        texts = ["aaaa", "b", "ccc", "dd", "e"]
+        vectors = model.generate_vector_batched(texts, batch_size=2)
+        self.assertEqual(model.batches, [2, 2, 1])
+        for text, vector in zip(texts, vectors):
+            np.testing.assert_array_equal(vector, model.generate_vector([text])[0])
+
+    def test_indexer_documents(self):
+        """测试文档写入与按文档聚合的搜索"""
+        model = CharCountEmbedding()
+        indexer = TextIndexer(
+            model,
+            QdrantOperations(QdrantClient(":memory:")),
+            "test_chunking",
+            chunk_size=8,
+            chunk_overlap=2
+        )
+        indexer.create_index()
+        self.assertTrue(indexer.add_documents(self.documents, doc_ids=[10, 20, 30], batch_size=4))
+
+        results = indexer.search_documents("修仙", limit=3, group_size=2)
+        self.assertEqual(results[0]["parent_id"], 10)
+        self.assertEqual(len({r["parent_id"] for r in results}), len(results))
+        self.assertLessEqual(len(results[0]["hits"]), 2)
+        self.assertIn("chunk_index", results[0]["hits"][0]["payload"])
+
+    def test_documents_written_per_batch(self):
+        """测试片段按批次向量化并写入，某批次失败时其余批次照常写入"""
+        client = QdrantClient(":memory:")
+        metrics = InMemoryMetrics()
+        ops = FailingOps(client, fail_at=2)
+        indexer = TextIndexer(
+            CharCountEmbedding(), ops, "test_chunking", dedup=False, chunk_size=8, chunk_overlap=2, metrics=metrics
+        )
+        indexer.create_index()
+        documents = ["修仙都市" * 5, "都市修仙" * 5, "短文"]
+        num_chunks = sum(len(indexer.chunker.split(document)) for document in documents)
+        self.assertFalse(indexer.add_documents(documents, doc_ids=[10, 20, 30], batch_size=2))
+        self.assertEqual(indexer.embedding_model.batches, ops.uploads)
+        self.assertTrue(all(size <= 2 for size in ops.uploads))
+        self.assertEqual(sum(ops.uploads), num_chunks)
+        self.assertEqual(client.count("test_chunking").count, num_chunks - ops.uploads[1])
+        self.assertEqual(metrics.counter("errors", stage="add_documents"), 1)
+
+    def test_async_indexer_documents(self):
+        """测试异步文档写入与搜索"""
+        async def run_test():
+            model = CharCountEmbedding()
+            indexer = AsyncTextIndexer(
+                model,
+                AsyncQdrantOperations(AsyncQdrantClient(":memory:")),
+                "test_chunking",
+                chunk_size=8,
+                chunk_overlap=2
+            )
+            await indexer.create_index()
+            self.assertTrue(await indexer.add_documents_batch(self.documents, doc_ids=[10, 20, 30], batch_size=4))
+
+            results = await indexer.search_documents("都市", limit=2)
+            self.assertEqual(results[0]["parent_id"], 20)
+            self.assertEqual(len(results[0]["hits"]), 1)
+
+        asyncio.run(run_test())
+
+    def test_async_documents_per_batch(self):
+        """测试异步文档写入逐批切分上传，异常时取消进行中的上传"""
+        async def run_test():
+            client = AsyncQdrantClient(":memory:")
+            documents = ["修仙都市" * 5, "都市修仙" * 5, "短文"]
+            ops = SlowAsyncOps(client)
+            indexer = AsyncTextIndexer(
+                CharCountEmbedding(), ops, "test_chunking", dedup=False, chunk_size=8, chunk_overlap=2
+            )
+            await indexer.create_index()
+            num_chunks = sum(len(indexer.chunker.split(document)) for document in documents)
+            self.assertTrue(await indexer.add_documents_batch(documents, doc_ids=[10, 20, 30], batch_size=2))
+            self.assertEqual(indexer.embedding_model.batches, ops.uploads)
+            self.assertEqual(sum(ops.uploads), num_chunks)
+
+            ops = SlowAsyncOps(client, delay=1.0)
+            indexer = AsyncTextIndexer(
+                BrokenEmbedding(fail_at=2), ops, "test_chunking", dedup=False, chunk_size=8, chunk_overlap=2
+            )
+            self.assertFalse(await indexer.add_documents_batch(documents, doc_ids=[10, 20, 30], batch_size=2))
+            await asyncio.sleep(0)
+            self.assertEqual(ops.cancelled, 1)
+            self.assertEqual(ops.uploads, [])
+
+        asyncio.run(run_test())
+
+if __name__ == '__main__':
+    unittest.main()
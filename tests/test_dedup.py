@@ -0,0 +1,76 @@
+"""
+文本去重模块的单元测试。
+"""
+import unittest
+import asyncio
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from src.qdrant_utils.dedup import normalize_text, deduplicate_texts
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from tests.fakes import HashEmbedding
+
+class TestDedup(unittest.TestCase):
+    """测试文本去重"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.texts = [
+            "重生之都市修仙",
+            "重生之都市修仙 ",
+            "修真聊天群",
+            "ＡＢＣ  小说",
+            "abc 小说"
+        ]
+
+    def test_normalize_text(self):
+        """测试文本规范化"""
+        self.assertEqual(normalize_text("  ＡＢＣ\t小说 "), "abc 小说")
+
+    def test_deduplicate_texts(self):
+        """测试去重与分发"""
+        result = deduplicate_texts(self.texts)
+        self.assertEqual(result.unique_texts, ["重生之都市修仙", "修真聊天群", "ＡＢＣ  小说"])
+        self.assertEqual(result.inverse, [0, 0, 1, 2, 2])
+        self.assertAlmostEqual(result.ratio, 0.4)
+        self.assertEqual(result.scatter(["a", "b", "c"]), ["a", "a", "b", "c", "c"])
+
+    def test_indexer_dedup(self):
+        """测试索引管理器的去重"""
+        model = HashEmbedding()
+        indexer = TextIndexer(model, QdrantOperations(QdrantClient(":memory:")), "test_dedup")
+        indexer.create_index()
+        self.assertTrue(indexer.add_texts(self.texts))
+        self.assertEqual(len(model.seen), 3)
+        self.assertAlmostEqual(indexer.last_dedup_ratio, 0.4)
+
+        model.seen.clear()
+        results = indexer.search_batch(["修真聊天群", "修真聊天群"], limit=2, score_threshold=-1.0)
+        self.assertEqual(model.seen, ["修真聊天群"])
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0], results[1])
+        self.assertIsNot(results[0], results[1])
+
+    def test_async_indexer_dedup(self):
+        """测试异步索引管理器的去重"""
+        async def run_test():
+            model = HashEmbedding()
+            ops = AsyncQdrantOperations(AsyncQdrantClient(":memory:"))
+            indexer = AsyncTextIndexer(model, ops, "test_dedup")
+            await indexer.create_index()
+            self.assertTrue(await indexer.add_texts_batch(self.texts, batch_size=2))
+            self.assertEqual(len(model.seen), 3)
+
+            model.seen.clear()
+            results = await indexer.search_batch(["修真聊天群", "修真聊天群 ", "斗破苍穹"], limit=2, score_threshold=-1.0)
+            self.assertEqual(model.seen, ["修真聊天群", "斗破苍穹"])
+            self.assertEqual(len(results), 3)
+            self.assertEqual(results[0], results[1])
+            self.assertEqual(len(results[0]), 2)
+
+        asyncio.run(run_test())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+外部文档存储的单元测试。
+"""
+import unittest
+import asyncio
+import os
+import tempfile
+import threading
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from src.qdrant_utils.docstore import SQLiteDocumentStore
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from src.qdrant_utils.migration import EmbeddingMigration
+from tests.fakes import FirstCharEmbedding
+
+class CountingStore(SQLiteDocumentStore):
+    """记录批量读取次数的文档存储"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.reads = 0
+
+    def get_many(self, ids):
+        self.reads += 1
+        return super().get_many(ids)
+
+class TestDocumentStore(unittest.TestCase):
+    """测试外部文档存储"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "docs.db")
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmpdir.cleanup()
+
+    def test_store(self):
+        """测试读写、ID类型与持久化"""
+        store = SQLiteDocumentStore(self.path)
+        ids = list(range(1200)) + ["1", "e1b4c0f2-0000-4000-8000-000000000000"]
+        store.put_many(ids, [f"文本{i}" for i in ids])
+        store.put_many([0], ["覆盖"])
+        texts = store.get_many([0, 1, "1", 5000])
+        self.assertEqual(texts, {0: "覆盖", 1: "文本1", "1": "文本1"})
+        self.assertEqual(len(store.get_many(range(1200))), 1200)
+        store.delete_many(range(1000))
+        store.close()
+
+        reopened = SQLiteDocumentStore(self.path)
+        self.assertEqual(len(reopened), 202)
+        reopened.close()
+
+    def test_concurrent_access(self):
+        """测试多线程并发读写"""
+        store = SQLiteDocumentStore(":memory:")
+        errors = []
+
+        def worker(start):
+            try:
+                ids = list(range(start, start + 50))
+                store.put_many(ids, [str(i) for i in ids])
+                assert len(store.get_many(ids)) == 50
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(i * 50,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(store), 400)
+
+    def test_indexer(self):
+        """测试载荷中不保存全文，搜索结果批量补全"""
+        store = CountingStore(":memory:")
+        ops = QdrantOperations(QdrantClient(":memory:"))
+        indexer = TextIndexer(FirstCharEmbedding(), ops, "titles", doc_store=store)
+        indexer.create_index()
+        self.assertTrue(indexer.add_texts(["斗破苍穹", "遮天", "凡人修仙传"], payloads=[{"year": 2009}, {}, {}]))
+        record = ops.client.retrieve("titles", ids=[0], with_payload=True)[0]
+        self.assertEqual(record.payload, {"year": 2009})
+
+        results = indexer.search("斗破", limit=1, score_threshold=-1.0)
+        self.assertEqual(results[0]["payload"], {"year": 2009, "title": "斗破苍穹"})
+
+        store.reads = 0
+        batch = indexer.search_batch(["斗破", "遮天", "凡人"], limit=3, score_threshold=-1.0)
+        self.assertEqual(store.reads, 1)
+        self.assertTrue(all("title" in hit["payload"] for hits in batch for hit in hits))
+
+        hits = indexer.search_by_vector(FirstCharEmbedding().generate_vector(["遮"])[0], limit=1)
+        self.assertEqual(hits[0]["payload"]["title"], "遮天")
+
+    def test_migration(self):
+        """测试迁移时从文档存储读取文本"""
+        store = SQLiteDocumentStore(":memory:")
+        ops = QdrantOperations(QdrantClient(":memory:"))
+        indexer = TextIndexer(FirstCharEmbedding(), ops, "titles", doc_store=store)
+        indexer.create_index()
+        indexer.add_texts(["斗破苍穹", "遮天"])
+        migration = EmbeddingMigration(FirstCharEmbedding(), ops, "titles", "titles_v2", doc_store=store)
+        self.assertTrue(migration.run())
+        self.assertEqual(ops.client.count("titles_v2").count, 2)
+
+    def test_async_indexer(self):
+        """测试异步索引管理器"""
+        async def run_test():
+            store = CountingStore(":memory:")
+            indexer = AsyncTextIndexer(
+                FirstCharEmbedding(), AsyncQdrantOperations(AsyncQdrantClient(":memory:")), "titles", doc_store=store
+            )
+            await indexer.create_index()
+            self.assertTrue(await indexer.add_texts_batch(["斗破苍穹", "遮天"], batch_size=1))
+            self.assertEqual(len(store), 2)
+            results = await indexer.search("遮天", limit=1, score_threshold=-1.0)
+            self.assertEqual(results[0]["payload"], {"title": "遮天"})
+            store.reads = 0
+            batch = await indexer.search_batch(["遮天", "斗破"], limit=2, score_threshold=-1.0)
+            self.assertEqual(store.reads, 1)
+            self.assertEqual({hit["payload"]["title"] for hit in batch[1]}, {"斗破苍穹", "遮天"})
+
+        asyncio.run(run_test())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,8 +2,18 @@
 向量生成模块的单元测试。
 """
 import unittest
+import asyncio
 import numpy as np
-from src.qdrant_utils.embeddings import BGEEmbedding, Text2VecEmbedding
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from src.qdrant_utils.embeddings import (
+    BGEEmbedding, Text2VecEmbedding, postprocess_vectors, quantize_uint8, to_query_vector
+)
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.operations import QdrantOperations
+from tests.fakes import QuantizedEmbedding
 
 class TestEmbeddings(unittest.TestCase):
     """测试向量生成类"""
@@ -73,6 +83,60 @@ class TestEmbeddings(unittest.TestCase):
         different_vectors = model.generate_vector(different_texts)
         similarity = np.dot(different_vectors[0], different_vectors[1])
         self.assertLess(similarity, 0.8)
+    
+    def test_postprocess_vectors(self):
+        """测试维度截断、重新归一化与存储类型转换"""
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((4, 32)).astype(np.float32)
+        
+        # 截断后重新归一化
+        truncated = postprocess_vectors(vectors, output_dim=8)
+        self.assertEqual(truncated.shape, (4, 8))
+        self.assertEqual(truncated.dtype, np.float32)
+        for vector in truncated:
+            self.assertAlmostEqual(np.linalg.norm(vector), 1.0, places=5)
+        
+        # float16 存储
+        half = postprocess_vectors(vectors, datatype="float16")
+        self.assertEqual(half.dtype, np.float16)
+        self.assertAlmostEqual(float(np.linalg.norm(half[0].astype(np.float32))), 1.0, places=2)
+        
+        # uint8 存储
+        quantized = postprocess_vectors(vectors, output_dim=16, datatype="uint8")
+        self.assertEqual(quantized.dtype, np.uint8)
+        self.assertEqual(quantized.shape, (4, 16))
+        np.testing.assert_array_equal(quantize_uint8(np.array([[-1.0, 0.0, 1.0]])), [[0, 128, 255]])
+        
+        with self.assertRaises(ValueError):
+            postprocess_vectors(vectors, datatype="int4")
+    
+    def test_query_vector(self):
+        """测试 uint8 集合的浮点查询向量按存储方式映射"""
+        vector = np.array([-0.6, 0.0, 0.8], dtype=np.float32)
+        self.assertEqual(to_query_vector(vector), [float(v) for v in vector])
+        self.assertEqual(to_query_vector(vector * 2, "uint8"), [51.0, 128.0, 230.0])
+        self.assertEqual(to_query_vector(quantize_uint8(vector), "uint8"), [51.0, 128.0, 230.0])
+    
+    def test_uint8_search(self):
+        """测试 uint8 集合上的文本查询与浮点向量查询都以自身为最相似结果"""
+        texts = [f"第{i}章" for i in range(100)]
+        
+        indexer = TextIndexer(QuantizedEmbedding(), QdrantOperations(QdrantClient(":memory:")), "uint8")
+        indexer.create_index()
+        self.assertTrue(indexer.add_texts(texts))
+        for i, text in enumerate(texts):
+            self.assertEqual(indexer.search(text, limit=1)[0]["id"], i)
+            float_vector = indexer.embedding_model.float_vector(text)
+            self.assertEqual(indexer.search_by_vector(float_vector, limit=1)[0]["id"], i)
+        
+        async def run_test():
+            indexer = AsyncTextIndexer(QuantizedEmbedding(), AsyncQdrantOperations(AsyncQdrantClient(":memory:")), "uint8")
+            await indexer.create_index()
+            self.assertTrue(await indexer.add_texts_batch(texts))
+            results = await indexer.search_batch(texts, limit=1)
+            self.assertEqual([hits[0]["id"] for hits in results], list(range(len(texts))))
+        
+        asyncio.run(run_test())
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""
+召回率评估的单元测试。
+"""
+import unittest
+from qdrant_client import QdrantClient
+from src.qdrant_utils.cache import SearchResultCache
+from src.qdrant_utils.evaluation import (
+    RecallEvaluator, search_param_grid, describe_params, mark_pareto, cheapest_config, format_table
+)
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.operations import QdrantOperations
+from tests.fakes import HashEmbedding
+
+def row(config, recall, p99_ms, p50_ms=None):
+    """构造评估结果"""
+    return {"config": config, "recall": recall, "p50_ms": p50_ms or p99_ms / 2, "p99_ms": p99_ms, "mean_ms": p99_ms / 2}
+
+class TestEvaluation(unittest.TestCase):
+    """测试召回率评估"""
+
+    def setUp(self):
+        """测试前准备"""
+        ops = QdrantOperations(QdrantClient(":memory:"), result_cache=SearchResultCache())
+        self.indexer = TextIndexer(HashEmbedding(), ops, "titles", dedup=False)
+        self.indexer.create_index()
+        self.indexer.add_texts([f"标题{i}" for i in range(60)])
+
+    def test_grid(self):
+        """测试参数组合"""
+        grid = search_param_grid(hnsw_ef=[16, 64], rescore=[None, True], oversampling=[None, 2.0])
+        self.assertEqual(len(grid), 8)
+        self.assertIsNone(grid[0].quantization)
+        self.assertEqual(describe_params(grid[-1]), "ef=64 rescore=True oversampling=2.0")
+        self.assertEqual(describe_params(None), "default")
+
+    def test_evaluate(self):
+        """测试两种基准结果与评估流程"""
+        grid = search_param_grid(hnsw_ef=[16, 128])
+        for ground_truth in ("exact", "numpy"):
+            evaluator = RecallEvaluator(self.indexer, k=5, ground_truth=ground_truth, repeats=2)
+            results = evaluator.run(grid, num_queries=10)
+            self.assertEqual(len(evaluator.queries), 10)
+            self.assertEqual(len(results), 2)
+            # 本地内存模式总是精确检索
+            self.assertTrue(all(r["recall"] == 1.0 for r in results))
+            self.assertTrue(all(r["p99_ms"] >= r["p50_ms"] > 0 for r in results))
+        # 评估不写入索引管理器的结果缓存
+        self.assertEqual(len(self.indexer.qdrant_ops.result_cache), 0)
+        self.assertIn("recall@5", format_table(results, 5))
+
+    def test_given_queries(self):
+        """测试使用给定查询与空集合"""
+        evaluator = RecallEvaluator(self.indexer, k=3)
+        self.assertTrue(evaluator.prepare(queries=["标题1", "不存在"]))
+        self.assertEqual(len(evaluator.truth), 2)
+        empty = TextIndexer(HashEmbedding(), self.indexer.qdrant_ops, "empty")
+        empty.create_index()
+        self.assertEqual(RecallEvaluator(empty).run([None]), [])
+        with self.assertRaises(ValueError):
+            RecallEvaluator(self.indexer, ground_truth="approx")
+
+    def test_pareto(self):
+        """测试帕累托标记与最低成本配置"""
+        results = mark_pareto([
+            row("a", 0.90, 1.0), row("b", 0.95, 2.0), row("c", 0.93, 3.0), row("d", 0.99, 5.0)
+        ])
+        self.assertEqual([r["config"] for r in results if r["pareto"]], ["a", "b", "d"])
+        self.assertEqual(cheapest_config(results, 0.94)["config"], "b")
+        self.assertIsNone(cheapest_config(results, 0.999))
+
+if __name__ == '__main__':
+    unittest.main()
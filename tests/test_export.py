@@ -0,0 +1,129 @@
+"""
+集合遍历与导出的单元测试。
+"""
+import unittest
+import asyncio
+import json
+import os
+import tempfile
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from src.qdrant_utils.export import CollectionExporter, AsyncCollectionExporter
+from src.qdrant_utils.metrics import InMemoryMetrics
+
+def make_points(count):
+    """构造测试点数据"""
+    return [
+        PointStruct(id=i, vector=[1.0, float(i), 0.5], payload={"title": f"标题{i}", "even": i % 2 == 0})
+        for i in range(count)
+    ]
+
+def fail_after(client, pages):
+    """让客户端的 scroll 在返回 pages 页后抛出异常"""
+    scroll = client.scroll
+    calls = []
+
+    def flaky_scroll(*args, **kwargs):
+        calls.append(1)
+        if len(calls) > pages:
+            raise ConnectionError("连接中断")
+        return scroll(*args, **kwargs)
+
+    client.scroll = flaky_scroll
+
+class TestExport(unittest.TestCase):
+    """测试集合遍历与导出"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.client = QdrantClient(":memory:")
+        self.client.create_collection("test_export", vectors_config=VectorParams(size=3, distance=Distance.DOT))
+        self.client.upsert("test_export", make_points(23))
+        self.ops = QdrantOperations(self.client)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.vectors_path = os.path.join(self.tmpdir.name, "vectors.npy")
+        self.records_path = os.path.join(self.tmpdir.name, "records.jsonl")
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmpdir.cleanup()
+
+    def test_scroll_all(self):
+        """测试分页遍历全部点"""
+        for prefetch in (True, False):
+            records = list(self.ops.scroll_all("test_export", page_size=5, prefetch=prefetch))
+            self.assertEqual(sorted(r.id for r in records), list(range(23)))
+            self.assertIsNone(records[0].vector)
+
+        even = Filter(must=[FieldCondition(key="even", match=MatchValue(value=True))])
+        records = list(self.ops.scroll_all("test_export", page_size=4, with_payload=["title"], scroll_filter=even))
+        self.assertEqual(len(records), 12)
+        self.assertEqual(set(records[0].payload), {"title"})
+        with self.assertRaises(Exception):
+            list(self.ops.scroll_all("missing"))
+
+    def test_scroll_error(self):
+        """测试遍历中途出错时抛出异常，不会当作完整遍历结束"""
+        metrics = InMemoryMetrics()
+        ops = QdrantOperations(self.client, metrics=metrics)
+        fail_after(self.client, 2)
+        records = []
+        with self.assertRaises(ConnectionError):
+            for record in ops.scroll_all("test_export", page_size=5, prefetch=False):
+                records.append(record)
+        self.assertEqual(len(records), 10)
+        self.assertEqual(metrics.counter("errors", stage="scroll"), 1)
+
+    def test_export(self):
+        """测试导出向量与载荷"""
+        exporter = CollectionExporter(self.ops, page_size=7)
+        self.assertTrue(exporter.export("test_export", self.vectors_path, self.records_path))
+        vectors = np.load(self.vectors_path, mmap_mode="r")
+        with open(self.records_path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(vectors.shape, (23, 3))
+        self.assertEqual(len(records), 23)
+        for row, record in zip(vectors, records):
+            self.assertEqual(row[1], float(record["id"]))
+            self.assertEqual(record["payload"]["title"], f"标题{record['id']}")
+
+    def test_export_empty_and_missing(self):
+        """测试空集合与不存在的集合"""
+        self.client.create_collection("empty", vectors_config=VectorParams(size=3, distance=Distance.DOT))
+        exporter = CollectionExporter(self.ops)
+        self.assertTrue(exporter.export("empty", self.vectors_path, self.records_path))
+        self.assertEqual(np.load(self.vectors_path).shape, (0, 0))
+        self.assertFalse(exporter.export("missing", self.vectors_path + "2", self.records_path + "2"))
+        self.assertFalse(os.path.exists(self.records_path + "2.part"))
+
+    def test_async_export(self):
+        """测试异步遍历与导出"""
+        async def run_test():
+            client = AsyncQdrantClient(":memory:")
+            await client.create_collection("test_export", vectors_config=VectorParams(size=3, distance=Distance.DOT))
+            await client.upsert("test_export", make_points(11))
+            ops = AsyncQdrantOperations(client)
+            ids = [record.id async for record in ops.scroll_all("test_export", page_size=3)]
+            self.assertEqual(sorted(ids), list(range(11)))
+
+            exporter = AsyncCollectionExporter(ops, page_size=4)
+            self.assertTrue(await exporter.export("test_export", self.vectors_path, self.records_path, dtype="float16"))
+            vectors = np.load(self.vectors_path)
+            self.assertEqual((vectors.shape, vectors.dtype), ((11, 3), np.float16))
+
+            # 遍历中途出错时抛出异常
+            fail_after(client, 1)
+            ids = []
+            with self.assertRaises(ConnectionError):
+                async for record in ops.scroll_all("test_export", page_size=3):
+                    ids.append(record.id)
+            self.assertEqual(len(ids), 3)
+
+        asyncio.run(run_test())
+
+if __name__ == '__main__':
+    unittest.main()
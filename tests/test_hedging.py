@@ -0,0 +1,153 @@
+"""
+对冲请求与截止时间的单元测试。
+"""
+import unittest
+import asyncio
+from types import SimpleNamespace
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from src.qdrant_utils.cache import SearchResultCache
+from src.qdrant_utils.hedging import HedgePolicy, hedged_call
+from src.qdrant_utils.metrics import InMemoryMetrics
+from tests.fakes import FirstCharEmbedding
+
+class SlowClient:
+    """按预设延迟返回的测试客户端"""
+
+    def __init__(self, name, delay, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+
+    async def query_points(self, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RuntimeError(f"{self.name} 不可用")
+        return SimpleNamespace(points=[SimpleNamespace(id=self.name, score=1.0, payload={})])
+
+class DelayedOperations(AsyncQdrantOperations):
+    """第一批搜索之后变慢的操作类"""
+
+    async def search_batch(self, requests, timeout=None):
+        if self.metrics.counter("batches") >= 1:
+            await asyncio.sleep(0.2)
+        self.metrics.incr("batches")
+        return await super().search_batch(requests, timeout=timeout)
+
+class TestHedging(unittest.TestCase):
+    """测试对冲请求与截止时间"""
+
+    def test_policy(self):
+        """测试对冲等待时间取延迟分位数"""
+        policy = HedgePolicy(percentile=90, window=100, initial_delay=0.5, min_delay=0.01, min_samples=10)
+        self.assertEqual(policy.delay(), 0.5)
+        for i in range(100):
+            policy.record(i / 1000)
+        self.assertAlmostEqual(policy.delay(), 0.0891, places=4)
+        for _ in range(100):
+            policy.record(0.0)
+        self.assertEqual(policy.delay(), 0.01)
+
+    def test_hedged_call(self):
+        """测试重复请求胜出、失败切换与取消"""
+        async def run_test():
+            metrics = InMemoryMetrics()
+            policy = HedgePolicy(initial_delay=0.02)
+            slow, fast = SlowClient("slow", 1.0), SlowClient("fast", 0.0)
+            response = await hedged_call(lambda c: c.query_points(), [slow, fast], policy, metrics)
+            self.assertEqual(response.points[0].id, "fast")
+            await asyncio.sleep(0)
+            self.assertEqual(slow.cancelled, 1)
+            self.assertEqual(metrics.counter("hedged_requests", stage="search"), 1)
+
+            # 主请求失败时不等待即发送重复请求
+            broken = SlowClient("broken", 0.0, fail=True)
+            response = await asyncio.wait_for(
+                hedged_call(lambda c: c.query_points(), [broken, fast], HedgePolicy(initial_delay=10)), 1.0
+            )
+            self.assertEqual(response.points[0].id, "fast")
+            with self.assertRaises(RuntimeError):
+                await hedged_call(lambda c: c.query_points(), [broken], HedgePolicy(initial_delay=10))
+
+            # 未超过等待时间时不发送重复请求
+            quick = SlowClient("quick", 0.0)
+            await hedged_call(lambda c: c.query_points(), [quick, slow], policy, metrics)
+            self.assertEqual(metrics.counter("hedged_requests", stage="search"), 1)
+
+        asyncio.run(run_test())
+
+    def test_operations_deadline(self):
+        """测试 query_points 的对冲与截止时间"""
+        async def run_test():
+            metrics = InMemoryMetrics()
+            slow, replica = SlowClient("slow", 1.0), SlowClient("replica", 0.0)
+            ops = AsyncQdrantOperations(
+                slow, metrics=metrics, hedge_policy=HedgePolicy(initial_delay=0.02), hedge_clients=[replica]
+            )
+            points = await ops.query_points("titles", [0.1] * 4, timeout=0.5)
+            self.assertEqual(points[0].id, "replica")
+
+            ops = AsyncQdrantOperations(slow, metrics=metrics, result_cache=SearchResultCache())
+            self.assertEqual(await ops.query_points("titles", [0.1] * 4, timeout=0.05), [])
+            self.assertEqual(metrics.counter("deadline_exceeded", stage="search"), 1)
+            self.assertEqual(metrics.counter("errors", stage="search"), 0)
+
+            # 部分请求超时，其余结果照常返回
+            fast_ops = AsyncQdrantOperations(SlowClient("fast", 0.0))
+            mixed = AsyncQdrantOperations(slow)
+            mixed.client = SimpleNamespace(
+                query_points=lambda **kw: (fast_ops.client if kw["limit"] == 1 else slow).query_points(**kw)
+            )
+            requests = [
+                {"collection_name": "titles", "vector": [0.1] * 4, "limit": limit, "score_threshold": 0.0}
+                for limit in (1, 2, 1)
+            ]
+            results = await mixed.search_batch(requests, timeout=0.05)
+            self.assertEqual([len(hits) for hits in results], [1, 0, 1])
+
+        asyncio.run(run_test())
+
+    def test_cache_waiter_after_owner_timeout(self):
+        """测试发起请求的一方超时后，合并等待的请求自行重试"""
+        async def run_test():
+            client = SlowClient("slow", 0.1)
+            ops = AsyncQdrantOperations(client, result_cache=SearchResultCache())
+            short, patient = await asyncio.gather(
+                ops.query_points("titles", [0.1] * 4, timeout=0.02),
+                ops.query_points("titles", [0.1] * 4, timeout=1.0)
+            )
+            self.assertEqual(short, [])
+            self.assertEqual(patient[0].id, "slow")
+            self.assertEqual(client.calls, 2)
+
+        asyncio.run(run_test())
+
+    def test_indexer_deadline(self):
+        """测试索引管理器的整体截止时间"""
+        async def run_test():
+            metrics = InMemoryMetrics()
+            ops = DelayedOperations(AsyncQdrantClient(":memory:"), metrics=metrics)
+            indexer = AsyncTextIndexer(FirstCharEmbedding(), ops, "titles", metrics=metrics)
+            await indexer.create_index()
+            await indexer.add_texts_batch(["斗破苍穹", "遮天", "凡人修仙传"])
+            queries = ["斗破", "遮天", "斗破", "凡人"]
+            results = await indexer.search_batch(queries, limit=1, score_threshold=-1.0, batch_size=1, timeout=0.1)
+            self.assertEqual(len(results), 4)
+            self.assertEqual(results[0][0]["payload"]["title"], "斗破苍穹")
+            self.assertEqual(results[2], results[0])
+            self.assertEqual(results[3], [])
+            self.assertGreater(metrics.counter("deadline_exceeded", stage="search_batch"), 0)
+            self.assertEqual(await indexer.search("遮天", timeout=0.0), [])
+
+        asyncio.run(run_test())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+"""
+文件写入与命令行入口的单元测试。
+"""
+import unittest
+import csv
+import io
+import json
+import os
+import tempfile
+import uuid
+from qdrant_client import QdrantClient
+from qdrant_client.models import Filter, FieldCondition, MatchValue
+from src.qdrant_utils.cli import build_parser, run_ingest
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.ingest import ColumnMapping, ParallelFileReader, ThroughputReporter, detect_format, ingest_files
+from src.qdrant_utils.metrics import InMemoryMetrics
+from src.qdrant_utils.operations import QdrantOperations
+from tests.fakes import LengthEmbedding
+
+class TestIngest(unittest.TestCase):
+    """测试文件并行读取、列映射与写入"""
+
+    def setUp(self):
+        """写入测试文件"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.jsonl = self.path("a.jsonl")
+        with open(self.jsonl, "w", encoding="utf-8") as f:
+            for i in range(700):
+                f.write(json.dumps({"id": i, "title": f"标题{i}", "author": "甲", "words": i * 10}, ensure_ascii=False) + "\n")
+            f.write("\n")
+        self.csv = self.path("b.csv")
+        with open(self.csv, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["id", "title", "author"])
+            for i in range(700, 1000):
+                writer.writerow([i, f"标题{i}" if i != 999 else "", "乙"])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def test_mapping(self):
+        """测试列映射与格式判断"""
+        mapping = ColumnMapping("title", id_field="id", payload_fields=["author"])
+        self.assertEqual(mapping.columns(), ["title", "id", "author"])
+        self.assertEqual(
+            mapping.to_record({"id": "7", "title": "遮天", "author": "辰东", "words": 1}),
+            {"id": 7, "text": "遮天", "payload": {"author": "辰东"}}
+        )
+        self.assertIsNone(mapping.to_record({"id": 8, "title": " "}))
+        self.assertEqual(ColumnMapping("title").to_record({"title": "遮天", "x": 1}), {"text": "遮天", "payload": {"x": 1}})
+        self.assertIsNone(ColumnMapping("title").columns())
+        self.assertEqual(detect_format("data/Books.PARQUET"), "parquet")
+        with self.assertRaises(ValueError):
+            detect_format("data.txt")
+
+    def test_parallel_reader_order(self):
+        """测试并行读取保持文件与行的顺序，跳过空文本行"""
+        metrics = InMemoryMetrics()
+        reader = ParallelFileReader(
+            [self.jsonl, self.csv], ColumnMapping("title", id_field="id"),
+            workers=2, prefetch=64, block_size=16, metrics=metrics
+        )
+        records = list(reader)
+        self.assertEqual([r["id"] for r in records], list(range(999)))
+        self.assertEqual(records[0]["payload"], {"author": "甲", "words": 0})
+        self.assertEqual(records[700]["payload"], {"author": "乙"})
+        self.assertEqual(metrics.counter("rows", stage="read"), 1000)
+        self.assertEqual(metrics.counter("skipped", stage="read"), 1)
+
+        # 提前结束迭代不会阻塞读取线程
+        iterator = iter(reader)
+        self.assertEqual(next(iterator)["id"], 0)
+        iterator.close()
+
+        missing = ParallelFileReader([self.path("missing.jsonl")], ColumnMapping("title"))
+        with self.assertRaises(RuntimeError):
+            list(missing)
+
+    def test_ingest_files(self):
+        """测试文件写入集合并输出吞吐量，重复运行时从检查点继续"""
+        metrics = InMemoryMetrics()
+        client = QdrantClient(":memory:")
+        indexer = TextIndexer(LengthEmbedding(), QdrantOperations(client, metrics=metrics), "titles", metrics=metrics)
+        indexer.create_index()
+        checkpoint = self.path("ingest.json")
+        stream = io.StringIO()
+        mapping = ColumnMapping("title", payload_fields=["author"])
+        self.assertTrue(ingest_files(
+            indexer, [self.jsonl, self.csv], mapping, checkpoint, chunk_size=256, report_interval=60, stream=stream
+        ))
+        self.assertEqual(client.count("titles").count, 999)
+        point = client.retrieve("titles", ids=[998])[0]
+        self.assertEqual(point.payload, {"title": "标题998", "author": "乙"})
+        self.assertIn("已写入 999 条", stream.getvalue())
+
+        # 检查点已覆盖全部记录，再次运行不写入新数据
+        self.assertTrue(ingest_files(indexer, [self.jsonl, self.csv], mapping, checkpoint, report_interval=None))
+        self.assertEqual(metrics.counter("records", stage="ingest_job"), 999)
+
+        # 读取失败时返回False
+        self.assertFalse(ingest_files(indexer, [self.path("missing.jsonl")], mapping, self.path("other.json")))
+        self.assertEqual(metrics.counter("errors", stage="ingest_files"), 1)
+
+    def test_string_ids(self):
+        """测试CSV中非数字的ID列映射为确定的UUID，可以写入集合"""
+        mapping = ColumnMapping("title", id_field="id")
+        key = "1B9D6BCD-BBFD-4B2D-9B5D-AB8DFBBD4BED"
+        self.assertEqual(mapping.to_record({"id": key, "title": "遮天"})["id"], key.lower())
+        self.assertEqual(mapping.to_record({"id": 7, "title": "遮天"}), {"id": 7, "text": "遮天", "payload": {}})
+        record = mapping.to_record({"id": "book-17", "title": "遮天"})
+        first = record["id"]
+        self.assertEqual(record["payload"], {"id": "book-17"})
+        self.assertEqual(first, mapping.to_record({"id": "book-17", "title": "完美世界"})["id"])
+        self.assertNotEqual(first, mapping.to_record({"id": "book-18", "title": "遮天"})["id"])
+        # 非十进制数字字符和超出 uint64 的整数同样映射为 UUID
+        for value in ["²", 2 ** 64, str(2 ** 64), -1]:
+            record = mapping.to_record({"id": value, "title": "遮天"})
+            self.assertEqual(str(uuid.UUID(record["id"])), record["id"])
+            self.assertEqual(record["payload"], {"id": value})
+        self.assertEqual(mapping.to_record({"id": str(2 ** 64 - 1), "title": "遮天"})["id"], 2 ** 64 - 1)
+
+        path = self.path("books.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["id", "title"])
+            for i in range(20):
+                writer.writerow([f"book-{i}", f"标题{i}"])
+        metrics = InMemoryMetrics()
+        client = QdrantClient(":memory:")
+        indexer = TextIndexer(LengthEmbedding(), QdrantOperations(client), "books", metrics=metrics)
+        indexer.create_index()
+        self.assertTrue(ingest_files(indexer, [path], mapping, self.path("books.json"), report_interval=None))
+        self.assertEqual(client.count("books").count, 20)
+        self.assertEqual(client.retrieve("books", ids=[first])[0].payload, {"title": "标题17", "id": "book-17"})
+        found, _ = client.scroll(
+            "books", scroll_filter=Filter(must=[FieldCondition(key="id", match=MatchValue(value="book-3"))])
+        )
+        self.assertEqual([record.payload["title"] for record in found], ["标题3"])
+        self.assertEqual(metrics.counter("errors", stage="add_texts"), 0)
+
+    def test_cli(self):
+        """测试命令行参数与 ingest 命令"""
+        args = build_parser().parse_args([
+            "ingest", self.jsonl, "--collection", "titles", "--text-field", "title", "--id-field", "id",
+            "--checkpoint", self.path("cli.json"), "--report-interval", "60"
+        ])
+        self.assertEqual(args.readers, 4)
+        self.assertIsNone(args.payload_fields)
+        client = QdrantClient(":memory:")
+        metrics = InMemoryMetrics()
+        indexer = TextIndexer(LengthEmbedding(), QdrantOperations(client), "titles", metrics=metrics)
+        self.assertTrue(run_ingest(args, indexer))
+        self.assertEqual(client.count("titles").count, 700)
+        self.assertEqual(client.retrieve("titles", ids=[5])[0].payload["words"], 50)
+
+    def test_reporter(self):
+        """测试吞吐量报告内容"""
+        metrics = InMemoryMetrics()
+        stream = io.StringIO()
+        reporter = ThroughputReporter(metrics, interval=60, stream=stream, total=200)
+        reporter.start()
+        metrics.incr("records", 50, stage="ingest_job")
+        metrics.incr("errors", stage="add_texts")
+        reporter.stop()
+        self.assertIn("已写入 50 条（25.0%）", stream.getvalue())
+        self.assertIn("失败 1 次", stream.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
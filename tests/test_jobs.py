@@ -0,0 +1,119 @@
+"""
+可断点续传写入任务的单元测试。
+"""
+import unittest
+import asyncio
+import os
+import tempfile
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from src.qdrant_utils.jobs import IngestCheckpoint, IngestJob, AsyncIngestJob
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from src.qdrant_utils.retry import NO_RETRY
+from tests.fakes import LengthEmbedding
+
+class FailingOps(QdrantOperations):
+    """第 fail_at 次上传失败的操作类"""
+
+    def __init__(self, client, fail_at):
+        super().__init__(client, retry_policy=NO_RETRY)
+        self.fail_at = fail_at
+        self.calls = 0
+
+    def upsert_points_batch(self, collection_name, points):
+        self.calls += 1
+        if self.calls == self.fail_at:
+            return False
+        return super().upsert_points_batch(collection_name, points)
+
+class AsyncFailingOps(AsyncQdrantOperations):
+    """第 fail_at 次上传失败的异步操作类"""
+
+    def __init__(self, client, fail_at):
+        super().__init__(client, retry_policy=NO_RETRY)
+        self.fail_at = fail_at
+        self.calls = 0
+
+    async def upsert_points_batch(self, collection_name, points):
+        self.calls += 1
+        if self.calls == self.fail_at:
+            return False
+        return await super().upsert_points_batch(collection_name, points)
+
+class TestJobs(unittest.TestCase):
+    """测试写入任务"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.checkpoint_path = os.path.join(self.tmpdir.name, "checkpoint.json")
+        self.source = [f"标题{i}" for i in range(10)]
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmpdir.cleanup()
+
+    def test_checkpoint(self):
+        """测试检查点读写"""
+        checkpoint = IngestCheckpoint(self.checkpoint_path)
+        self.assertEqual(checkpoint.load()["cursor"], 0)
+        checkpoint.save(42, "abc")
+        state = checkpoint.load()
+        self.assertEqual((state["cursor"], state["last_point_id"]), (42, "abc"))
+        checkpoint.reset()
+        self.assertEqual(checkpoint.load()["cursor"], 0)
+
+    def test_resume(self):
+        """测试失败后从检查点继续写入"""
+        client = QdrantClient(":memory:")
+        model = LengthEmbedding()
+        indexer = TextIndexer(model, FailingOps(client, fail_at=2), "test_jobs", dedup=False)
+        indexer.create_index()
+
+        job = IngestJob(indexer, self.checkpoint_path, chunk_size=4)
+        self.assertFalse(job.run(self.source))
+        self.assertEqual(job.checkpoint.load()["cursor"], 4)
+        self.assertEqual(job.checkpoint.load()["last_point_id"], 3)
+
+        # 重启后只处理未确认的记录
+        model.seen.clear()
+        job = IngestJob(indexer, self.checkpoint_path, chunk_size=4)
+        self.assertTrue(job.run(self.source))
+        self.assertEqual(model.seen, self.source[4:])
+        self.assertEqual(client.count("test_jobs").count, 10)
+        self.assertEqual(job.checkpoint.load()["cursor"], 10)
+
+    def test_dict_records(self):
+        """测试带ID和载荷的记录"""
+        client = QdrantClient(":memory:")
+        indexer = TextIndexer(LengthEmbedding(), QdrantOperations(client), "test_jobs")
+        indexer.create_index()
+        records = [{"id": 100 + i, "text": t, "payload": {"source": "a"}} for i, t in enumerate(self.source[:3])]
+        self.assertTrue(IngestJob(indexer, self.checkpoint_path, chunk_size=2).run(records))
+        point = client.retrieve("test_jobs", [101])[0]
+        self.assertEqual(point.payload, {"title": "标题1", "source": "a"})
+
+    def test_async_resume(self):
+        """测试异步写入任务的断点续传"""
+        async def run_test():
+            client = AsyncQdrantClient(":memory:")
+            model = LengthEmbedding()
+            indexer = AsyncTextIndexer(model, AsyncFailingOps(client, fail_at=3), "test_jobs", dedup=False)
+            await indexer.create_index()
+
+            job = AsyncIngestJob(indexer, self.checkpoint_path, chunk_size=4, batch_size=4)
+            self.assertFalse(await job.run(self.source))
+            self.assertEqual(job.checkpoint.load()["cursor"], 8)
+
+            model.seen.clear()
+            self.assertTrue(await job.run(self.source))
+            self.assertEqual(model.seen, self.source[8:])
+            self.assertEqual((await client.count("test_jobs")).count, 10)
+
+        asyncio.run(run_test())
+
+if __name__ == '__main__':
+    unittest.main()
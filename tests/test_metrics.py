@@ -0,0 +1,90 @@
+"""
+指标记录模块的单元测试。
+"""
+import unittest
+import asyncio
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from src.qdrant_utils.metrics import Metrics, NULL_METRICS, InMemoryMetrics, PrometheusMetrics
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from tests.fakes import HashEmbedding
+
+class TestMetrics(unittest.TestCase):
+    """测试指标记录"""
+
+    def test_null_metrics(self):
+        """测试默认记录器不做任何记录"""
+        with NULL_METRICS.timer("forward"):
+            pass
+        NULL_METRICS.observe("batch_size", 3)
+        NULL_METRICS.incr("errors", stage="upsert")
+        self.assertIs(NULL_METRICS.timer("a"), Metrics().timer("b"))
+
+    def test_in_memory_metrics(self):
+        """测试计数器与直方图"""
+        metrics = InMemoryMetrics()
+        metrics.incr("errors", stage="upsert")
+        metrics.incr("errors", 2, stage="upsert")
+        metrics.observe("batch_size", 32, stage="upsert")
+        with metrics.timer("forward"):
+            pass
+        self.assertEqual(metrics.counter("errors", stage="upsert"), 3)
+        self.assertEqual(metrics.counter("errors", stage="search"), 0)
+        self.assertEqual(metrics.histogram("batch_size", stage="upsert"), {"count": 1, "sum": 32})
+        self.assertEqual(metrics.histogram("stage_seconds", stage="forward")["count"], 1)
+        metrics.reset()
+        self.assertEqual(metrics.counter("errors", stage="upsert"), 0)
+
+    def test_prometheus_render(self):
+        """测试 Prometheus 文本格式"""
+        metrics = PrometheusMetrics(buckets={"batch_size": (10, 100)})
+        metrics.observe("batch_size", 5, stage="upsert")
+        metrics.observe("batch_size", 50, stage="upsert")
+        metrics.incr("cache_hits", 4, cache="dedup")
+        text = metrics.render()
+        self.assertIn("# TYPE qdrant_utils_batch_size histogram", text)
+        self.assertIn('qdrant_utils_batch_size_bucket{stage="upsert",le="10"} 1', text)
+        self.assertIn('qdrant_utils_batch_size_bucket{stage="upsert",le="100"} 2', text)
+        self.assertIn('qdrant_utils_batch_size_bucket{stage="upsert",le="+Inf"} 2', text)
+        self.assertIn('qdrant_utils_batch_size_count{stage="upsert"} 2', text)
+        self.assertIn("# TYPE qdrant_utils_cache_hits_total counter", text)
+        self.assertIn('qdrant_utils_cache_hits_total{cache="dedup"} 4', text)
+
+    def test_indexer_metrics(self):
+        """测试索引管理器与操作类记录的阶段指标"""
+        metrics = InMemoryMetrics()
+        ops = QdrantOperations(QdrantClient(":memory:"), metrics=metrics)
+        indexer = TextIndexer(HashEmbedding(), ops, "test_metrics", metrics=metrics)
+        indexer.create_index()
+        indexer.add_texts(["斗破苍穹", "斗破苍穹", "完美世界"])
+        indexer.search("修仙小说", limit=1)
+
+        for stage in ("embed", "to_list", "build_points", "upsert", "search"):
+            self.assertGreater(metrics.histogram("stage_seconds", stage=stage)["count"], 0, stage)
+        self.assertEqual(metrics.histogram("batch_size", stage="upsert"), {"count": 1, "sum": 3})
+        self.assertEqual(metrics.counter("cache_hits", cache="dedup"), 1)
+
+        # 集合不存在时记录错误
+        ops.upsert_points_batch("missing", [{"id": 1, "vector": [0.0] * 8, "payload": {}}])
+        self.assertEqual(metrics.counter("errors", stage="upsert"), 1)
+
+    def test_async_metrics(self):
+        """测试异步组件记录的阶段指标"""
+        async def run_test():
+            metrics = InMemoryMetrics()
+            ops = AsyncQdrantOperations(AsyncQdrantClient(":memory:"), metrics=metrics)
+            indexer = AsyncTextIndexer(HashEmbedding(), ops, "test_metrics", metrics=metrics)
+            await indexer.create_index()
+            await indexer.add_texts_batch(["斗破苍穹", "完美世界"], batch_size=1)
+            await indexer.search_batch(["修仙小说"])
+
+            self.assertEqual(metrics.histogram("batch_size", stage="upsert"), {"count": 2, "sum": 2})
+            self.assertEqual(metrics.histogram("stage_seconds", stage="search")["count"], 1)
+
+        asyncio.run(run_test())
+
+if __name__ == '__main__':
+    unittest.main()
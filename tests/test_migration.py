@@ -0,0 +1,152 @@
+"""
+向量迁移的单元测试。
+"""
+import unittest
+import asyncio
+import os
+import tempfile
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from qdrant_client.models import Distance, VectorParams, PointStruct
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from src.qdrant_utils.migration import EmbeddingMigration, AsyncEmbeddingMigration
+from tests.fakes import LengthEmbedding
+
+def make_points(count, named=False):
+    """构造旧模型写入的点，第 0 个点没有文本"""
+    points = []
+    for i in range(count):
+        vector = [0.1, 0.2, 0.3, float(i)]
+        if named:
+            # 本地模式只能更新已有值的命名向量，先写入占位向量
+            vector = {"old": vector, "new": [0.0, 0.0, 1.0]}
+        payload = {"title": "书" * (i + 1), "n": i} if i else {"n": i}
+        points.append(PointStruct(id=i, vector=vector, payload=payload))
+    return points
+
+class FlakyOperations(QdrantOperations):
+    """第一次写入第二页时失败的操作类"""
+
+    def __init__(self, client):
+        super().__init__(client)
+        self.writes = 0
+
+    def upsert_points_batch(self, collection_name, points):
+        self.writes += 1
+        if self.writes == 2:
+            return False
+        return super().upsert_points_batch(collection_name, points)
+
+class TestMigration(unittest.TestCase):
+    """测试向量迁移"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.client = QdrantClient(":memory:")
+        self.client.create_collection("old", vectors_config=VectorParams(size=4, distance=Distance.DOT))
+        self.client.upsert("old", make_points(20))
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.checkpoint_path = os.path.join(self.tmpdir.name, "migration.json")
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmpdir.cleanup()
+
+    def test_migrate_to_new_collection(self):
+        """测试迁移到新集合并复制载荷"""
+        model = LengthEmbedding(dim=3)
+        migration = EmbeddingMigration(model, QdrantOperations(self.client), "old", "new", page_size=6)
+        self.assertTrue(migration.run())
+        records = self.client.retrieve("new", ids=list(range(20)), with_vectors=True)
+        # 没有文本的点被跳过
+        self.assertEqual(sorted(r.id for r in records), list(range(1, 20)))
+        for record in records:
+            # 余弦距离的集合会归一化向量
+            self.assertAlmostEqual(record.vector[1] / record.vector[0], record.id + 1, places=4)
+            self.assertEqual(record.payload["n"], record.id)
+        self.assertEqual(self.client.get_collection("new").config.params.vectors.size, 3)
+
+    def test_resume(self):
+        """测试写入失败后从最后确认的页继续"""
+        model = LengthEmbedding(dim=3)
+        ops = FlakyOperations(self.client)
+        migration = EmbeddingMigration(
+            model, ops, "old", "new", checkpoint_path=self.checkpoint_path, page_size=5
+        )
+        self.assertFalse(migration.run())
+        self.assertEqual(migration.checkpoint.load()["offset"], 5)
+        embedded = len(model.seen)
+
+        self.assertTrue(migration.run())
+        self.assertEqual(self.client.count("new").count, 19)
+        # 第一页不会重新推理
+        self.assertEqual(len(model.seen) - embedded, 15)
+        self.assertTrue(migration.checkpoint.load()["completed"])
+        self.assertTrue(migration.run())
+        self.assertEqual(len(model.seen) - embedded, 15)
+
+    def test_scroll_error(self):
+        """测试遍历源集合中途出错时返回False，恢复后完成迁移"""
+        scroll = self.client.scroll
+        pages = []
+
+        def flaky_scroll(*args, **kwargs):
+            pages.append(1)
+            if len(pages) == 3:
+                raise ConnectionError("连接中断")
+            return scroll(*args, **kwargs)
+
+        self.client.scroll = flaky_scroll
+        migration = EmbeddingMigration(
+            LengthEmbedding(dim=3), QdrantOperations(self.client), "old", "new",
+            checkpoint_path=self.checkpoint_path, page_size=5
+        )
+        self.assertFalse(migration.run())
+        self.assertFalse(migration.checkpoint.load().get("completed"))
+        self.assertTrue(migration.run())
+        self.assertEqual(self.client.count("new").count, 19)
+
+    def test_named_vector(self):
+        """测试写入命名向量，载荷与其他向量保持不变"""
+        self.client.create_collection("multi", vectors_config={
+            "old": VectorParams(size=4, distance=Distance.DOT),
+            "new": VectorParams(size=3, distance=Distance.DOT),
+        })
+        self.client.upsert("multi", make_points(8, named=True))
+        migration = EmbeddingMigration(
+            LengthEmbedding(dim=3), QdrantOperations(self.client), "multi", vector_name="new", page_size=3
+        )
+        self.assertTrue(migration.run())
+        record = self.client.retrieve("multi", ids=[4], with_vectors=True)[0]
+        self.assertEqual(record.vector["new"], [1.0, 5.0, 0.5])
+        np.testing.assert_allclose(record.vector["old"], [0.1, 0.2, 0.3, 4.0], rtol=1e-6)
+        self.assertEqual(record.payload, {"title": "书" * 5, "n": 4})
+
+    def test_invalid(self):
+        """测试无效参数与不存在的源集合"""
+        with self.assertRaises(ValueError):
+            EmbeddingMigration(LengthEmbedding(dim=3), QdrantOperations(self.client), "old")
+        migration = EmbeddingMigration(LengthEmbedding(dim=3), QdrantOperations(self.client), "missing", "new")
+        self.assertFalse(migration.run())
+
+    def test_async_migration(self):
+        """测试异步迁移"""
+        async def run_test():
+            client = AsyncQdrantClient(":memory:")
+            await client.create_collection("old", vectors_config=VectorParams(size=4, distance=Distance.DOT))
+            await client.upsert("old", make_points(13))
+            migration = AsyncEmbeddingMigration(
+                LengthEmbedding(dim=3), AsyncQdrantOperations(client), "old", "new",
+                checkpoint_path=self.checkpoint_path, page_size=4
+            )
+            self.assertTrue(await migration.run())
+            self.assertEqual((await client.count("new")).count, 12)
+            state = migration.checkpoint.load()
+            self.assertEqual((state["cursor"], state["completed"]), (13, True))
+
+        asyncio.run(run_test())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+"""
+载荷更新与点删除的单元测试。
+"""
+import unittest
+import asyncio
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models as rest
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from src.qdrant_utils.cache import SearchResultCache
+from src.qdrant_utils.docstore import SQLiteDocumentStore
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.metrics import InMemoryMetrics
+from src.qdrant_utils.operations import QdrantOperations
+from tests.fakes import FirstCharEmbedding
+
+def status_filter(status):
+    """构造按 status 字段过滤的条件"""
+    return rest.Filter(must=[rest.FieldCondition(key="status", match=rest.MatchValue(value=status))])
+
+def page_by_page(client, fail_at):
+    """让客户端的 scroll 每页只返回一个点，并在第 fail_at 次请求时抛出异常"""
+    scroll = client.scroll
+    calls = []
+
+    def flaky_scroll(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == fail_at:
+            raise ConnectionError("连接中断")
+        return scroll(*args, **dict(kwargs, limit=1))
+
+    client.scroll = flaky_scroll
+
+class TestPayloadUpdates(unittest.TestCase):
+    """测试载荷更新与点删除"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.metrics = InMemoryMetrics()
+        self.client = QdrantClient(":memory:")
+        self.ops = QdrantOperations(self.client, metrics=self.metrics, result_cache=SearchResultCache())
+        self.client.create_collection("docs", vectors_config=rest.VectorParams(size=4, distance=rest.Distance.DOT))
+        self.client.upsert("docs", [
+            rest.PointStruct(id=i, vector=[float(i), 1.0, 0.0, 0.0], payload={"status": "draft", "tag": "a"})
+            for i in range(6)
+        ])
+
+    def payloads(self):
+        """读取全部点的载荷"""
+        return {record.id: record.payload for record in self.client.scroll("docs", limit=100)[0]}
+
+    def test_payload_operations(self):
+        """测试按ID、按过滤条件及两者交集更新载荷"""
+        self.assertTrue(self.ops.set_payload("docs", {"status": "published"}, points=[0, 1]))
+        self.assertTrue(self.ops.set_payload("docs", {"tag": "b"}, points=[1, 2], points_filter=status_filter("published")))
+        self.assertTrue(self.ops.overwrite_payload("docs", {"status": "archived"}, points=[5]))
+        self.assertTrue(self.ops.delete_payload_keys("docs", ["tag"], points_filter=status_filter("draft")))
+        payloads = self.payloads()
+        self.assertEqual(payloads[0], {"status": "published", "tag": "a"})
+        self.assertEqual(payloads[1], {"status": "published", "tag": "b"})
+        self.assertEqual(payloads[2], {"status": "draft"})
+        self.assertEqual(payloads[5], {"status": "archived"})
+
+        self.assertTrue(self.ops.delete_points("docs", points_filter=status_filter("draft")))
+        self.assertEqual(sorted(self.payloads()), [0, 1, 5])
+        vector = self.client.retrieve("docs", ids=[1], with_vectors=True)[0].vector
+        np.testing.assert_allclose(vector, [1.0, 1.0, 0.0, 0.0])
+
+        # 未指定点ID和过滤条件时拒绝执行
+        self.assertFalse(self.ops.delete_points("docs"))
+        self.assertEqual(self.metrics.counter("errors", stage="delete_points"), 1)
+        self.assertEqual(self.client.count("docs").count, 3)
+
+    def test_set_payloads_batched(self):
+        """测试逐点载荷按批合并为一次请求"""
+        requests = []
+        batch_update_points = self.client.batch_update_points
+
+        def counting(*args, **kwargs):
+            requests.append(len(kwargs["update_operations"]))
+            return batch_update_points(*args, **kwargs)
+
+        self.client.batch_update_points = counting
+        updates = {i: {"rank": i * 10} for i in range(5)}
+        self.assertTrue(self.ops.set_payloads("docs", updates, batch_size=2))
+        self.assertEqual(requests, [2, 2, 1])
+        self.assertEqual(self.payloads()[3], {"status": "draft", "tag": "a", "rank": 30})
+        self.assertTrue(self.ops.set_payloads("docs", {4: {"rank": 1}}, overwrite=True))
+        self.assertEqual(self.payloads()[4], {"rank": 1})
+
+    def test_cache_invalidation(self):
+        """测试更新后缓存的搜索结果失效"""
+        before = self.ops.query_points("docs", [1.0, 0.0, 0.0, 0.0], limit=1, score_threshold=None)
+        self.assertEqual(before[0].payload["status"], "draft")
+        self.ops.set_payload("docs", {"status": "published"}, points=[before[0].id])
+        after = self.ops.query_points("docs", [1.0, 0.0, 0.0, 0.0], limit=1, score_threshold=None)
+        self.assertEqual(after[0].payload["status"], "published")
+
+    def test_indexer(self):
+        """测试索引管理器更新载荷不重新向量化，删除时同时删除文档存储中的全文"""
+        model = FirstCharEmbedding()
+        store = SQLiteDocumentStore(":memory:")
+        indexer = TextIndexer(model, self.ops, "titles", doc_store=store)
+        indexer.create_index()
+        indexer.add_texts(["斗破苍穹", "遮天", "凡人修仙传"], payloads=[{"status": "draft"}] * 3)
+        model.calls = 0
+        self.assertTrue(indexer.update_payload({"status": "published"}, ids=[0, 1]))
+        self.assertTrue(indexer.update_payloads({2: {"tags": ["修仙"]}}))
+        self.assertTrue(indexer.delete_payload_keys(["status"], ids=[1]))
+        self.assertEqual(model.calls, 0)
+
+        self.assertTrue(indexer.delete(query_filter=status_filter("published")))
+        self.assertEqual(len(store), 2)
+        self.assertTrue(indexer.delete(ids=[2]))
+        self.assertEqual(store.get_many([0, 1, 2]), {1: "遮天"})
+        self.assertTrue(indexer.delete(query_filter=status_filter("missing")))
+        self.assertEqual(self.client.count("titles").count, 1)
+
+    def test_delete_scroll_error(self):
+        """测试按过滤条件删除时遍历中途出错，不删除任何点并返回False"""
+        store = SQLiteDocumentStore(":memory:")
+        indexer = TextIndexer(FirstCharEmbedding(), self.ops, "titles", doc_store=store, metrics=self.metrics)
+        indexer.create_index()
+        indexer.add_texts(["斗破苍穹", "遮天", "凡人修仙传"], payloads=[{"status": "draft"}] * 3)
+        page_by_page(self.client, fail_at=2)
+        self.assertFalse(indexer.delete(query_filter=status_filter("draft")))
+        self.assertEqual(self.client.count("titles").count, 3)
+        self.assertEqual(len(store), 3)
+        self.assertEqual(self.metrics.counter("errors", stage="delete"), 1)
+
+        async def run_test():
+            store = SQLiteDocumentStore(":memory:")
+            client = AsyncQdrantClient(":memory:")
+            indexer = AsyncTextIndexer(FirstCharEmbedding(), AsyncQdrantOperations(client), "titles", doc_store=store)
+            await indexer.create_index()
+            await indexer.add_texts_batch(["斗破苍穹", "遮天", "凡人修仙传"], payloads=[{"status": "draft"}] * 3)
+            page_by_page(client, fail_at=3)
+            self.assertFalse(await indexer.delete(query_filter=status_filter("draft")))
+            self.assertEqual((await client.count("titles")).count, 3)
+            self.assertEqual(len(store), 3)
+
+        asyncio.run(run_test())
+
+    def test_async(self):
+        """测试异步操作类与索引管理器"""
+        async def run_test():
+            store = SQLiteDocumentStore(":memory:")
+            ops = AsyncQdrantOperations(AsyncQdrantClient(":memory:"))
+            indexer = AsyncTextIndexer(FirstCharEmbedding(), ops, "titles", doc_store=store)
+            await indexer.create_index()
+            await indexer.add_texts_batch(["斗破苍穹", "遮天", "凡人修仙传"], payloads=[{"status": "draft"}] * 3)
+            self.assertTrue(await indexer.update_payload({"status": "published"}, ids=[0]))
+            self.assertTrue(await indexer.update_payloads({1: {"status": "published"}, 2: {"rank": 1}}))
+            self.assertTrue(await indexer.delete_payload_keys(["rank"], query_filter=status_filter("draft")))
+            records = (await ops.client.scroll("titles", limit=10))[0]
+            self.assertEqual({r.id: r.payload for r in records}[2], {"status": "draft"})
+            self.assertTrue(await indexer.delete(query_filter=status_filter("published")))
+            self.assertEqual(await ops.count_points("titles"), 1)
+            self.assertEqual(len(store), 1)
+            self.assertFalse(await ops.set_payload("titles", {"status": "x"}))
+
+        asyncio.run(run_test())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+按点ID搜索与推荐搜索的单元测试。
+"""
+import unittest
+import asyncio
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from src.qdrant_utils.docstore import SQLiteDocumentStore
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.metrics import InMemoryMetrics
+from src.qdrant_utils.operations import QdrantOperations
+from tests.fakes import TableEmbedding
+
+TEXTS = ["苹果", "香蕉", "橙子", "汽车", "火车"]
+VECTORS = {
+    "苹果": [1.0, 0.1, 0.0],
+    "香蕉": [0.9, 0.2, 0.0],
+    "橙子": [0.8, 0.0, 0.3],
+    "汽车": [0.0, 1.0, 0.1],
+    "火车": [0.1, 0.9, 0.0]
+}
+
+class TestRecommend(unittest.TestCase):
+    """测试按点ID搜索与推荐搜索"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.metrics = InMemoryMetrics()
+        self.model = TableEmbedding(VECTORS)
+        self.client = QdrantClient(":memory:")
+        self.indexer = TextIndexer(
+            self.model, QdrantOperations(self.client, metrics=self.metrics), "fruits",
+            metrics=self.metrics, doc_store=SQLiteDocumentStore(":memory:")
+        )
+        self.indexer.create_index()
+        self.indexer.add_texts(TEXTS)
+        self.model.calls = 0
+
+    def test_search_by_id(self):
+        """测试按点ID搜索不需要向量化且不包含自身"""
+        results = self.indexer.search_by_id(0, limit=2)
+        self.assertEqual([hit["payload"]["title"] for hit in results], ["香蕉", "橙子"])
+        self.assertEqual(self.model.calls, 0)
+
+    def test_search_by_ids(self):
+        """测试批量按点ID搜索只发送一次请求"""
+        calls = []
+        query_batch_points = self.client.query_batch_points
+
+        def counting(*args, **kwargs):
+            calls.append(len(kwargs["requests"]))
+            return query_batch_points(*args, **kwargs)
+
+        self.client.query_batch_points = counting
+        results = self.indexer.search_by_ids([0, 3], limit=1)
+        self.assertEqual(calls, [2])
+        self.assertEqual([hits[0]["payload"]["title"] for hits in results], ["香蕉", "火车"])
+        self.assertEqual(self.indexer.search_by_ids([]), [])
+
+    def test_recommend(self):
+        """测试正负样本推荐与错误处理"""
+        results = self.indexer.recommend([0, 1], negative_ids=[2], limit=5)
+        ids = [hit["id"] for hit in results]
+        self.assertNotIn(0, ids)
+        self.assertNotIn(2, ids)
+        self.assertEqual(len(results), 2)
+        best = self.indexer.recommend([0, 3], limit=3, strategy="best_score")
+        self.assertEqual({hit["payload"]["title"] for hit in best[:2]}, {"香蕉", "火车"})
+        self.assertEqual(self.indexer.search_by_id(99), [])
+        self.assertEqual(self.metrics.counter("errors", stage="recommend"), 1)
+        self.assertEqual(self.model.calls, 0)
+
+    def test_async(self):
+        """测试异步索引管理器"""
+        async def run_test():
+            model = TableEmbedding(VECTORS)
+            indexer = AsyncTextIndexer(model, AsyncQdrantOperations(AsyncQdrantClient(":memory:")), "fruits")
+            await indexer.create_index()
+            await indexer.add_texts_batch(TEXTS)
+            model.calls = 0
+            results = await indexer.search_by_id(3, limit=1)
+            self.assertEqual(results[0]["payload"]["title"], "火车")
+            batch = await indexer.search_by_ids([0, 4], limit=1)
+            self.assertEqual([hits[0]["id"] for hits in batch], [1, 3])
+            recommended = await indexer.recommend([0], negative_ids=[2], limit=1)
+            self.assertEqual(recommended[0]["id"], 1)
+            self.assertEqual(model.calls, 0)
+
+        asyncio.run(run_test())
+
+if __name__ == '__main__':
+    unittest.main()
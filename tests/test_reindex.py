@@ -0,0 +1,76 @@
+"""
+蓝绿重建索引的单元测试。
+"""
+import unittest
+import asyncio
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from tests.fakes import FirstCharEmbedding
+
+class TestReindex(unittest.TestCase):
+    """测试蓝绿重建索引"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.client = QdrantClient(":memory:")
+        self.ops = QdrantOperations(self.client)
+        self.indexer = TextIndexer(FirstCharEmbedding(), self.ops, "titles")
+
+    def titles(self):
+        """通过别名搜索全部标题"""
+        return sorted(hit["payload"]["title"] for hit in self.indexer.search("遮天", limit=10, score_threshold=-1.0))
+
+    def test_reindex(self):
+        """测试从普通集合迁移到别名并再次重建"""
+        self.indexer.create_index()
+        self.indexer.add_texts(["斗破苍穹"])
+
+        self.assertTrue(self.indexer.reindex(lambda builder: builder.add_texts(["遮天", "完美世界"])))
+        first = self.ops.get_alias_target("titles")
+        self.assertTrue(first.startswith("titles_v"))
+        self.assertEqual(self.titles(), ["完美世界", "遮天"])
+
+        def build(builder):
+            # 重建期间搜索仍返回旧集合的数据
+            self.assertEqual(self.titles(), ["完美世界", "遮天"])
+            return builder.add_texts(["凡人修仙传"])
+
+        self.assertTrue(self.indexer.reindex(build))
+        self.assertNotEqual(self.ops.get_alias_target("titles"), first)
+        self.assertFalse(self.client.collection_exists(first))
+        self.assertEqual(self.titles(), ["凡人修仙传"])
+
+    def test_failed_build(self):
+        """测试写入失败时保留旧集合"""
+        self.assertTrue(self.indexer.reindex(lambda builder: builder.add_texts(["遮天"])))
+        current = self.ops.get_alias_target("titles")
+        collections = len(self.client.get_collections().collections)
+
+        self.assertFalse(self.indexer.reindex(lambda builder: False))
+        self.assertEqual(self.ops.get_alias_target("titles"), current)
+        self.assertEqual(len(self.client.get_collections().collections), collections)
+        self.assertEqual(self.titles(), ["遮天"])
+
+    def test_async_reindex(self):
+        """测试异步蓝绿重建索引"""
+        async def run_test():
+            ops = AsyncQdrantOperations(AsyncQdrantClient(":memory:"))
+            indexer = AsyncTextIndexer(FirstCharEmbedding(), ops, "titles")
+
+            async def build(builder):
+                return await builder.add_texts_batch(["遮天", "仙逆"])
+
+            self.assertTrue(await indexer.reindex(build))
+            self.assertTrue(await indexer.reindex(build, drop_old=False))
+            self.assertEqual(len((await ops.client.get_collections()).collections), 2)
+            results = await indexer.search("遮天", limit=10, score_threshold=-1.0)
+            self.assertEqual(len(results), 2)
+
+        asyncio.run(run_test())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+重排序模块的单元测试。
+"""
+import unittest
+import asyncio
+import os
+import tempfile
+import torch
+from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from src.qdrant_utils.rerank import Reranker, CrossEncoderReranker
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from tests.fakes import ConstantEmbedding
+
+class OverlapReranker(Reranker):
+    """以查询与文本的公共字符数作为得分的测试模型"""
+
+    def __init__(self):
+        self.scored = []
+
+    def score(self, pairs):
+        self.scored.extend(pairs)
+        return [float(len(set(query) & set(text))) for query, text in pairs]
+
+class TestRerank(unittest.TestCase):
+    """测试重排序"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.texts = ["斗破苍穹", "凡人修仙传", "完美世界", "遮天", "仙逆"]
+
+    def test_rerank(self):
+        """测试按重排序得分截取结果"""
+        hits = [{"id": i, "score": 0.5, "payload": {"title": t}} for i, t in enumerate(self.texts)]
+        results = OverlapReranker().rerank("凡人修仙", hits, top_k=2)
+        self.assertEqual([hit["id"] for hit in results], [1, 4])
+        self.assertEqual(results[0]["rerank_score"], 4.0)
+        self.assertEqual(results[0]["score"], 0.5)
+
+    def test_indexer(self):
+        """测试索引管理器的单个与批量搜索"""
+        reranker = OverlapReranker()
+        indexer = TextIndexer(
+            ConstantEmbedding(), QdrantOperations(QdrantClient(":memory:")), "test_rerank",
+            reranker=reranker, rerank_candidates=5
+        )
+        indexer.create_index()
+        indexer.add_texts(self.texts)
+        results = indexer.search("完美", limit=1, score_threshold=-1.0)
+        self.assertEqual([hit["payload"]["title"] for hit in results], ["完美世界"])
+        self.assertEqual(len(reranker.scored), 5)
+
+        batch = indexer.search_batch(["遮天", "斗破", "遮天"], limit=1, score_threshold=-1.0)
+        self.assertEqual([r[0]["payload"]["title"] for r in batch], ["遮天", "斗破苍穹", "遮天"])
+
+    def test_async_indexer(self):
+        """测试异步索引管理器的重排序"""
+        async def run_test():
+            indexer = AsyncTextIndexer(
+                ConstantEmbedding(), AsyncQdrantOperations(AsyncQdrantClient(":memory:")), "test_rerank",
+                reranker=OverlapReranker(), rerank_candidates=5
+            )
+            await indexer.create_index()
+            await indexer.add_texts_batch(self.texts)
+            results = await indexer.search("仙逆", limit=1, score_threshold=-1.0)
+            self.assertEqual(results[0]["payload"]["title"], "仙逆")
+            batch = await indexer.search_batch(["凡人", "完美"], limit=2, score_threshold=-1.0)
+            self.assertEqual([r[0]["payload"]["title"] for r in batch], ["凡人修仙传", "完美世界"])
+            self.assertEqual(len(batch[0]), 2)
+
+        asyncio.run(run_test())
+
+    def test_cross_encoder(self):
+        """测试交叉编码器的批量打分与缓存"""
+        with tempfile.TemporaryDirectory() as path:
+            vocab_file = os.path.join(path, "vocab.txt")
+            with open(vocab_file, "w", encoding="utf-8") as f:
+                f.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + sorted(set("".join(self.texts)))))
+            torch.manual_seed(0)
+            tokenizer = BertTokenizerFast(vocab_file)
+            config = BertConfig(
+                vocab_size=len(tokenizer), hidden_size=32, num_hidden_layers=1,
+                num_attention_heads=1, intermediate_size=64, num_labels=1
+            )
+            BertForSequenceClassification(config).save_pretrained(path)
+            tokenizer.save_pretrained(path)
+
+            reranker = CrossEncoderReranker(path, batch_size=2, cache_size=4)
+            pairs = [("修仙", t) for t in self.texts]
+            scores = reranker.score(pairs)
+            self.assertEqual(len(scores), 5)
+
+            # 与单独计算的得分一致，且缓存命中时不再计算
+            forward = reranker._forward
+            calls = []
+            reranker._forward = lambda batch: calls.append(batch) or forward(batch)
+            self.assertAlmostEqual(reranker.score([pairs[4]])[0], scores[4], places=4)
+            self.assertEqual(calls, [])
+            self.assertLessEqual(len(reranker._cache), 4)
+
+if __name__ == '__main__':
+    unittest.main()
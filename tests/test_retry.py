@@ -0,0 +1,149 @@
+"""
+写入重试模块的单元测试。
+"""
+import unittest
+import asyncio
+import os
+import tempfile
+import httpx
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.models import Distance, VectorParams
+from src.qdrant_utils.retry import RetryPolicy, FailedBatchJournal, is_transient_error, is_payload_too_large
+from src.qdrant_utils.metrics import InMemoryMetrics
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+
+def http_error(status_code):
+    """构造指定状态码的响应异常"""
+    return UnexpectedResponse(status_code, "error", b"", httpx.Headers())
+
+class FlakyClient:
+    """按预设规则让 upsert 失败的客户端包装"""
+
+    def __init__(self, client, failures=0, max_points=None):
+        self.client = client
+        self.failures = failures
+        self.max_points = max_points
+        self.calls = 0
+
+    def upsert(self, collection_name, points, wait=True):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise http_error(503)
+        if self.max_points is not None and len(points) > self.max_points:
+            raise http_error(413)
+        return self.client.upsert(collection_name=collection_name, points=points, wait=wait)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+class AsyncFlakyClient(FlakyClient):
+    """异步版本的客户端包装"""
+
+    async def upsert(self, collection_name, points, wait=True):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise http_error(503)
+        return await self.client.upsert(collection_name=collection_name, points=points, wait=wait)
+
+def make_points(count, start=0):
+    """构造测试点数据"""
+    return [
+        {"id": start + i, "vector": [1.0, float(i + 1)], "payload": {"title": f"t{start + i}"}}
+        for i in range(count)
+    ]
+
+class TestRetry(unittest.TestCase):
+    """测试写入重试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.client = QdrantClient(":memory:")
+        self.client.create_collection("test_retry", vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+        self.policy = RetryPolicy(max_attempts=3, base_delay=0.0)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.journal = FailedBatchJournal(os.path.join(self.tmpdir.name, "failed.jsonl"))
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmpdir.cleanup()
+
+    def test_error_classification(self):
+        """测试错误分类"""
+        self.assertTrue(is_transient_error(http_error(503)))
+        self.assertTrue(is_transient_error(http_error(429)))
+        self.assertTrue(is_transient_error(ConnectionError()))
+        self.assertFalse(is_transient_error(http_error(400)))
+        self.assertFalse(is_transient_error(ValueError("bad")))
+        self.assertTrue(is_payload_too_large(http_error(413)))
+        self.assertFalse(is_payload_too_large(http_error(503)))
+
+    def test_delay(self):
+        """测试退避时长上限"""
+        policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+        for attempt in range(10):
+            self.assertLessEqual(policy.delay(attempt), min(5.0, 2 ** attempt))
+
+    def test_retry_transient(self):
+        """测试临时错误重试后成功"""
+        metrics = InMemoryMetrics()
+        flaky = FlakyClient(self.client, failures=2)
+        ops = QdrantOperations(flaky, metrics=metrics, retry_policy=self.policy)
+        self.assertTrue(ops.upsert_points_batch("test_retry", make_points(3)))
+        self.assertEqual(flaky.calls, 3)
+        self.assertEqual(metrics.counter("retries", stage="upsert"), 2)
+
+    def test_split_too_large(self):
+        """测试请求体过大时拆分批次"""
+        metrics = InMemoryMetrics()
+        ops = QdrantOperations(FlakyClient(self.client, max_points=2), metrics=metrics, retry_policy=self.policy)
+        self.assertTrue(ops.upsert_points_batch("test_retry", make_points(7)))
+        self.assertEqual(self.client.count("test_retry").count, 7)
+        self.assertGreater(metrics.counter("batch_splits", stage="upsert"), 0)
+
+    def test_journal_and_replay(self):
+        """测试失败批次写入日志并重放"""
+        flaky = FlakyClient(self.client, failures=3)
+        ops = QdrantOperations(flaky, retry_policy=self.policy, journal=self.journal)
+        self.assertFalse(ops.upsert_points_batch("test_retry", make_points(4)))
+        self.assertEqual(len(self.journal), 1)
+        self.assertEqual(self.client.count("test_retry").count, 0)
+
+        self.assertTrue(ops.replay_journal())
+        self.assertEqual(len(self.journal), 0)
+        self.assertFalse(os.path.exists(self.journal.replaying_path))
+        self.assertEqual(self.client.count("test_retry").count, 4)
+
+    def test_interrupted_replay(self):
+        """测试重放中断后暂存的批次不会丢失"""
+        self.journal.record("test_retry", make_points(2), "error")
+        self.assertEqual(len(self.journal.drain()), 1)
+        self.journal.record("test_retry", make_points(2, start=2), "error")
+        self.assertEqual(len(self.journal.drain()), 2)
+        self.journal.commit_replay()
+        self.assertEqual(self.journal.drain(), [])
+
+    def test_async_journal(self):
+        """测试异步上传的重试与失败日志"""
+        async def run_test():
+            client = AsyncQdrantClient(":memory:")
+            await client.create_collection("test_retry", vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+            flaky = AsyncFlakyClient(client, failures=3)
+            ops = AsyncQdrantOperations(flaky, retry_policy=self.policy, journal=self.journal)
+
+            # 第一个批次重试耗尽写入日志，第二个批次正常上传
+            self.assertFalse(await ops.upsert_points_batch("test_retry", make_points(2)))
+            self.assertTrue(await ops.upsert_points_batch("test_retry", make_points(2, start=2)))
+            self.assertEqual(len(self.journal), 1)
+
+            self.assertTrue(await ops.replay_journal())
+            self.assertEqual((await client.count("test_retry")).count, 4)
+
+        asyncio.run(run_test())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+多租户路由与扇出搜索的单元测试。
+"""
+import unittest
+import asyncio
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from src.qdrant_utils.client import QdrantClientConfig
+from src.qdrant_utils.routing import (
+    TenantRouter, AsyncTenantRouter, FanOutSearcher, AsyncFanOutSearcher, tenant_point_id
+)
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from tests.fakes import FirstCharEmbedding
+
+class TestRouting(unittest.TestCase):
+    """测试多租户路由与扇出搜索"""
+
+    def test_tenant_isolation(self):
+        """测试租户之间互不可见且文档 ID 不冲突"""
+        ops = QdrantOperations(QdrantClient(":memory:"))
+        router = TenantRouter(TextIndexer(FirstCharEmbedding(), ops, "shared"))
+        self.assertTrue(router.create_index())
+        self.assertTrue(router.add_texts("a", ["斗破苍穹", "遮天"]))
+        self.assertTrue(router.add_texts("b", ["凡人修仙传"], payloads=[{"author": "忘语"}]))
+        self.assertEqual(ops.client.count("shared").count, 3)
+
+        results = router.search("b", "凡人", limit=10, score_threshold=-1.0)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["id"], tenant_point_id("b", 0))
+        self.assertEqual(results[0]["payload"], {"title": "凡人修仙传", "author": "忘语", "tenant_id": "b", "doc_id": 0})
+
+        batch = router.search_batch("a", ["遮天", "斗破"], limit=10, score_threshold=-1.0)
+        self.assertEqual([len(r) for r in batch], [2, 2])
+        self.assertTrue(all(hit["payload"]["tenant_id"] == "a" for r in batch for hit in r))
+
+    def test_fan_out(self):
+        """测试跨集合合并前 k 条结果"""
+        model = FirstCharEmbedding()
+        ops = QdrantOperations(QdrantClient(":memory:"))
+        for name, texts in [("c1", ["斗破苍穹", "遮天"]), ("c2", ["凡人修仙传", "完美世界"])]:
+            indexer = TextIndexer(model, ops, name)
+            indexer.create_index()
+            indexer.add_texts(texts)
+
+        searcher = FanOutSearcher(model, ops, ["c1", "c2", "missing"])
+        results = searcher.search("遮天", limit=3, score_threshold=-1.0)
+        self.assertEqual(len(results), 3)
+        self.assertEqual((results[0]["collection"], results[0]["payload"]["title"]), ("c1", "遮天"))
+        scores = [hit["score"] for hit in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_async(self):
+        """测试异步租户路由与扇出搜索"""
+        async def run_test():
+            model = FirstCharEmbedding()
+            ops = AsyncQdrantOperations(AsyncQdrantClient(":memory:"))
+            router = AsyncTenantRouter(AsyncTextIndexer(model, ops, "shared"))
+            self.assertTrue(await router.create_index())
+            await router.add_texts_batch("a", ["斗破苍穹"])
+            await router.add_texts_batch("b", ["斗破苍穹", "遮天"])
+            results = await router.search("a", "斗破", score_threshold=-1.0)
+            self.assertEqual([hit["payload"]["tenant_id"] for hit in results], ["a"])
+            batch = await router.search_batch("b", ["遮天"], score_threshold=-1.0)
+            self.assertEqual(len(batch[0]), 2)
+
+            other = AsyncTextIndexer(model, ops, "other")
+            await other.create_index()
+            await other.add_texts_batch(["遮天"])
+            searcher = AsyncFanOutSearcher(model, ops, ["shared", "other"])
+            results = await searcher.search("遮天", limit=10, score_threshold=-1.0)
+            self.assertEqual(len(results), 4)
+            self.assertEqual({hit["collection"] for hit in results}, {"shared", "other"})
+
+        asyncio.run(run_test())
+
+    def test_shared_client(self):
+        """测试相同配置共用客户端"""
+        first = QdrantClientConfig(host="example.invalid", port=6333)
+        second = QdrantClientConfig(host="example.invalid", port=6333)
+        self.assertIs(first.get_shared_client(), second.get_shared_client())
+        self.assertIsNot(first.get_shared_client(), QdrantClientConfig(host="example.invalid", port=6334).get_shared_client())
+
+if __name__ == '__main__':
+    unittest.main()
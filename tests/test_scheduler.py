@@ -0,0 +1,135 @@
+"""
+优先级调度器的单元测试。
+"""
+import unittest
+import asyncio
+import threading
+import time
+import numpy as np
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from src.qdrant_utils.embeddings import TextEmbedding
+from src.qdrant_utils.metrics import InMemoryMetrics
+from src.qdrant_utils.scheduler import PriorityScheduler, SchedulerOverloaded, QUERY, INGEST
+
+class SlowEmbedding(TextEmbedding):
+    """每次前向计算耗时固定并记录调用顺序的测试模型"""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    @property
+    def vector_size(self) -> int:
+        return 4
+
+    def generate_vector(self, texts):
+        time.sleep(self.delay)
+        with self._lock:
+            self.calls.append(list(texts))
+        vectors = []
+        for text in texts:
+            vector = np.full(4, 0.1, dtype=np.float32)
+            vector[ord(text[-1]) % 4] = 1.0
+            vectors.append(vector)
+        return vectors
+
+class TestPriorityScheduler(unittest.TestCase):
+    """测试优先级调度器"""
+
+    def test_query_first(self):
+        """测试槽位空出时先分配给查询"""
+        async def run_test():
+            scheduler = PriorityScheduler(max_concurrency=1)
+            order = []
+
+            async def work(priority, name):
+                async with scheduler.slot(priority):
+                    order.append(name)
+                    await asyncio.sleep(0.01)
+
+            await scheduler.acquire(INGEST)
+            tasks = [
+                asyncio.ensure_future(work(INGEST, "ingest-1")),
+                asyncio.ensure_future(work(INGEST, "ingest-2")),
+                asyncio.ensure_future(work(QUERY, "query"))
+            ]
+            await asyncio.sleep(0)
+            self.assertEqual(scheduler.queued, {QUERY: 1, INGEST: 2})
+            scheduler.release(INGEST)
+            await asyncio.gather(*tasks)
+            self.assertEqual(order, ["query", "ingest-1", "ingest-2"])
+            self.assertEqual(scheduler.running, {QUERY: 0, INGEST: 0})
+
+        asyncio.run(run_test())
+
+    def test_ingest_limit(self):
+        """测试写入占用的槽位上限"""
+        async def run_test():
+            scheduler = PriorityScheduler(max_concurrency=2, max_ingest_concurrency=1)
+            await scheduler.acquire(INGEST)
+            with self.assertRaises(asyncio.TimeoutError):
+                await scheduler.acquire(INGEST, timeout=0.01)
+            # 为查询预留的槽位可以立即获得
+            await asyncio.wait_for(scheduler.acquire(QUERY), 0.01)
+            self.assertEqual(scheduler.running, {QUERY: 1, INGEST: 1})
+            self.assertEqual(scheduler.queued, {QUERY: 0, INGEST: 0})
+            with self.assertRaises(ValueError):
+                await scheduler.acquire("batch")
+
+        asyncio.run(run_test())
+
+    def test_admission(self):
+        """测试等待队列已满时拒绝查询，等待超时后槽位分配给写入"""
+        async def run_test():
+            metrics = InMemoryMetrics()
+            scheduler = PriorityScheduler(max_concurrency=1, max_query_queue=1, metrics=metrics)
+            await scheduler.acquire(QUERY)
+            waiting = asyncio.ensure_future(scheduler.acquire(QUERY, timeout=0.02))
+            ingest = asyncio.ensure_future(scheduler.acquire(INGEST))
+            await asyncio.sleep(0)
+            with self.assertRaises(SchedulerOverloaded):
+                await scheduler.acquire(QUERY)
+            self.assertEqual(metrics.counter("rejected", stage=QUERY), 1)
+            with self.assertRaises(asyncio.TimeoutError):
+                await waiting
+            scheduler.release(QUERY)
+            await asyncio.wait_for(ingest, 0.1)
+            self.assertEqual(scheduler.running, {QUERY: 0, INGEST: 1})
+
+        asyncio.run(run_test())
+
+    def test_indexer_preemption(self):
+        """测试写入期间的查询在一个微批次内被执行"""
+        async def run_test():
+            model = SlowEmbedding()
+            indexer = AsyncTextIndexer(
+                model,
+                AsyncQdrantOperations(AsyncQdrantClient(":memory:")),
+                "titles",
+                scheduler=PriorityScheduler(max_concurrency=1),
+                io_scheduler=PriorityScheduler(max_concurrency=2),
+                ingest_micro_batch=2
+            )
+            await indexer.create_index()
+            await indexer.add_texts_batch(["已有1", "已有2", "已有3"], ids=[100, 101, 102])
+            model.calls.clear()
+            texts = [f"文档{i}" for i in range(20)]
+            ingest = asyncio.ensure_future(indexer.add_texts_batch(texts, batch_size=5))
+            await asyncio.sleep(0.03)
+            results = await indexer.search("查询0", limit=3, score_threshold=-1.0)
+            self.assertFalse(ingest.done())
+            self.assertTrue(await ingest)
+
+            self.assertEqual(len(results), 3)
+            query_call = model.calls.index(["查询0"])
+            self.assertLessEqual(query_call, 3)
+            self.assertEqual(len(model.calls), 11)
+            self.assertEqual((await indexer.operations.client.count("titles")).count, 23)
+
+        asyncio.run(run_test())
+
+if __name__ == '__main__':
+    unittest.main()
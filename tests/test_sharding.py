@@ -0,0 +1,123 @@
+"""
+集群拓扑配置与分片键写入的单元测试。
+"""
+import unittest
+import asyncio
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models as rest
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from src.qdrant_utils.cache import SearchResultCache
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.sharding import CollectionProfile, group_by_shard_key, shard_key_selector
+from tests.fakes import FirstCharEmbedding
+
+def spy(client, name, calls):
+    """替换客户端方法，记录调用参数后调用原方法"""
+    original = getattr(client, name)
+
+    def wrapper(*args, **kwargs):
+        calls.append(kwargs)
+        return original(*args, **kwargs)
+
+    setattr(client, name, wrapper)
+
+def async_spy(client, name, calls):
+    """spy 的异步版本"""
+    original = getattr(client, name)
+
+    async def wrapper(*args, **kwargs):
+        calls.append(kwargs)
+        return await original(*args, **kwargs)
+
+    setattr(client, name, wrapper)
+
+class TestSharding(unittest.TestCase):
+    """测试集群拓扑配置与分片键写入"""
+
+    def test_profile(self):
+        """测试拓扑配置参数"""
+        profile = CollectionProfile.for_cluster(3, replication_factor=5, write_consistency_factor=2)
+        self.assertEqual(profile.collection_kwargs(), {
+            "shard_number": 6, "replication_factor": 3, "write_consistency_factor": 2
+        })
+        self.assertEqual(CollectionProfile().collection_kwargs(), {})
+        with self.assertRaises(ValueError):
+            CollectionProfile(replication_factor=1, write_consistency_factor=2)
+        with self.assertRaises(ValueError):
+            CollectionProfile(shard_keys=["eu"])
+
+        points = [{"id": 1, "payload": {"region": "eu"}}, {"id": 2, "payload": {}}, {"id": 3, "payload": {"region": "eu"}}]
+        CollectionProfile(shard_key_field="region").assign_shard_keys(points)
+        self.assertEqual({key: [p["id"] for p in group] for key, group in group_by_shard_key(points).items()},
+                         {"eu": [1, 3], None: [2]})
+        self.assertEqual(shard_key_selector(["eu"]), ["eu"])
+        self.assertIsNone(shard_key_selector([]))
+
+    def test_create_collection(self):
+        """测试创建集合时传入拓扑参数并创建分片键"""
+        client = QdrantClient(":memory:")
+        created, shard_keys = [], []
+        spy(client, "create_collection", created)
+        # 本地模式不支持创建分片键
+        client.create_shard_key = lambda collection_name, shard_key: shard_keys.append(shard_key)
+        ops = QdrantOperations(client)
+        profile = CollectionProfile(
+            shard_number=2, replication_factor=2, sharding_method="custom", shard_keys=["eu", "us"]
+        )
+        self.assertTrue(ops.create_collection("docs", 4, profile=profile))
+        self.assertEqual(created[0]["shard_number"], 2)
+        self.assertEqual(created[0]["sharding_method"], rest.ShardingMethod.CUSTOM)
+        self.assertEqual(shard_keys, ["eu", "us"])
+
+    def test_grouped_upsert_and_search(self):
+        """测试写入按分片键分组，搜索只访问指定分片"""
+        client = QdrantClient(":memory:")
+        upserts, searches = [], []
+        spy(client, "upsert", upserts)
+        spy(client, "search", searches)
+        ops = QdrantOperations(client, result_cache=SearchResultCache())
+        indexer = TextIndexer(FirstCharEmbedding(), ops, "docs", profile=CollectionProfile(shard_key_field="region"))
+        indexer.create_index()
+        regions = ["eu", "us", "eu", None]
+        self.assertTrue(indexer.add_texts(
+            ["斗破苍穹", "遮天", "凡人修仙传", "诛仙"],
+            payloads=[{"region": region} if region else {} for region in regions]
+        ))
+        selectors = sorted((call.get("shard_key_selector") or "", len(call["points"])) for call in upserts)
+        self.assertEqual(selectors, [("", 1), ("eu", 2), ("us", 1)])
+        self.assertEqual(client.count("docs").count, 4)
+
+        indexer.search("斗破", shard_keys="eu")
+        indexer.search("斗破", shard_keys=["eu", "us"])
+        indexer.search("斗破", shard_keys="eu")
+        indexer.search_batch(["遮天"], shard_keys="us")
+        # 相同查询指向不同分片时分别缓存
+        self.assertEqual([call["shard_key_selector"] for call in searches], ["eu", ["eu", "us"], "us"])
+
+    def test_async(self):
+        """测试异步写入并发发送各分片键的请求"""
+        async def run_test():
+            client = AsyncQdrantClient(":memory:")
+            upserts, queries = [], []
+            async_spy(client, "upsert", upserts)
+            async_spy(client, "query_points", queries)
+            indexer = AsyncTextIndexer(
+                FirstCharEmbedding(), AsyncQdrantOperations(client), "docs",
+                profile=CollectionProfile(shard_key_field="tenant")
+            )
+            await indexer.create_index()
+            self.assertTrue(await indexer.add_texts_batch(
+                ["斗破苍穹", "遮天", "凡人修仙传"], payloads=[{"tenant": 1}, {"tenant": 2}, {"tenant": 1}]
+            ))
+            self.assertEqual(sorted(call["shard_key_selector"] for call in upserts), [1, 2])
+            results = await indexer.search_batch(["斗破", "遮天"], score_threshold=-1.0, shard_keys=[1])
+            self.assertEqual(len(results), 2)
+            self.assertEqual([call["shard_key_selector"] for call in queries], [[1], [1]])
+
+        asyncio.run(run_test())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+快照与集合复制的单元测试。
+
+本地内存模式不支持快照，这里用 httpx.MockTransport 模拟服务端的快照接口。
+"""
+import unittest
+import asyncio
+import os
+import re
+import tempfile
+import httpx
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from tests.fakes import ConstantEmbedding
+
+class FakeSnapshotServer:
+    """模拟快照接口的服务端"""
+
+    def __init__(self):
+        self.snapshots = {}
+        self.restored = {}
+        self.aliases = {}
+
+    @staticmethod
+    def respond(result, status_code=200):
+        return httpx.Response(status_code, json={"result": result, "status": "ok", "time": 0.0})
+
+    def handler(self, request):
+        path = request.url.path
+        if path == "/aliases":
+            return self.respond({"aliases": [
+                {"alias_name": alias, "collection_name": name} for alias, name in self.aliases.items()
+            ]})
+        match = re.fullmatch(r"/collections/([^/]+)/snapshots(?:/([^/]+))?", path)
+        if match is None:
+            return httpx.Response(404, json={"status": {"error": "not found"}})
+        collection, name = match.groups()
+        if name == "upload":
+            body = request.read()
+            self.restored[collection] = b"snapshot-of-" in body and body.split(b"snapshot-of-")[1][:4]
+            return self.respond(True)
+        if request.method == "POST":
+            if collection not in ("titles", "titles_v1"):
+                return httpx.Response(404, json={"status": {"error": "Collection not found"}})
+            name = f"{collection}-{len(self.snapshots)}.snapshot"
+            self.snapshots[(collection, name)] = b"snapshot-of-" + collection.encode()[:4] + b"\0" * 4096
+            return self.respond({"name": name, "creation_time": None, "size": 4112})
+        if request.method == "DELETE":
+            self.snapshots.pop((collection, name), None)
+            return self.respond(True)
+        if name is None:
+            return self.respond([
+                {"name": n, "creation_time": None, "size": len(data)}
+                for (c, n), data in self.snapshots.items() if c == collection
+            ])
+        if (collection, name) not in self.snapshots:
+            return httpx.Response(404, json={"status": {"error": "Snapshot not found"}})
+        return httpx.Response(200, content=self.snapshots[(collection, name)])
+
+class TestSnapshots(unittest.TestCase):
+    """测试快照与集合复制"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.server = FakeSnapshotServer()
+        self.client = QdrantClient(url="http://snapshot.test:6333")
+        self.client.http.client._client = httpx.Client(transport=httpx.MockTransport(self.server.handler))
+        self.ops = QdrantOperations(self.client)
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmpdir.cleanup()
+
+    def test_snapshot_helpers(self):
+        """测试创建、列出、下载与上传快照"""
+        name = self.ops.create_snapshot("titles")
+        self.assertIsNotNone(name)
+        self.assertEqual([s.name for s in self.ops.list_snapshots("titles")], [name])
+
+        path = os.path.join(self.tmpdir.name, name)
+        self.assertTrue(self.ops.download_snapshot("titles", name, path, chunk_size=1024))
+        self.assertEqual(os.path.getsize(path), 4112)
+        self.assertTrue(self.ops.upload_snapshot("titles_copy", path))
+        self.assertEqual(self.server.restored["titles_copy"], b"titl")
+
+        self.assertTrue(self.ops.delete_snapshot("titles", name))
+        self.assertEqual(self.ops.list_snapshots("titles"), [])
+
+    def test_download_missing(self):
+        """测试下载失败时不留下文件"""
+        path = os.path.join(self.tmpdir.name, "missing.snapshot")
+        self.assertFalse(self.ops.download_snapshot("titles", "missing.snapshot", path))
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+        self.assertIsNone(self.ops.create_snapshot("unknown"))
+
+    def test_clone_to(self):
+        """测试通过快照复制别名指向的集合"""
+        self.server.aliases["titles_alias"] = "titles_v1"
+        indexer = TextIndexer(ConstantEmbedding(), self.ops, "titles_alias")
+        clone = indexer.clone_to("titles_staging", workdir=self.tmpdir.name)
+        self.assertIsNotNone(clone)
+        self.assertEqual(clone.collection_name, "titles_staging")
+        self.assertEqual(indexer.collection_name, "titles_alias")
+        self.assertEqual(self.server.restored["titles_staging"], b"titl")
+        # 服务端与本地的快照都已清理
+        self.assertEqual(self.server.snapshots, {})
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+
+    def test_async_clone_to(self):
+        """测试异步复制集合"""
+        async def run_test():
+            client = AsyncQdrantClient(url="http://snapshot.test:6333")
+            client.http.client._async_client = httpx.AsyncClient(
+                transport=httpx.MockTransport(self.server.handler)
+            )
+            indexer = AsyncTextIndexer(ConstantEmbedding(), AsyncQdrantOperations(client), "titles")
+            clone = await indexer.clone_to("titles_test")
+            self.assertEqual(clone.collection_name, "titles_test")
+            self.assertEqual(self.server.restored["titles_test"], b"titl")
+            self.assertEqual(self.server.snapshots, {})
+            self.assertIsNone(await AsyncTextIndexer(ConstantEmbedding(), AsyncQdrantOperations(client), "unknown").clone_to("x"))
+
+        asyncio.run(run_test())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+稀疏向量与混合检索的单元测试。
+"""
+import unittest
+import asyncio
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from src.qdrant_utils.sparse import analyze, term_index, BM25SparseEncoder
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from tests.fakes import ConstantEmbedding
+
+class TestSparse(unittest.TestCase):
+    """测试稀疏向量与混合检索"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.texts = ["斗破苍穹", "凡人修仙传", "完美世界", "遮天", "Harry Potter and the Stone"]
+
+    def test_analyze(self):
+        """测试默认分词"""
+        self.assertEqual(analyze("遮天"), ["遮", "天", "遮天"])
+        self.assertEqual(analyze("Ｈarry  POTTER 7"), ["harry", "potter", "7"])
+        self.assertEqual(term_index("遮天"), term_index("遮天"))
+
+    def test_encode(self):
+        """测试文档与查询编码"""
+        encoder = BM25SparseEncoder(avg_doc_len=4)
+        doc = encoder.encode_documents(["修仙修仙"])[0]
+        self.assertEqual(doc["indices"], sorted(doc["indices"]))
+        weights = dict(zip(doc["indices"], doc["values"]))
+        # 重复的词项权重更高，但不超过 k1 + 1
+        self.assertGreater(weights[term_index("修仙")], weights[term_index("仙修")])
+        self.assertLess(max(doc["values"]), encoder.k1 + 1)
+        query = encoder.encode_queries(["修仙"])[0]
+        self.assertEqual(query["values"], [1.0] * len(query["indices"]))
+
+    def test_search_hybrid(self):
+        """测试混合检索由关键词决定排序"""
+        indexer = TextIndexer(
+            ConstantEmbedding(), QdrantOperations(QdrantClient(":memory:")), "test_sparse",
+            sparse_encoder=BM25SparseEncoder()
+        )
+        indexer.create_index()
+        self.assertTrue(indexer.add_texts(self.texts))
+        results = indexer.search_hybrid("凡人修仙", limit=3)
+        self.assertEqual(results[0]["payload"]["title"], "凡人修仙传")
+        results = indexer.search_hybrid("harry potter", limit=3)
+        self.assertEqual(results[0]["payload"]["title"], "Harry Potter and the Stone")
+        # 稠密检索仍然可用
+        self.assertEqual(len(indexer.search("遮天", limit=2, score_threshold=-1.0)), 2)
+
+    def test_search_hybrid_without_encoder(self):
+        """测试未设置编码器时返回空结果"""
+        indexer = TextIndexer(ConstantEmbedding(), QdrantOperations(QdrantClient(":memory:")), "test_sparse")
+        self.assertEqual(indexer.search_hybrid("遮天"), [])
+
+    def test_async_search_hybrid(self):
+        """测试异步混合检索"""
+        async def run_test():
+            indexer = AsyncTextIndexer(
+                ConstantEmbedding(), AsyncQdrantOperations(AsyncQdrantClient(":memory:")), "test_sparse",
+                sparse_encoder=BM25SparseEncoder()
+            )
+            await indexer.create_index()
+            self.assertTrue(await indexer.add_texts_batch(self.texts, batch_size=2))
+            results = await indexer.search_hybrid("完美", limit=2)
+            self.assertEqual(results[0]["payload"]["title"], "完美世界")
+
+        asyncio.run(run_test())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+分词阶段与前向计算解耦的单元测试。
+"""
+import unittest
+import asyncio
+import os
+import tempfile
+import threading
+import numpy as np
+import torch
+from transformers import BertConfig, BertModel, BertTokenizerFast
+from qdrant_client import QdrantClient
+from qdrant_client.async_qdrant_client import AsyncQdrantClient
+from src.qdrant_utils.adaptive import AdaptiveBatchSizer
+from src.qdrant_utils.async_indexer import AsyncTextIndexer
+from src.qdrant_utils.async_operations import AsyncQdrantOperations
+from src.qdrant_utils.embeddings import TransformerEmbedding
+from src.qdrant_utils.indexer import TextIndexer
+from src.qdrant_utils.metrics import InMemoryMetrics
+from src.qdrant_utils.operations import QdrantOperations
+from src.qdrant_utils.scheduler import PriorityScheduler
+
+TEXTS = ["重生之都市修仙", "我在修仙界开网店", "修真聊天群", "斗破苍穹", "完美世界", "遮天", "凡人修仙传"]
+
+class TestTokenization(unittest.TestCase):
+    """测试独立的分词阶段"""
+
+    @classmethod
+    def setUpClass(cls):
+        """保存随机权重的小型 BERT 模型"""
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        path = cls.tmpdir.name
+        vocab_file = os.path.join(path, "vocab.txt")
+        with open(vocab_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + sorted(set("".join(TEXTS)))))
+        torch.manual_seed(0)
+        tokenizer = BertTokenizerFast(vocab_file)
+        config = BertConfig(
+            vocab_size=len(tokenizer), hidden_size=32, num_hidden_layers=1,
+            num_attention_heads=1, intermediate_size=64
+        )
+        BertModel(config).save_pretrained(path)
+        tokenizer.save_pretrained(path)
+        cls.path = path
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_token_cache(self):
+        """测试缓存的分词结果与直接分词相同，重复文本命中缓存"""
+        metrics = InMemoryMetrics()
+        model = TransformerEmbedding(self.path, metrics=metrics, token_cache_size=4)
+        direct = model.tokenizer(TEXTS[:3], padding=True, truncation=True, max_length=512, return_tensors='pt')
+        cached = model.tokenize(TEXTS[:3])
+        for key in direct:
+            self.assertTrue(torch.equal(direct[key], cached[key]))
+        model.tokenize([TEXTS[0], TEXTS[3]])
+        self.assertEqual(metrics.counter("cache_hits", cache="tokens"), 1)
+        self.assertEqual(list(model._token_cache), [TEXTS[1], TEXTS[2], TEXTS[0], TEXTS[3]])
+        model.tokenize([TEXTS[4]])
+        self.assertEqual(len(model._token_cache), 4)
+        self.assertNotIn(TEXTS[1], model._token_cache)
+
+    def test_pipelined_batches(self):
+        """测试提前分词的分批向量化结果与逐个向量化相同，分词在后台线程中执行"""
+        metrics = InMemoryMetrics()
+        model = TransformerEmbedding(self.path, metrics=metrics, tokenize_workers=2, token_cache_size=100)
+        threads = set()
+        tokenize = model.tokenize
+        model.tokenize = lambda texts: threads.add(threading.current_thread().name) or tokenize(texts)
+
+        texts = TEXTS * 3
+        vectors = model.generate_vector_batched(texts, batch_size=2)
+        self.assertEqual(len(vectors), len(texts))
+        for text, vector in zip(texts, vectors):
+            np.testing.assert_allclose(vector, model.generate_vector([text])[0], atol=1e-5)
+        self.assertTrue(all(name.startswith("tokenize") for name in threads if name != threading.current_thread().name))
+        self.assertTrue(any(name.startswith("tokenize") for name in threads))
+        self.assertEqual(metrics.histogram("stage_seconds", stage="tokenize_wait")["count"], 11)
+        self.assertEqual(metrics.histogram("stage_seconds", stage="forward")["count"], 11 + len(texts))
+
+    def record_threads(self, model):
+        """记录执行分词的线程名称"""
+        threads = []
+        tokenize = model.tokenize
+        model.tokenize = lambda texts: threads.append(threading.current_thread().name) or tokenize(texts)
+        return threads
+
+    def test_indexer_adaptive(self):
+        """测试索引管理器按控制器大小向量化时，分词在分词线程中提前进行"""
+        metrics = InMemoryMetrics()
+        model = TransformerEmbedding(self.path, metrics=metrics)
+        threads = self.record_threads(model)
+        indexer = TextIndexer(
+            model, QdrantOperations(QdrantClient(":memory:")), "titles", metrics=metrics,
+            embed_batch=AdaptiveBatchSizer(initial=2, min_size=2, max_size=2)
+        )
+        indexer.create_index()
+        self.assertTrue(indexer.add_texts(TEXTS))
+        self.assertEqual(len(threads), 4)
+        self.assertTrue(all(name.startswith("tokenize") for name in threads))
+        self.assertEqual(metrics.histogram("stage_seconds", stage="tokenize_wait")["count"], 4)
+        self.assertEqual(metrics.histogram("stage_seconds", stage="forward")["count"], 4)
+
+    def test_async_ingest(self):
+        """测试异步写入（含调度器）经过同一分词阶段"""
+        async def run_test(scheduler):
+            metrics = InMemoryMetrics()
+            model = TransformerEmbedding(self.path)
+            threads = self.record_threads(model)
+            indexer = AsyncTextIndexer(
+                model, AsyncQdrantOperations(AsyncQdrantClient(":memory:")), "titles",
+                metrics=metrics, scheduler=scheduler, ingest_micro_batch=3
+            )
+            await indexer.create_index()
+            self.assertTrue(await indexer.add_texts_batch(TEXTS))
+            self.assertEqual(len(threads), 3)
+            self.assertTrue(all(name.startswith("tokenize") for name in threads))
+            self.assertEqual((await indexer.operations.client.count("titles")).count, len(TEXTS))
+            return metrics
+
+        metrics = asyncio.run(run_test(PriorityScheduler(max_concurrency=1)))
+        self.assertEqual(metrics.histogram("stage_seconds", stage="tokenize_wait")["count"], 3)
+        asyncio.run(run_test(None))
+
+if __name__ == '__main__':
+    unittest.main()